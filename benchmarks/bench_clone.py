@@ -0,0 +1,47 @@
+""" Benchmark of cloning strategies for parameter scans
+
+Each point of a ParameterScanBackTest grid clones the strategy and sets its
+parameters. Compares a full deep copy (clone) with copying only the parameter
+tree (fast_clone).
+
+usage: python benchmarks/bench_clone.py
+"""
+import timeit
+
+import systrade.models.signals as syssigs
+import systrade.models.indicators as sysinds
+import systrade.models.filters as sysfilts
+import systrade.models.strategies as sysstrats
+
+N_TICKERS = 500
+N_REPEAT = 2000
+
+def make_strategy():
+    ticks = ['tick'+str(i) for i in range(N_TICKERS)]
+    filt = sysfilts.TickerOneToAnotherFilter(ticks,ticks)
+    signal_dict = {'sig'+str(i):syssigs.ZeroCrossBuyUpSellDown(
+                                    sysinds.MACrossOver(3+i,10+i),filt)
+                   for i in range(4)}
+    return sysstrats.SimpleStrategy(signal_dict,ticks)
+
+def main():
+    strat = make_strategy()
+    params = {'resampling':10,
+              'sig0__indicator__period1':4,
+              'sig3__indicator__period2':20}
+
+    def deep():
+        strat.clone().set_params(**params)
+
+    def fast():
+        strat.fast_clone().set_params(**params)
+
+    t_deep = min(timeit.repeat(deep,number=N_REPEAT,repeat=3))/N_REPEAT
+    t_fast = min(timeit.repeat(fast,number=N_REPEAT,repeat=3))/N_REPEAT
+    print("strategy of 4 signals on %d tickers, clone + set_params:" % N_TICKERS)
+    print("  clone      : %8.1f us" % (1e6*t_deep))
+    print("  fast_clone : %8.1f us" % (1e6*t_fast))
+    print("  speedup    : %8.1f x" % (t_deep/t_fast))
+
+if __name__=='__main__':
+    main()
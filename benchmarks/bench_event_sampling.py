@@ -0,0 +1,62 @@
+""" Benchmark of signals sampled at CUSUM events against signals on all bars
+
+A zero crossing signal of a moving average crossover is found on all tickers
+of a universe for a scan of period pairs, as a ParameterScanBackTest would, by
+fast clones of one signal. With an event sampler the indicator is found at the
+event bars only, and the events (shared by all clones) are found once for the
+whole scan.
+
+usage: python benchmarks/bench_event_sampling.py
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+
+import systrade.models.signals as syssigs
+import systrade.models.indicators as sysinds
+import systrade.models.events as sysevents
+
+N_TICKERS = [100,1000]
+N_DAYS = 2
+PERIOD_PAIRS = [(p1,p2) for p1 in [3,5,10,15] for p2 in [20,40,60,90]]
+THRESHOLD = 0.005
+
+def make_data(n_tickers):
+    times = pd.DatetimeIndex([])
+    for day in pd.date_range('2019-07-10',periods=N_DAYS,freq='D'):
+        times = times.append(pd.date_range(day+pd.Timedelta(hours=9.5),
+                                           periods=390,freq='1min'))
+    prices = 100.0+np.random.RandomState(0).normal(0,0.1,(len(times),n_tickers)).cumsum(axis=0)
+    return pd.DataFrame(prices,index=times,
+                        columns=['tick'+str(i) for i in range(n_tickers)])
+
+def best_time(func):
+    return min(timeit.repeat(func,number=1,repeat=3))
+
+def scan(signal,data_df):
+    for p1,p2 in PERIOD_PAIRS:
+        clone = signal.fast_clone()
+        clone.set_params(indicator__period1=p1,indicator__period2=p2)
+        clone.request_historical_sparse(data_df)
+
+def main():
+    print("scan of %d period pairs, %d days of minute bars, threshold %g:"
+          % (len(PERIOD_PAIRS),N_DAYS,THRESHOLD))
+    print("%8s %12s %12s %12s %10s" % ("tickers","events/bar","all bars",
+                                       "events","speedup"))
+    for n_tickers in N_TICKERS:
+        data_df = make_data(n_tickers)
+        all_bars = syssigs.ZeroCrossBuyUpSellDown(sysinds.MACrossOver(5,20),None)
+        sampler = sysevents.CusumEventSampler(THRESHOLD)
+        sampled = syssigs.ZeroCrossBuyUpSellDown(sysinds.MACrossOver(5,20),None,
+                                                 event_sampler=sampler)
+        n_events = len(sampler.get_events(data_df).positions)
+        t_all = best_time(lambda: scan(all_bars,data_df))
+        t_sampled = best_time(lambda: scan(sampled,data_df))
+        print("%8d %12.3f %10.1f ms %10.1f ms %9.1fx"
+              % (n_tickers,n_events/data_df.size,1e3*t_all,1e3*t_sampled,
+                 t_all/t_sampled))
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,37 @@
+""" Benchmark of weighted-window moving averages over long windows
+
+Compares pandas rolling(...,win_type=...) with kernels.weighted_ma by direct
+summation and by overlap-add FFT convolution, for short and long periods on
+minute data of many tickers.
+
+usage: python benchmarks/bench_weighted_ma.py
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from systrade.models import kernels
+
+N_TIMES = 60*390 # ~60 trading days of minute bars
+N_TICKERS = 10
+PERIODS = [10,100,390,780]
+WIN_TYPE = 'hamming'
+
+def main():
+    x = 100.0+np.random.RandomState(0).normal(0,1,(N_TIMES,N_TICKERS)).cumsum(axis=0)
+    df = pd.DataFrame(x)
+    print("%d times x %d tickers, win_type=%s" % (N_TIMES,N_TICKERS,WIN_TYPE))
+    print("%8s %12s %12s %12s" % ('period','pandas','direct','overlap_add'))
+    for p in PERIODS:
+        weights = kernels.window_weights(p,WIN_TYPE)
+        t_pd = min(timeit.repeat(lambda: df.rolling(p,win_type=WIN_TYPE).mean(),
+                                 number=1,repeat=3))
+        t_direct = min(timeit.repeat(lambda: kernels.weighted_ma(x,weights,'direct'),
+                                     number=1,repeat=3))
+        t_oa = min(timeit.repeat(lambda: kernels.weighted_ma(x,weights,'overlap_add'),
+                                 number=1,repeat=3))
+        print("%8d %10.1f ms %10.1f ms %10.1f ms" % (p,1e3*t_pd,1e3*t_direct,1e3*t_oa))
+
+if __name__=='__main__':
+    main()
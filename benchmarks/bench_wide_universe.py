@@ -0,0 +1,74 @@
+""" Benchmark of the array pipeline from broker to orders for many tickers
+
+Runs each stage of a SimpleStrategy of two moving average crossover signals on
+all tickers of a universe: the price matrix from a PaperBroker, 2d indicator
+arrays, signals (compact, and as a dense int8 matrix), the columnar order
+batch, fill prices of the batch, and the value of a portfolio holding every
+ticker. Time per ticker should stay roughly flat as the universe grows.
+
+usage: python benchmarks/bench_wide_universe.py
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+
+import systrade.models.signals as syssigs
+import systrade.models.indicators as sysinds
+import systrade.models.strategies as sysstrats
+from systrade.trading.brokers import PaperBroker
+from systrade.trading.holdings import AssetManager
+
+N_TICKERS = [10,100,1000,3000]
+N_DAYS = 2
+
+def make_data(n_tickers):
+    times = pd.DatetimeIndex([])
+    for day in pd.date_range('2019-07-10',periods=N_DAYS,freq='D'):
+        times = times.append(pd.date_range(day+pd.Timedelta(hours=9.5),
+                                           periods=390,freq='1min'))
+    prices = 100.0+np.random.RandomState(0).normal(0,0.1,(len(times),n_tickers)).cumsum(axis=0)
+    return pd.DataFrame(prices,index=times,
+                        columns=['tick'+str(i) for i in range(n_tickers)])
+
+def make_strategy(ticks):
+    signal_dict = {'fast':syssigs.ZeroCrossBuyUpSellDown(sysinds.MACrossOver(5,20),None),
+                   'slow':syssigs.ZeroCrossBuyUpSellDown(sysinds.MACrossOver(15,60),None)}
+    return sysstrats.SimpleStrategy(signal_dict,ticks,5)
+
+def best_time(func):
+    return min(timeit.repeat(func,number=1,repeat=3))
+
+def main():
+    stages = ['prices','indicators','signals','dense','orders','fills','value']
+    print("%8s" % 'tickers'+''.join("%12s" % s for s in stages)+"%12s" % 'MB')
+    for n in N_TICKERS:
+        data_df = make_data(n)
+        broker = PaperBroker(data_df)
+        ticks = broker.get_tick_list()
+        strat = make_strategy(ticks)
+        t0,t1 = broker.get_firstlast_times()
+        times,prices = broker.get_price_matrix(ticks,t0,t1)
+        stocks_df = pd.DataFrame(prices,index=times,columns=ticks)
+        signals = strat.sparse_signal_requests(stocks_df)
+        batch = strat.get_order_batch(stocks_df)
+        in_data = batch.times<=t1
+        manager = AssetManager(ticks,t0,0.0)
+        manager._current_stock = {t:1 for t in ticks}
+
+        timings = [
+            best_time(lambda: broker.get_price_matrix(ticks,t0,t1)),
+            best_time(lambda: sysinds.MACrossOver(5,20).get_indicator_array(prices)),
+            best_time(lambda: strat.sparse_signal_requests(stocks_df)),
+            best_time(lambda: signals.to_dense()),
+            best_time(lambda: strat.get_order_batch(stocks_df)),
+            best_time(lambda: broker.get_fill_arrays(
+                                [batch.tickers[i] for i in batch.ticker_ids[in_data]],
+                                batch.times[in_data],batch.buysell()[in_data])),
+            best_time(lambda: manager.get_stock_portfolio_value(broker,t1)),
+        ]
+        mbytes = (prices.nbytes+signals.to_dense().nbytes+signals.nbytes)/1e6
+        print("%8d" % n+''.join("%9.2f ms" % (1e3*t) for t in timings)+"%12.1f" % mbytes)
+
+if __name__=='__main__':
+    main()
@@ -1,4 +1,5 @@
-__all__=['backtest',
-         'models',
-         'monte',
-         'trading']
+__all__=['backtests',
+         'bootstrap',
+         'costs',
+         'overfitting',
+         'subperiods']
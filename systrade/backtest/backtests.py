@@ -1,10 +1,17 @@
 """ backtests module provides utilities for backtesting of strategies """
 from systrade.trading import accounts
 from systrade.models.base import ParamGrid
+from systrade.models import indicators
+from systrade.backtest import overfitting
+from systrade.backtest.bootstrap import PoissonBootstrap
+from systrade.backtest.subperiods import SubperiodStats
 
 import numpy as np
 from random import shuffle
 import copy
+import warnings
+import time as timer
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from itertools import product
 
@@ -12,6 +19,9 @@ import matplotlib.pyplot as plt
 
 import pandas as pd
 
+# bootstrap seeds are drawn below this bound
+SEED_MAX = 2**31-1
+
 # extensions required here:
 # * alternative history testing - from the data - get mu,covariance - use
 #   to build new monte carlo pathways for the stocks. run strategy on those
@@ -44,33 +54,25 @@ class TestData:
 
 class SingleStrategyBackTest:
     """ Backtester for a single strategy test """
-    def __init__(self,broker,account_factory,strategy):
+    def __init__(self,broker,account_factory,strategy,seed=None):
         """ initialize
         Args:
             - broker: a systrade,trading.broker object
             - strategy: a systrade.models.strategy object
+        Keyword Args:
+            - seed: (int, optional) seed of the bootstrap's random numbers,
+                    drawn by this backtester alone (so that backtests in
+                    threads are reproducible)
         """
-        self._strategy = strategy.clone()
+        self._strategy = _fast_clone(strategy)
         self._broker   = broker
+        self._rng      = np.random.RandomState(seed)
         self.testdata  = TestData()
+        self.test_stat = None
         self.account_factory = account_factory
 
     def _make_times_valid(self,t0,t1):
-        start, end = self._broker.get_firstlast_times()
-
-        if(t0 is None and t1 is None):
-            t0,t1=start,end
-        elif(t0 is None):
-            t0,_=start,end
-        elif(t1 is None):
-            _,t1=start,end
-
-        if t0<start:
-            raise ValueError("t0 too early")
-        if t1>end:
-            raise ValueError("t1 too late")
-
-        return t0,t1
+        return valid_time_window(self._broker,t0,t1)
 
     def _create_account(self,t0,t1):
         #account = accounts.BasicAccount(self._broker,t0,t1)
@@ -115,7 +117,7 @@ class SingleStrategyBackTest:
         adj_stat = adjusted_test_stat
         sampling_means=np.zeros((test_size,))
         for i in range(test_size):
-            tmp_stat = np.random.choice(adj_stat,size=len(adj_stat))
+            tmp_stat = self._rng.choice(adj_stat,size=len(adj_stat))
             sampling_means[i] = np.mean(tmp_stat)
         return sampling_means
 
@@ -124,7 +126,13 @@ class SingleStrategyBackTest:
         pval = len(sample_means[sample_means>test_mean])/test_size
         return pval
 
-    def run_bootstrap(self,benchmark,significance=0.05,test_size=5000,t0=None,t1=None):
+    def _get_poisson_pval(self,test_size,test_stat):
+        bootstrap = PoissonBootstrap(test_size,seed=self._rng.randint(SEED_MAX))
+        bootstrap.update(test_stat)
+        return bootstrap.get_pval()
+
+    def run_bootstrap(self,benchmark,significance=0.05,test_size=5000,t0=None,t1=None,
+                      bootstrap_method='resample'):
         """ run a bootstrap evaluation of mean test statistic and its p-value
 
         The backtesters strategy is used to trade on historical data, provided
@@ -144,6 +152,10 @@ class SingleStrategyBackTest:
                    will use the brokers first available time. defaults to None.
             - t1: (pandas datetime) time to finish trading the strategy. If None,
                    will use the brokers last available time. defaults to None.
+            - bootstrap_method: 'resample' (default) to resample the test
+                                statistic with replacement, or 'poisson' to use
+                                a streaming Poisson-weight bootstrap, see
+                                systrade.backtest.bootstrap.PoissonBootstrap
 
         Returns:
             - pval: The p-value of the backtest
@@ -155,16 +167,21 @@ class SingleStrategyBackTest:
         portfolio_df = account.get_portfolio_df()
         # get the test statistic
         test_stat = self.test_statistic_from_values_df(portfolio_df,benchmark)
+        self.test_stat = test_stat
 
         # plt.plot(running_valuation+benchmark.values[0],'r')
         # plt.plot(benchmark.values,'k')
         # plt.show()
         self.testdata.mean_excess_return = np.mean(test_stat)
 
-        adj_stat = self.get_mean_adjusted_test_stat(test_stat)
-
-        sampling_means=self._get_sample_means(test_size,adj_stat)
-        pval = self._get_pval(sampling_means,np.mean(test_stat))
+        if bootstrap_method=='resample':
+            adj_stat = self.get_mean_adjusted_test_stat(test_stat)
+            sampling_means=self._get_sample_means(test_size,adj_stat)
+            pval = self._get_pval(sampling_means,np.mean(test_stat))
+        elif bootstrap_method=='poisson':
+            pval = self._get_poisson_pval(test_size,test_stat)
+        else:
+            raise ValueError("bootstrap_method chosen: \"",bootstrap_method,"\" ,is not an available option")
         self.testdata.p_value = pval
         if(pval<significance):
             self.testdata.null_rejected = True
@@ -179,6 +196,35 @@ class SingleStrategyBackTest:
 
         return pval
 
+    def run_subperiods(self,benchmark,windows,t0=None,t1=None):
+        """ trade once, and get statistics of excess returns over many windows
+
+        The strategy is traded once from t0 to t1, and statistics of its excess
+        returns over the benchmark are found for every window, see
+        systrade.backtest.subperiods.SubperiodStats. Windows for every month,
+        or every rolling N days, can be made with calendar_windows and
+        rolling_windows of that module.
+
+        Args:
+            - benchmark: a time-series of the price of the benchmark
+            - windows: list of (t0,t1) tuples of pandas timestamps
+
+        Keyword Args:
+            - t0: (pandas datetime) time to begin trading the strategy. If None,
+                   will use the brokers first available time. defaults to None.
+            - t1: (pandas datetime) time to finish trading the strategy. If None,
+                   will use the brokers last available time. defaults to None.
+
+        Returns:
+            - stats_df: dataframe with a row of statistics for each window
+        """
+        account = self._run_strategy(t0,t1)
+        portfolio_df = account.get_portfolio_df()
+        subperiods = SubperiodStats(portfolio_df.index,
+                                    self.portfolio_to_returns(portfolio_df),
+                                    self.benchmark_returns(benchmark))
+        return subperiods.window_stats(windows)
+
 
 class MultiStrategyBackTest:
     """ Object for backtesting multiple strategies at once """
@@ -191,6 +237,9 @@ class MultiStrategyBackTest:
         self.strategies = strategies
         self._broker = broker
         self.test_data_list = []
+        self.test_stat_list = []
+        self.tested_indices = []
+        self.complete = False
         self.account_factory = account_factory
 
     def adjust_pvalues(self,p_values,fwer_alpha,method='Holm'):
@@ -212,7 +261,52 @@ class MultiStrategyBackTest:
                 t_dat.null_rejected = False
         return adj_p
 
-    def run_bootstrap_all(self,benchmark,fwer_alpha=0.05,method='Holm',test_size_each=5000,t0=None,t1=None):
+    def _run_single(self,strategy,benchmark,test_size_each,t0,t1,bootstrap_method,
+                    seed=None):
+        """ bootstrap a single strategy, returning the backtester used """
+        tester = SingleStrategyBackTest(self._broker,self.account_factory,strategy,
+                                        seed=seed)
+        _ = tester.run_bootstrap(benchmark,test_size=test_size_each,t0=t0,t1=t1,
+                                 bootstrap_method=bootstrap_method)
+        return tester
+
+    def _run_pooled(self,benchmark,test_size_each,t0,t1,bootstrap_method,deadline,n_workers,
+                    seeds):
+        """ bootstrap strategies in a pool of worker threads until deadline
+
+        New strategies are only handed to a worker while there is time left,
+        strategies already running when the deadline passes are allowed to
+        finish.
+
+        Returns:
+            - testers: dictionary, keys are indices of strategies tested,
+                       values the SingleStrategyBackTest used to test them
+        """
+        testers = dict()
+        pending = dict()
+        next_idx = 0
+        n_strats = len(self.strategies)
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            while True:
+                while (next_idx<n_strats and len(pending)<n_workers
+                       and not _out_of_time(deadline)):
+                    print("running backtest on strategy ",next_idx+1," of ",n_strats)
+                    future = pool.submit(self._run_single,
+                                         self.strategies[next_idx],
+                                         benchmark,test_size_each,t0,t1,
+                                         bootstrap_method,seeds[next_idx])
+                    pending[future] = next_idx
+                    next_idx += 1
+                if not pending:
+                    break
+                done,_ = wait(list(pending.keys()),return_when=FIRST_COMPLETED)
+                for future in done:
+                    testers[pending.pop(future)] = future.result()
+        return testers
+
+    def run_bootstrap_all(self,benchmark,fwer_alpha=0.05,method='Holm',test_size_each=5000,t0=None,t1=None,
+                          time_budget=None,n_workers=1,bootstrap_method='resample',
+                          seed=None):
         """ bootstrap evaluation of p-value for all strategies
 
         All the backtesters strategies are used to trade on historical data,
@@ -221,6 +315,12 @@ class MultiStrategyBackTest:
         results of the test of each strategy will be stored in self.testdata, a
         list of TestData objects.
 
+        Strategies are tested in the order they appear in self.strategies. If a
+        time_budget is given and runs out, no further strategies are started,
+        and the results are partial: self.complete will be False, and
+        self.tested_indices holds the indices of strategies that were tested.
+        p-values are then only adjusted over the tests actually performed.
+
         Args:
             - benchmark: a time-series of the price of the benchmark
 
@@ -238,18 +338,52 @@ class MultiStrategyBackTest:
                    will use the brokers first available time. defaults to None.
             - t1: (pandas datetime) time to finish trading the strategy. If None,
                    will use the brokers last available time. defaults to None.
+            - time_budget: (float) wall-clock seconds after which no new
+                           strategies will be tested. If None (default), all
+                           strategies are tested.
+            - n_workers: (int) number of worker threads to test strategies
+                         with. Defaults to 1.
+            - bootstrap_method: 'resample' (default) or 'poisson', see
+                                SingleStrategyBackTest.run_bootstrap
+            - seed: (int, optional) seed of the bootstraps. Each strategy is
+                    bootstrapped with its own random numbers, seeded from
+                    seed (or from numpy's global random state if None), so
+                    that results do not depend on n_workers.
 
         Returns:
-            - adj_p: array of the adjusted p-values for each strategy
+            - adj_p: array of the adjusted p-values for each strategy tested
         """
-        p_values = np.zeros((len(self.strategies),))
-        for i,s in enumerate(self.strategies):
-            print("running backtest on strategy ",i+1," of ",len(self.strategies))
-            tester = SingleStrategyBackTest(self._broker,self.account_factory,s)
-            _ = tester.run_bootstrap(benchmark,test_size=test_size_each,t0=t0,t1=t1)
-            #self.test_data_list.append(copy.deepcopy(tester.testdata))
-            self.test_data_list.append(tester.testdata)
-            p_values[i]=tester.testdata.p_value
+        if seed is None:
+            seeds = np.random.randint(SEED_MAX,size=len(self.strategies))
+        else:
+            seeds = np.random.RandomState(seed).randint(SEED_MAX,size=len(self.strategies))
+        deadline = None
+        if time_budget is not None:
+            deadline = timer.perf_counter()+time_budget
+
+        if n_workers>1:
+            testers = self._run_pooled(benchmark,test_size_each,t0,t1,
+                                       bootstrap_method,deadline,n_workers,seeds)
+        else:
+            testers = dict()
+            for i,s in enumerate(self.strategies):
+                if _out_of_time(deadline):
+                    break
+                print("running backtest on strategy ",i+1," of ",len(self.strategies))
+                testers[i] = self._run_single(s,benchmark,test_size_each,t0,t1,
+                                              bootstrap_method,seeds[i])
+
+        self.tested_indices = sorted(testers.keys())
+        self.complete = len(self.tested_indices)==len(self.strategies)
+        self.test_data_list = [testers[i].testdata for i in self.tested_indices]
+        self.test_stat_list = [testers[i].test_stat for i in self.tested_indices]
+        if not self.complete:
+            warnings.warn("time budget exhausted: only "+str(len(self.tested_indices))
+                          +" of "+str(len(self.strategies))+" strategies tested,"
+                          " results are partial")
+        p_values = np.array([t.p_value for t in self.test_data_list],dtype=np.float64)
+        if len(p_values)==0:
+            return p_values
 
         adj_p = self.adjust_pvals_and_null_rejection(p_values,fwer_alpha,method)
         return adj_p
@@ -265,7 +399,8 @@ class MultiStrategyBackTest:
 
 class ParameterScanBackTest:
     """ Object for backtesting a strategy with many different parameters"""
-    def __init__(self,broker,account_factory,strategy,param_dict):
+    def __init__(self,broker,account_factory,strategy,param_dict,
+                 constraints=None,symmetries=None):
         """ Initialize
 
         Args:
@@ -278,23 +413,38 @@ class ParameterScanBackTest:
                                   strategy.get_parameters().keys()
                           * values: should be a python list of values that the
                                     named parameter should take in backtesting
-                          all combinations of values will be tested.
+                          all combinations of values will be tested, less
+                          those excluded by constraints and symmetries.
+        Keyword Args:
+            - constraints: (optional) list of (a,op,b) constraints on the
+                           parameters, e.g ('sig__indicator__period1','<',
+                           'sig__indicator__period2'). see
+                           systrade.models.base.ParamGrid
+            - symmetries: (optional) list of groups of interchangeable members,
+                          each a tuple of parameter names, see
+                          systrade.models.base.ParamGrid
         """
         self.broker     = broker
         self.strategy   = strategy.clone()
-        self.param_grid = ParamGrid.check_and_create(param_dict,strategy)
+        self.param_grid = ParamGrid.check_and_create(param_dict,strategy,
+                                                     constraints=constraints,
+                                                     symmetries=symmetries)
         self.account_factory = account_factory
 
         self.test_data_list = []
         self.strategy_list  = []
         self.test_stat_list = []
+        self.param_list     = []
+        self.scan_complete  = False
 
         self.succesful_strategies = []
 
         self._best_strategy  = None
         self._best_test_data = None
 
-    def run_bootstrap_all(self,benchmark,fwer_alpha=0.05,method='Holm',test_size_each=5000,t0=None,t1=None):
+    def run_bootstrap_all(self,benchmark,fwer_alpha=0.05,method='Holm',test_size_each=5000,t0=None,t1=None,
+                          time_budget=None,priority=None,n_workers=1,bootstrap_method='resample',
+                          precompute_indicators=False,seed=None):
         """ bootstrap p-value for strategy backtested with all parameter values
 
         All possible version of the strategy determined by param_dict are used
@@ -303,7 +453,12 @@ class ParameterScanBackTest:
 
         results of the test of each strategy will be stored in self.testdata, a
         list of TestData objects, and each of these strategies will be stored in
-        strategy_list.
+        strategy_list, with the parameters used in param_list.
+
+        With a time_budget, parameter sets are tested in order of priority
+        until the budget runs out. Only the strategies actually tested are
+        then kept, self.scan_complete is False, and p-values are adjusted for
+        the FWER over the tests performed only.
 
         Args:
             - benchmark: a time-series of the price of the benchmark
@@ -322,30 +477,133 @@ class ParameterScanBackTest:
                    will use the brokers first available time. defaults to None.
             - t1: (pandas datetime) time to finish trading the strategy. If None,
                    will use the brokers last available time. defaults to None.
+            - time_budget: (float) wall-clock seconds after which no new
+                           parameter sets will be tested. If None (default),
+                           the whole grid is tested.
+            - priority: order in which to test the grid. Either None (default)
+                        for grid order, or a function taking a dictionary of
+                        parameters and returning a sort key, lowest tested
+                        first. See cheapest_first and prior_best_first in this
+                        module.
+            - n_workers: (int) number of worker threads. Defaults to 1.
+            - bootstrap_method: 'resample' (default) or 'poisson', see
+                                SingleStrategyBackTest.run_bootstrap
+            - precompute_indicators: (bool) if True, compute the indicators of
+                                     all strategies in the scan in one pass
+                                     before backtesting, see
+                                     precompute_indicators. Defaults to False.
+            - seed: (int, optional) seed of the bootstraps, see
+                    MultiStrategyBackTest.run_bootstrap_all
 
         Returns:
-            - adj_p: array of the adjusted p-values for each strategy
+            - adj_p: array of the adjusted p-values for each strategy tested
         """
         param_list = list(self.param_grid)
-        num_params = len(param_list)
-        self.strategy_list = []
+        if priority is not None:
+            param_list = sorted(param_list,key=priority)
+        strategy_list = []
         for p in param_list:
             #print("trying params: ",p)
-            tmp_strat = self.strategy.clone()
+            tmp_strat = _fast_clone(self.strategy)
             tmp_strat.set_params(**p)
             #print(tmp_strat.get_params())
-            self.strategy_list.append(tmp_strat)
-        multi_strat_backtester = MultiStrategyBackTest(self.broker,self.account_factory,self.strategy_list)
-        adj_p = multi_strat_backtester.run_bootstrap_all(benchmark,
-                                                        fwer_alpha=fwer_alpha,
-                                                        method=method,
-                                                        test_size_each=test_size_each,
-                                                        t0=t0,
-                                                        t1=t1)
+            strategy_list.append(tmp_strat)
+        multi_strat_backtester = MultiStrategyBackTest(self.broker,self.account_factory,strategy_list)
+        run_kwargs = {'fwer_alpha':fwer_alpha,
+                      'method':method,
+                      'test_size_each':test_size_each,
+                      't0':t0,
+                      't1':t1,
+                      'time_budget':time_budget,
+                      'n_workers':n_workers,
+                      'bootstrap_method':bootstrap_method,
+                      'seed':seed}
+        if precompute_indicators:
+            cache = self.precompute_indicators(strategy_list,t0,t1)
+            with indicators.use_cache(cache):
+                adj_p = multi_strat_backtester.run_bootstrap_all(benchmark,**run_kwargs)
+        else:
+            adj_p = multi_strat_backtester.run_bootstrap_all(benchmark,**run_kwargs)
+        tested = multi_strat_backtester.tested_indices
+        self.param_list = [param_list[i] for i in tested]
+        self.strategy_list = [strategy_list[i] for i in tested]
         self.test_data_list = multi_strat_backtester.test_data_list
-        #self.test_stat_list = [t.adjusted_p_value for t in self.test_data_list]
+        self.test_stat_list = multi_strat_backtester.test_stat_list
+        self.scan_complete = multi_strat_backtester.complete
         return adj_p
 
+    def precompute_indicators(self,strategy_list,t0=None,t1=None):
+        """ compute all MACrossOver indicator variants of a scan in one pass
+
+        Period pairs of every MACrossOver (without a win_type) used by signals
+        of the strategies are collected, and computed from a single cumulative
+        sum of the data the strategies will trade on.
+
+        Args:
+            - strategy_list: list of strategies of the scan
+
+        Keyword Args:
+            - t0: (pandas datetime) time strategies begin trading. If None,
+                   will use the brokers first available time. defaults to None.
+            - t1: (pandas datetime) time strategies finish trading. If None,
+                   will use the brokers last available time. defaults to None.
+
+        Returns:
+            - cache: a systrade.models.indicators.MACrossOverCache, to be used
+                     with systrade.models.indicators.use_cache
+        """
+        t0,t1 = valid_time_window(self.broker,t0,t1)
+        period_pairs = set()
+        for strat in strategy_list:
+            for sig in strat.signal_dict.values():
+                indi = getattr(sig,'indicator',None)
+                if isinstance(indi,indicators.MACrossOver) and indi.win_type is None:
+                    period_pairs.add((indi.period1,indi.period2))
+        stocks_df = self.broker.get_price_list(self.strategy.ticker_list,t0,t1)
+        return indicators.MACrossOverCache(stocks_df,sorted(period_pairs))
+
+    def get_returns_matrix(self):
+        """ get excess returns of all strategies tested as a 2d array
+
+        Returns:
+            - returns: array of shape (n_strategies, n_times), each row the
+                       excess return over the benchmark, per time step, of the
+                       strategy at the same index in strategy_list
+        """
+        if len(self.test_stat_list)<1:
+            raise RuntimeError("run_bootstrap_all must be run before the"
+                               " returns matrix is available")
+        return np.vstack(self.test_stat_list)
+
+    def probability_of_backtest_overfitting(self,n_blocks=16):
+        """ estimate the Probability of Backtest Overfitting (PBO) of the scan
+
+        Uses Combinatorially Symmetric Cross-Validation over the excess returns
+        of all strategies tested, see
+        systrade.backtest.overfitting.probability_of_backtest_overfitting
+
+        Keyword Args:
+            - n_blocks: (even int) number of blocks to split time into for
+                        cross-validation. Defaults to 16 (12,870 splits).
+        Returns:
+            - result: a systrade.backtest.overfitting.CSCVResult object, with
+                      the pbo as member pbo.
+        """
+        returns = self.get_returns_matrix()
+        return overfitting.probability_of_backtest_overfitting(returns,n_blocks)
+
+    def deflated_sharpe_ratio(self):
+        """ Deflated Sharpe Ratio of the best strategy of the scan
+
+        Returns:
+            - (dsr, best_strategy): the deflated sharpe ratio of the strategy
+                                    with the highest Sharpe ratio of excess
+                                    returns, and that strategy object.
+        """
+        returns = self.get_returns_matrix()
+        dsr,best,_ = overfitting.deflated_sharpe_ratio(returns)
+        return dsr,self.strategy_list[best]
+
     # def get_best_strategy_and_testdata(self):
     #     lowest_p = 5e10
     #     #best_ind = 0
@@ -396,14 +654,13 @@ class ParameterScanBackTest:
         # TODO: all params in a seperate df with a different df for params
         # can then join the df's in seperate code to extract whatever the user
         # wants to get out...?
-        param_list = list(self.param_grid)
+        param_list = self.param_list
         rows_as_list = []
 
         if not include_params:
             for td in self.test_data_list:
                 rows_as_list.append(vars(td))
         else:
-            param_list = list(self.param_grid)
             for i in range(len(self.test_data_list)):
                 this_dict = vars(self.test_data_list[i])
                 this_dict['params'] = param_list[i]
@@ -417,6 +674,83 @@ class ParameterScanBackTest:
 
 # ------------------------------------------------------------------------------
 
+def cheapest_first(params):
+    """ priority for a parameter scan: smallest numeric parameters first
+
+    Periods of indicators are the main numeric parameters of models, and
+    the cost of a backtest grows with them (e.g weighted moving averages), so
+    parameter sets with the smallest sum of numeric values are tested first.
+
+    Args:
+        - params: dictionary of parameters of a grid point
+    Returns:
+        - sort key for the grid point
+    """
+    return sum(v for v in params.values()
+               if isinstance(v,(int,float,np.number)) and not isinstance(v,bool))
+
+def prior_best_first(prior_results_df):
+    """ priority for a parameter scan: best in a previous scan first
+
+    Args:
+        - prior_results_df: dataframe of a previous scan, as returned by
+                            ParameterScanBackTest.get_results_df(include_params=True)
+    Returns:
+        - priority: function of a parameter dictionary, giving a sort key such
+                    that parameter sets with the highest previous mean excess
+                    return are tested first, and those not previously tested
+                    are tested last.
+    """
+    prior = dict()
+    for params,mer in zip(prior_results_df['params'],
+                          prior_results_df['mean_excess_return']):
+        prior[_params_key(params)] = mer
+
+    def priority(params):
+        mer = prior.get(_params_key(params))
+        if mer is None or np.isnan(mer):
+            return np.inf
+        return -mer
+    return priority
+
+def valid_time_window(broker,t0,t1):
+    """ get a trading time window within the times available from a broker
+
+    Args:
+        - broker: a systrade.trading.broker object
+        - t0: (pandas datetime) start of window, if None the brokers first time
+        - t1: (pandas datetime) end of window, if None the brokers last time
+    Returns:
+        - (t0,t1): valid window times
+    """
+    start, end = broker.get_firstlast_times()
+
+    if(t0 is None and t1 is None):
+        t0,t1=start,end
+    elif(t0 is None):
+        t0,_=start,end
+    elif(t1 is None):
+        _,t1=start,end
+
+    if t0<start:
+        raise ValueError("t0 too early")
+    if t1>end:
+        raise ValueError("t1 too late")
+
+    return t0,t1
+
+def _fast_clone(strategy):
+    """ clone only the parameter tree of a strategy where it is supported """
+    if hasattr(strategy,'fast_clone'):
+        return strategy.fast_clone()
+    return strategy.clone()
+
+def _params_key(params):
+    return tuple(sorted((k,repr(v)) for k,v in params.items()))
+
+def _out_of_time(deadline):
+    return deadline is not None and timer.perf_counter()>=deadline
+
 def bonferroni_adjust(p_vals,fwer_alpha):
     """ Apply Bonferroni adjustment to list of p-values
 
@@ -0,0 +1,100 @@
+""" bootstrap module provides streaming bootstraps of mean test statistics
+
+The bootstrap in SingleStrategyBackTest resamples indices of the whole test
+statistic series, needing the full series in memory. The Poisson bootstrap
+here instead gives every incoming return a Poisson(1) weight in each of the
+bootstrap replicates, so that each replicate is a running weighted sum. Returns
+can then be fed in chunks as they arrive (e.g live bars, or a long series read
+in pieces) and a p-value is available at any time, without storing the series.
+
+For large samples the Poisson(1) weights approximate the multinomial weights of
+the usual resampling bootstrap, see:
+
+Hanley & MacGibbon, Creating non-parametric bootstrap samples using Poisson
+frequencies, 2006.
+"""
+import copy
+
+import numpy as np
+
+# maximum number of (return x replicate) weights drawn at once
+MAX_WEIGHTS_PER_DRAW = 2**21
+
+
+class PoissonBootstrap:
+    """ Streaming Poisson-weight bootstrap of the mean of a test statistic """
+    def __init__(self,test_size=5000,seed=None):
+        """ initialize
+
+        Keyword Args:
+            - test_size: the number of bootstrap replicates to form the
+                         distribution of the sample mean. Defaults to 5000.
+            - seed: (int, optional) seed for the random weights
+        """
+        if isinstance(test_size,(int,np.integer)) and test_size>0:
+            self.test_size = int(test_size)
+        else:
+            raise ValueError("test_size should be a positive integer")
+        self._rng = np.random.RandomState(seed)
+        self._weighted_sums = np.zeros((self.test_size,))
+        self._weights = np.zeros((self.test_size,))
+        self._sum = 0.0
+        self.n_obs = 0
+
+    def clone(self):
+        return copy.deepcopy(self)
+
+    def update(self,returns):
+        """ add a chunk of returns (test statistics) to the bootstrap
+
+        Args:
+            - returns: 1d array-like of new returns, in time order
+        """
+        x = np.asarray(returns,dtype=np.float64).ravel()
+        if len(x)==0:
+            return
+        if not np.all(np.isfinite(x)):
+            raise ValueError("returns should all be finite")
+        rows_per_draw = max(1,MAX_WEIGHTS_PER_DRAW//self.test_size)
+        for i in range(0,len(x),rows_per_draw):
+            x_i = x[i:i+rows_per_draw]
+            weights = self._rng.poisson(1.0,(len(x_i),self.test_size))
+            self._weighted_sums += x_i@weights
+            self._weights += weights.sum(axis=0)
+        self._sum += x.sum()
+        self.n_obs += len(x)
+
+    @property
+    def mean(self):
+        """ mean of all returns seen so far """
+        if self.n_obs==0:
+            return np.nan
+        return self._sum/self.n_obs
+
+    def get_sample_means(self):
+        """ bootstrap sample means of the mean-adjusted test statistic
+
+        As the mean adjustment is linear, it is applied when requested, so the
+        series mean need not be known while returns are streamed in.
+
+        Returns:
+            - sample_means: array of size test_size
+        """
+        if self.n_obs==0:
+            raise RuntimeError("no returns have been added to the bootstrap")
+        sample_means = np.zeros_like(self._weighted_sums)
+        np.divide(self._weighted_sums,self._weights,out=sample_means,
+                  where=self._weights>0)
+        # replicates with no weight at all have no sample - set to mean
+        sample_means[self._weights==0] = self.mean
+        return sample_means-self.mean
+
+    def get_pval(self):
+        """ p-value of the mean of returns seen so far being > 0 by chance
+
+        Returns:
+            - pval: fraction of bootstrap sample means of the mean-adjusted
+                    test statistic that exceed the observed mean
+        """
+        sample_means = self.get_sample_means()
+        return np.count_nonzero(sample_means>self.mean)/self.test_size
@@ -0,0 +1,191 @@
+""" costs module provides sensitivity of strategies to trading costs
+
+Signals and orders of a strategy do not depend on the costs of trading, only
+the prices orders are filled at do. CostSweep therefore generates the order list
+of a strategy once, and re-prices the fills of those orders for a whole grid
+of broker cost settings (spread, transaction cost and slippage time) at once.
+"""
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import DateOffset
+
+from systrade.backtest.backtests import valid_time_window
+
+MARKET_ORDER_SIGNS = {'buy_market': 1, 'sell_market': -1}
+
+
+class CostSweep:
+    """ Sweep a strategy's performance over a grid of trading cost settings
+
+    Fills are priced as trading.brokers.PaperBroker prices them: an order
+    placed at time t fills at the first available time at or after t plus the
+    slippage time, at that price adjusted by half the spread, paying the
+    transaction cost. Portfolio values follow trading.accounts.BasicAccount with
+    no interest on cash.
+
+    Only market orders are supported. Orders that would not fill before the
+    end of the trading window are never executed (where a broker would raise,
+    the sweep drops the order).
+    """
+    def __init__(self,broker,strategy):
+        """ initialize
+
+        Args:
+            - broker: a systrade.trading.brokers.PaperBroker object
+            - strategy: a systrade.models.strategy object
+        """
+        self._broker = broker
+        self._strategy = strategy.clone()
+        self._order_cache = dict()
+
+    def get_order_list(self,t0,t1):
+        """ get the strategy's order list over a time window, generated once
+
+        Args:
+            - t0: (pandas datetime) first time of the window
+            - t1: (pandas datetime) last time of the window
+        Returns:
+            - order_list: list of order dictionaries, as from the strategy's
+                          get_order_list
+        """
+        if (t0,t1) not in self._order_cache:
+            stocks_df = self._broker.get_price_list(self._strategy.ticker_list,t0,t1)
+            self._order_cache[(t0,t1)] = list(self._strategy.get_order_list(stocks_df))
+        return self._order_cache[(t0,t1)]
+
+    def _orders_to_arrays(self,order_list,tickers):
+        """ convert order dictionaries into arrays of times, tickers, sizes """
+        times = pd.DatetimeIndex([o['time'] for o in order_list])
+        ticker_ids = pd.Index(tickers).get_indexer([o['ticker'] for o in order_list])
+        if np.any(ticker_ids<0):
+            raise ValueError("orders on tickers not available from the broker")
+        signs = np.zeros((len(order_list),))
+        quantities = np.zeros((len(order_list),))
+        for i,o in enumerate(order_list):
+            if o['type'] not in MARKET_ORDER_SIGNS:
+                raise ValueError("CostSweep only supports market orders, got: "
+                                 + str(o['type']))
+            signs[i] = MARKET_ORDER_SIGNS[o['type']]
+            quantities[i] = o['quantity']
+        return times,ticker_ids,signs,quantities
+
+    def _fill_moments(self,prices,times,order_times,ticker_ids,signs,quantities,slippage):
+        """ spread and fee independent parts of value, for one slippage time
+
+        Returns:
+            - (pnl,notional,n_trades): each of shape (2,): at the first, and at
+                                       the last time of the window. pnl is the
+                                       value of the portfolio with zero costs,
+                                       notional the sum of quantity*price of
+                                       fills (cost of unit spread), n_trades
+                                       the number of fills.
+        """
+        exec_idx = times.searchsorted(order_times+slippage,side='left')
+        filled = exec_idx<len(times)
+        exec_idx = exec_idx[filled]
+        ids = ticker_ids[filled]
+        sq = signs[filled]*quantities[filled]
+        fill_prices = prices[exec_idx,ids]
+        fill_quantities = quantities[filled]
+        # fills at the first time are valued at their own (unslipped) price
+        at_first = exec_idx==0
+        pnl = np.array([0.0,np.sum(sq*(prices[-1,ids]-fill_prices))])
+        notional = np.array([np.sum(fill_quantities[at_first]*fill_prices[at_first]),
+                             np.sum(fill_quantities*fill_prices)])
+        n_trades = np.array([np.count_nonzero(at_first),len(exec_idx)],dtype=np.float64)
+        return pnl,notional,n_trades
+
+    def run(self,spread_pcts=None,transaction_costs=None,slippage_times=None,
+            benchmark=None,t0=None,t1=None):
+        """ evaluate the strategy over all combinations of cost settings
+
+        Keyword Args:
+            - spread_pcts: list of spread percentages. If None, the brokers
+                           spread_pct.
+            - transaction_costs: list of costs per transaction. If None, the
+                                 brokers transaction_cost.
+            - slippage_times: list of pandas DateOffset slippage times. If
+                              None, the brokers slippage time.
+            - benchmark: (optional) a time-series of the price of the
+                         benchmark, over the same times as the broker, to
+                         get the mean excess return.
+            - t0: (pandas datetime) time to begin trading the strategy. If None,
+                   will use the brokers first available time. defaults to None.
+            - t1: (pandas datetime) time to finish trading the strategy. If None,
+                   will use the brokers last available time. defaults to None.
+
+        Returns:
+            - results_df: pandas dataframe with a row per cost setting, and
+                          columns:
+                          * slippage_time, spread_pct, transaction_cost: the
+                            cost setting
+                          * total_trades: number of orders filled
+                          * total_fees: total transaction costs paid
+                          * total_pnl: portfolio value at the end of trading
+                          * mean_return: mean return of the portfolio per step
+                          * mean_excess_return: mean_return less that of the
+                            benchmark (NaN if no benchmark given)
+                          * breakeven_transaction_cost: transaction cost at
+                            which total_pnl would be 0, for this spread and
+                            slippage
+                          * breakeven_spread_pct: spread at which total_pnl
+                            would be 0, for this transaction cost and slippage
+        """
+        if spread_pcts is None:
+            spread_pcts = [self._broker.spread_pct]
+        if transaction_costs is None:
+            transaction_costs = [self._broker.transaction_cost]
+        if slippage_times is None:
+            slippage_times = [self._broker._slippage_time]
+        for slip in slippage_times:
+            if not isinstance(slip,DateOffset):
+                raise TypeError("slippage_times should be pandas DateOffsets")
+
+        t0,t1 = valid_time_window(self._broker,t0,t1)
+        tickers = self._broker.get_tick_list()
+        prices_df = self._broker.get_price_list(tickers,t0,t1)
+        times = prices_df.index
+        prices = prices_df.values.astype(np.float64)
+        n_steps = max(len(times)-1,1)
+
+        order_list = self.get_order_list(t0,t1)
+        order_times,ticker_ids,signs,quantities = self._orders_to_arrays(order_list,tickers)
+
+        if benchmark is not None:
+            bm = np.asarray(benchmark,dtype=np.float64)
+            bm_mean = (bm[-1]-bm[0])/max(len(bm)-1,1)
+        else:
+            bm_mean = np.nan
+
+        # spread and cost grid, (n_spread x n_cost), shared by all slippages
+        spread,cost = np.meshgrid(np.asarray(spread_pcts,dtype=np.float64),
+                                  np.asarray(transaction_costs,dtype=np.float64),
+                                  indexing='ij')
+        frames = []
+        for slip in slippage_times:
+            pnl,notional,n_trades = self._fill_moments(prices,times,order_times,
+                                                       ticker_ids,signs,
+                                                       quantities,slip)
+            # value is linear in spread and cost: evaluate on whole grid
+            value_first = pnl[0] - spread/200.0*notional[0] - cost*n_trades[0]
+            value_last  = pnl[1] - spread/200.0*notional[1] - cost*n_trades[1]
+            mean_return = (value_last-value_first)/n_steps
+            with np.errstate(divide='ignore',invalid='ignore'):
+                be_cost = np.where(n_trades[1]>0,
+                                   (pnl[1]-spread/200.0*notional[1])/n_trades[1],
+                                   np.nan)
+                be_spread = np.where(notional[1]>0,
+                                     200.0*(pnl[1]-cost*n_trades[1])/notional[1],
+                                     np.nan)
+            frames.append(pd.DataFrame({
+                'slippage_time': [slip]*spread.size,
+                'spread_pct': spread.ravel(),
+                'transaction_cost': cost.ravel(),
+                'total_trades': np.full((spread.size,),int(n_trades[1])),
+                'total_fees': (cost*n_trades[1]).ravel(),
+                'total_pnl': value_last.ravel(),
+                'mean_return': mean_return.ravel(),
+                'mean_excess_return': (mean_return-bm_mean).ravel(),
+                'breakeven_transaction_cost': be_cost.ravel(),
+                'breakeven_spread_pct': be_spread.ravel()}))
+        return pd.concat(frames,ignore_index=True)
@@ -0,0 +1,235 @@
+""" overfitting module provides tests of backtest overfitting for scans
+
+When many versions of a strategy are backtested, the best performing version
+in-sample is likely to be overfit. The tools here work on a matrix of returns,
+with a row for each strategy tested and a column for each time step:
+
+* probability_of_backtest_overfitting: Combinatorially Symmetric Cross
+  Validation (CSCV) estimate of the Probability of Backtest Overfitting (PBO).
+* deflated_sharpe_ratio: the probability that the best Sharpe ratio found is
+  greater than zero, after deflating for the number of trials made.
+
+Both follow:
+
+The Probability of Backtest Overfitting, Bailey, Borwein, Lopez de Prado &
+Zhu, 2015. https://ssrn.com/abstract=2326253
+
+The Deflated Sharpe Ratio, Bailey & Lopez de Prado, 2014.
+https://ssrn.com/abstract=2460551
+"""
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+from scipy import stats
+
+EULER_MASCHERONI = 0.5772156649015329
+# splits of probability_of_backtest_overfitting are evaluated in chunks of
+# about this many (split, strategy) pairs, to bound memory
+SPLIT_CHUNK_SIZE = 2**20
+
+
+class CSCVResult:
+    """ class to store results of a CSCV overfitting test """
+    def __init__(self):
+        self.pbo=None
+        self.logits=None
+        self.is_best_index=None
+        self.is_performance=None
+        self.oos_performance=None
+        self.n_splits=0
+
+
+@lru_cache(maxsize=8)
+def _partition_matrix(n_blocks):
+    """ get the in-sample block selection of every CSCV partition
+
+    Computed once per number of blocks, as all scans with the same number of
+    blocks share the same combinations.
+
+    Args:
+        - n_blocks: (even int) number of blocks time is split into
+
+    Returns:
+        - partitions: boolean array of shape (n_splits, n_blocks), True where
+                      a block is in the in-sample set of that split.
+    """
+    combs = np.array(list(combinations(range(n_blocks),n_blocks//2)))
+    partitions = np.zeros((len(combs),n_blocks),dtype=bool)
+    partitions[np.arange(len(combs))[:,np.newaxis],combs] = True
+    partitions.setflags(write=False)
+    return partitions
+
+
+def _block_moments(returns,n_blocks):
+    """ sums, squared sums and counts of returns over contiguous time blocks
+
+    Any remainder of the time axis that does not fit into equal blocks is
+    dropped from the start of the series.
+
+    Returns:
+        - (sums, square_sums, counts): arrays of shape (n_strategies,n_blocks)
+                                       and (n_blocks,) for counts
+    """
+    n_times = returns.shape[1]
+    block_len = n_times//n_blocks
+    if block_len<2:
+        raise ValueError("not enough time steps for "+str(n_blocks)+" blocks")
+    trimmed = returns[:,n_times-block_len*n_blocks:]
+    blocks = trimmed.reshape(returns.shape[0],n_blocks,block_len)
+    sums = blocks.sum(axis=2)
+    square_sums = np.einsum('ijk,ijk->ij',blocks,blocks)
+    counts = np.full((n_blocks,),block_len,dtype=np.float64)
+    return sums,square_sums,counts
+
+
+def _sharpe_from_moments(sums,square_sums,counts):
+    """ per-step Sharpe ratio from sums, squared sums and counts
+
+    Strategies with zero variance of returns are given a Sharpe ratio of 0.
+    """
+    means = sums/counts
+    var = (square_sums/counts - means**2)*counts/(counts-1.0)
+    std = np.sqrt(np.clip(var,0.0,None))
+    sharpe = np.zeros_like(means)
+    np.divide(means,std,out=sharpe,where=std>0.0)
+    return sharpe
+
+
+def probability_of_backtest_overfitting(returns,n_blocks=16):
+    """ Probability of Backtest Overfitting via CSCV
+
+    The time axis is split into n_blocks blocks, and every combination of half
+    of those blocks is used as an in-sample set, with the rest as the
+    out-of-sample set. For each split the strategy with the best in-sample
+    Sharpe ratio is found, and its relative rank out-of-sample is recorded. The
+    PBO is the fraction of splits in which the in-sample best strategy ranks
+    at or below the median out-of-sample.
+
+    Splits are evaluated together from per-block moments, so that with 16
+    blocks (12,870 splits) the test takes a fraction of a second for scans of
+    thousands of strategies. Splits are taken in chunks of about
+    SPLIT_CHUNK_SIZE (split, strategy) pairs, and only the in-sample best
+    strategy of each split and its out-of-sample rank are kept, so that memory
+    does not grow with the number of splits.
+
+    Args:
+        - returns: array of shape (n_strategies, n_times) of returns (or excess
+                   returns) of each strategy tested
+
+    Keyword Args:
+        - n_blocks: (even int) number of blocks to split time into. Defaults
+                    to 16.
+
+    Returns:
+        - result: a CSCVResult object, with members:
+                  * pbo: the probability of backtest overfitting
+                  * logits: logit of the out-of-sample relative rank of the
+                            in-sample best strategy, for each split
+                  * is_best_index: index of in-sample best strategy per split
+                  * is_performance: in-sample Sharpe of best strategy per split
+                  * oos_performance: out-of-sample Sharpe of those strategies
+                  * n_splits: number of splits evaluated
+    """
+    returns = np.asarray(returns,dtype=np.float64)
+    if returns.ndim!=2:
+        raise ValueError("returns should be 2d: (strategies x time)")
+    n_strats = returns.shape[0]
+    if n_strats<2:
+        raise ValueError("PBO requires at least 2 strategies")
+    if not isinstance(n_blocks,int) or n_blocks<2 or n_blocks%2!=0:
+        raise ValueError("n_blocks should be an even integer >= 2")
+
+    sums,square_sums,counts = _block_moments(returns,n_blocks)
+    partitions = _partition_matrix(n_blocks).astype(np.float64)
+    n_splits = partitions.shape[0]
+    best = np.zeros((n_splits,),dtype=np.int64)
+    is_best = np.zeros((n_splits,))
+    oos_best = np.zeros((n_splits,))
+    rank = np.zeros((n_splits,))
+    chunk = max(1,SPLIT_CHUNK_SIZE//n_strats)
+    for c0 in range(0,n_splits,chunk):
+        parts = partitions[c0:c0+chunk]
+        # in-sample moments for a chunk of splits: (splits x n_strats)
+        is_sums = parts@sums.T
+        is_square_sums = parts@square_sums.T
+        is_counts = (parts@counts)[:,np.newaxis]
+        # out-of-sample are the complement
+        oos_sums = sums.sum(axis=1)[np.newaxis,:] - is_sums
+        oos_square_sums = square_sums.sum(axis=1)[np.newaxis,:] - is_square_sums
+        oos_counts = counts.sum() - is_counts
+
+        is_sharpe = _sharpe_from_moments(is_sums,is_square_sums,is_counts)
+        oos_sharpe = _sharpe_from_moments(oos_sums,oos_square_sums,oos_counts)
+
+        split_inds = np.arange(parts.shape[0])
+        chunk_best = np.argmax(is_sharpe,axis=1)
+        chunk_oos_best = oos_sharpe[split_inds,chunk_best]
+        # rank (1..N) of the in-sample best out-of-sample, ties take mid-rank
+        below = (oos_sharpe<chunk_oos_best[:,np.newaxis]).sum(axis=1)
+        ties = (oos_sharpe==chunk_oos_best[:,np.newaxis]).sum(axis=1)
+        best[c0:c0+chunk] = chunk_best
+        is_best[c0:c0+chunk] = is_sharpe[split_inds,chunk_best]
+        oos_best[c0:c0+chunk] = chunk_oos_best
+        rank[c0:c0+chunk] = below + 0.5*(ties+1)
+    omega = rank/(n_strats+1.0)
+    logits = np.log(omega/(1.0-omega))
+
+    result = CSCVResult()
+    result.pbo = float(np.mean(logits<=0.0))
+    result.logits = logits
+    result.is_best_index = best
+    result.is_performance = is_best
+    result.oos_performance = oos_best
+    result.n_splits = n_splits
+    return result
+
+
+def deflated_sharpe_ratio(returns):
+    """ Deflated Sharpe Ratio of the best strategy in a scan
+
+    The Sharpe ratio of the best strategy is compared against the expected
+    maximum Sharpe ratio of n_strategies unskilled trials, accounting for the
+    skew and kurtosis of the best strategy's returns, and the length of the
+    series.
+
+    Args:
+        - returns: array of shape (n_strategies, n_times) of returns (or excess
+                   returns) of each strategy tested
+
+    Returns:
+        - (dsr, best_index, sharpe): where dsr is the deflated Sharpe ratio
+                                     (a probability, between 0-1), best_index
+                                     is the index of the strategy with highest
+                                     Sharpe ratio, and sharpe is the array of
+                                     per-step Sharpe ratios of all strategies
+    """
+    returns = np.asarray(returns,dtype=np.float64)
+    if returns.ndim!=2:
+        raise ValueError("returns should be 2d: (strategies x time)")
+    n_strats,n_times = returns.shape
+    if n_times<3:
+        raise ValueError("not enough time steps for a deflated Sharpe ratio")
+
+    counts = np.full((n_strats,),float(n_times))
+    sharpe = _sharpe_from_moments(returns.sum(axis=1),
+                                  (returns**2).sum(axis=1),
+                                  counts)
+    best = int(np.argmax(sharpe))
+    sr_best = sharpe[best]
+
+    if n_strats>1:
+        sr_std = np.std(sharpe,ddof=1)
+        sr0 = sr_std*((1.0-EULER_MASCHERONI)*stats.norm.ppf(1.0-1.0/n_strats)
+                      + EULER_MASCHERONI*stats.norm.ppf(1.0-1.0/(n_strats*np.e)))
+    else:
+        sr0 = 0.0
+
+    skew = stats.skew(returns[best])
+    kurt = stats.kurtosis(returns[best],fisher=False)
+    denom = 1.0 - skew*sr_best + 0.25*(kurt-1.0)*sr_best**2
+    if not np.isfinite(denom) or denom<=0.0:
+        # degenerate (e.g constant) returns
+        denom = 1.0
+    dsr = stats.norm.cdf((sr_best-sr0)*np.sqrt(n_times-1.0)/np.sqrt(denom))
+    return float(dsr),best,sharpe
@@ -0,0 +1,173 @@
+""" subperiods module provides statistics of a backtest over many subperiods
+
+A strategy is traded once over its full time range. Per-step returns are then
+turned into prefix (cumulative) sums, so that the mean and variance of excess
+returns over any (t0, t1) window cost O(1) to evaluate. Maximum drawdowns of a
+window can not be found from prefix sums alone, they are found from a sparse
+table of (max, min, drawdown) over power-of-two blocks of the portfolio value,
+costing O(log n) per window. All windows are evaluated together as arrays.
+
+Note that subperiod statistics are of the full-range trading restricted to
+each window, so positions opened before a window are carried into it - unlike
+re-running the backtest from scratch over the window.
+"""
+import numpy as np
+import pandas as pd
+
+
+class SubperiodStats:
+    """ Statistics of returns over arbitrary windows of a single backtest """
+    def __init__(self,times,portfolio_returns,benchmark_returns=None):
+        """ initialize
+
+        Args:
+            - times: pandas DatetimeIndex of the times of the backtest, one
+                     longer than the returns (returns are between times)
+            - portfolio_returns: array of portfolio returns for each step
+
+        Keyword Args:
+            - benchmark_returns: array of benchmark returns for each step, if
+                                 None excess returns are the portfolio returns
+        """
+        self.times = pd.DatetimeIndex(times)
+        pf_returns = np.asarray(portfolio_returns,dtype=np.float64)
+        if len(pf_returns)!=len(self.times)-1:
+            raise ValueError("returns should have one fewer element than times")
+        if benchmark_returns is None:
+            excess = pf_returns
+        else:
+            excess = pf_returns-np.asarray(benchmark_returns,dtype=np.float64)
+        self._cum_excess = np.concatenate(([0.0],np.cumsum(excess)))
+        self._cum_excess_sq = np.concatenate(([0.0],np.cumsum(excess**2)))
+        # portfolio value relative to its starting value
+        value = np.concatenate(([0.0],np.cumsum(pf_returns)))
+        self._sparse_table = _drawdown_sparse_table(value)
+
+    def window_indices(self,windows):
+        """ convert (t0,t1) windows to first and last indices of self.times
+
+        Args:
+            - windows: list of (t0,t1) tuples of pandas timestamps
+        Returns:
+            - (first,last): integer arrays, of the first and last index of times
+                            within each window
+        """
+        t0s = pd.DatetimeIndex([w[0] for w in windows])
+        t1s = pd.DatetimeIndex([w[1] for w in windows])
+        first = self.times.searchsorted(t0s,side='left')
+        last = self.times.searchsorted(t1s,side='right')-1
+        return first,last
+
+    def window_stats(self,windows):
+        """ get statistics of excess returns over many windows at once
+
+        Args:
+            - windows: list of (t0,t1) tuples of pandas timestamps
+
+        Returns:
+            - stats_df: dataframe with a row per window, with columns t0, t1,
+                        n_steps, total_excess_return, mean_excess_return,
+                        std_excess_return and max_drawdown. Windows with fewer
+                        than 1 step (2 for std) are NaN.
+        """
+        first,last = self.window_indices(windows)
+        n_steps = np.clip(last-first,0,None)
+        # index into prefix sums only for non-empty windows
+        lo = np.minimum(first,len(self.times)-1)
+        hi = np.maximum(lo,np.minimum(last,len(self.times)-1))
+        total = self._cum_excess[hi]-self._cum_excess[lo]
+        total_sq = self._cum_excess_sq[hi]-self._cum_excess_sq[lo]
+        with np.errstate(divide='ignore',invalid='ignore'):
+            mean = np.where(n_steps>0,total/n_steps,np.nan)
+            var = np.where(n_steps>1,(total_sq-n_steps*mean**2)/(n_steps-1),np.nan)
+        std = np.sqrt(np.clip(var,0.0,None))
+        max_dd = _query_drawdown(self._sparse_table,lo,hi)
+        max_dd = np.where(n_steps>0,max_dd,np.nan)
+        return pd.DataFrame({'t0':[w[0] for w in windows],
+                             't1':[w[1] for w in windows],
+                             'n_steps':n_steps,
+                             'total_excess_return':np.where(n_steps>0,total,np.nan),
+                             'mean_excess_return':mean,
+                             'std_excess_return':std,
+                             'max_drawdown':max_dd})
+
+
+def _combine(left,right):
+    """ combine (max,min,drawdown) of two adjacent blocks, left then right """
+    mx_l,mn_l,dd_l = left
+    mx_r,mn_r,dd_r = right
+    return (np.maximum(mx_l,mx_r),
+            np.minimum(mn_l,mn_r),
+            np.maximum(np.maximum(dd_l,dd_r),mx_l-mn_r))
+
+def _drawdown_sparse_table(value):
+    """ (max, min, drawdown) of value over blocks [i,i+2**k), for each level k """
+    table = [(value,value,np.zeros_like(value))]
+    width = 1
+    while 2*width<=len(value):
+        prev = table[-1]
+        n = len(value)-2*width+1
+        left = tuple(a[:n] for a in prev)
+        right = tuple(a[width:width+n] for a in prev)
+        table.append(_combine(left,right))
+        width *= 2
+    return table
+
+def _query_drawdown(table,first,last):
+    """ max drawdown of value between first and last indices (inclusive) """
+    first = np.asarray(first)
+    length = np.asarray(last)-first+1
+    acc = (np.full(first.shape,-np.inf),
+           np.full(first.shape,np.inf),
+           np.zeros(first.shape))
+    pos = first.copy()
+    for k in range(len(table)-1,-1,-1):
+        use = (length>>k)&1==1
+        if not np.any(use):
+            continue
+        idx = pos[use]
+        block = tuple(a[idx] for a in table[k])
+        combined = _combine(tuple(a[use] for a in acc),block)
+        for a,c in zip(acc,combined):
+            a[use] = c
+        pos[use] += 2**k
+    return acc[2]
+
+# ------------------------------------------------------------------------------
+
+def calendar_windows(times,freq='M'):
+    """ windows covering each calendar period (e.g month) of a time index
+
+    Args:
+        - times: pandas DatetimeIndex
+    Keyword Args:
+        - freq: pandas period frequency string, defaults to 'M' (months)
+    Returns:
+        - windows: list of (t0,t1) tuples, the first and last time in each period
+    """
+    times = pd.DatetimeIndex(times)
+    codes = times.to_period(freq).asi8
+    starts = np.flatnonzero(np.concatenate(([True],codes[1:]!=codes[:-1])))
+    ends = np.concatenate((starts[1:],[len(times)]))-1
+    return list(zip(times[starts],times[ends]))
+
+def rolling_windows(times,n_days,step=1):
+    """ windows spanning n_days consecutive trading days of a time index
+
+    Args:
+        - times: pandas DatetimeIndex
+        - n_days: number of trading days (days present in times) per window
+    Keyword Args:
+        - step: number of trading days between window starts (defaults to 1)
+    Returns:
+        - windows: list of (t0,t1) tuples
+    """
+    times = pd.DatetimeIndex(times)
+    days = times.normalize().asi8
+    starts = np.flatnonzero(np.concatenate(([True],days[1:]!=days[:-1])))
+    ends = np.concatenate((starts[1:],[len(times)]))-1
+    n_windows = len(starts)-n_days+1
+    if n_windows<1:
+        return []
+    first_days = np.arange(0,n_windows,step)
+    return list(zip(times[starts[first_days]],times[ends[first_days+n_days-1]]))
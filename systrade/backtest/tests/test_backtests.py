@@ -7,6 +7,7 @@ from systrade.backtest.backtests import ParamGrid
 from systrade.backtest.backtests import SingleStrategyBackTest
 from systrade.backtest.backtests import MultiStrategyBackTest
 from systrade.backtest.backtests import ParameterScanBackTest
+from systrade.backtest.backtests import cheapest_first, prior_best_first
 
 # from systrade.models.strategies import SimpleStrategy
 # from systrade.models.signals import ZeroCrossBuyUpSellDown
@@ -15,6 +16,12 @@ from systrade.backtest.backtests import ParameterScanBackTest
 # from systrade.trading import brokers
 
 from systrade.models.base import BaseStrategy,BaseSignal
+from systrade.models import strategies
+from systrade.models.signals import ZeroCrossBuyUpSellDown
+from systrade.models.indicators import MACrossOver, MACrossOverCache
+from systrade.models.filters import TickerOneToAnotherFilter
+from systrade.trading.brokers import PaperBroker
+from systrade.trading.accounts import BasicAccount, BasicAccountFactory
 
 import copy
 
@@ -98,6 +105,8 @@ class FakeStrategy:
         return copy.deepcopy(self)
 
 FAKE_STRATEGY = FakeStrategy()
+
+FAKE_BENCHMARK = pd.Series(data=[1,2,3,4])
 # ------------------------------------------------------------------------------
 # testing
 
@@ -122,6 +131,64 @@ class TestParamGrid:
                                 {'resampling':5,'sig__indicator':1},
                                 {'resampling':5,'sig__indicator':2}]
 
+    def test_constraints(self):
+        grid = ParamGrid({'p1':[1,2,3,5],'p2':[2,3,5,8],'q':[0,1]},
+                         constraints=[('p1','<','p2'),('q','!=',1)])
+        points = list(grid)
+        assert len(grid)==len(points)==10
+        assert all(p['p1']<p['p2'] and p['q']==0 for p in points)
+        # order of the full grid is kept
+        assert points[:2]==[{'p1':1,'p2':2,'q':0},{'p1':1,'p2':3,'q':0}]
+        with pytest.raises(ValueError):
+            ParamGrid({'p1':[1]},constraints=[('p1','~',2)])
+        with pytest.raises(ValueError):
+            ParamGrid({'p1':[1]},constraints=[('p0','<',2)])
+        with pytest.raises(ValueError):
+            # misspelled parameter name, not a constant
+            ParamGrid({'p1':[1],'p2':[2]},constraints=[('p1','<','p3')])
+        grid = ParamGrid({'win':['hamming','blackman'],'p1':[1,2]},
+                         constraints=[('win','!=','hamming')])
+        assert len(grid)==len(list(grid))==2
+        with pytest.raises(TypeError):
+            ParamGrid({'p1':[1]},constraints=[('p1','<')])
+
+    def test_symmetries(self):
+        periods = [2,3,5,8,13]
+        params = {'a__period1':periods,'a__period2':periods,
+                  'b__period1':periods,'b__period2':periods,'resampling':[1,5]}
+        constraints = [('a__period1','<','a__period2'),
+                       ('b__period1','<','b__period2')]
+        symmetries = [[('a__period1','a__period2'),('b__period1','b__period2')]]
+        grid = ParamGrid(params,constraints=constraints,symmetries=symmetries)
+        points = list(grid)
+        # 10 valid period pairs, taken as unordered pairs of signals
+        assert len(grid)==len(points)==2*55
+        classes = set()
+        for p in points:
+            classes.add((tuple(sorted([(p['a__period1'],p['a__period2']),
+                                       (p['b__period1'],p['b__period2'])])),
+                         p['resampling']))
+        assert len(classes)==len(points)
+        with pytest.raises(ValueError):
+            # constraints not the same for each member
+            ParamGrid(params,constraints=constraints[:1],symmetries=symmetries)
+        with pytest.raises(ValueError):
+            ParamGrid(dict(params,b__period1=[2,3]),symmetries=symmetries)
+
+    def test_len(self):
+        assert len(ParamGrid({}))==len(list(ParamGrid({})))==1
+        grid = ParamGrid({'a':[1,2,3],'b':['x','y'],'c':[1,2,3,4]},
+                         constraints=[('c','>=','a'),('c','<=',3)])
+        assert len(grid)==len(list(grid))==6*2
+        # counted without enumerating the grid
+        big = ParamGrid({'p'+str(i):list(range(10)) for i in range(12)},
+                        constraints=[('p0','<','p1')])
+        assert len(big)==45*10**10
+        # symmetric groups are counted without the full product of the group
+        members = [('p'+str(i),) for i in range(8)]
+        sym = ParamGrid({m[0]:list(range(10)) for m in members},symmetries=[members])
+        assert len(sym)==24310 # 8 of 10 values with repetition
+
 class TestSingleStrategyBacktest:
 
     def test_make_times_valid(self):
@@ -155,3 +222,149 @@ class TestSingleStrategyBacktest:
         bt = SingleStrategyBackTest(FAKE_BROKER,FAKE_ACCOUNT_FACTORY,FAKE_STRATEGY)
         rets = bt.portfolio_to_returns(FAKE_PORTFOLIO_DF)
         assert np.array_equal(rets,np.array([-1,-1,3]))
+
+    def test_run_bootstrap_method(self):
+        bt = SingleStrategyBackTest(FAKE_BROKER,FAKE_ACCOUNT_FACTORY,FAKE_STRATEGY)
+        with pytest.raises(ValueError):
+            bt.run_bootstrap(FAKE_BENCHMARK,test_size=10,bootstrap_method='x')
+        pval = bt.run_bootstrap(FAKE_BENCHMARK,test_size=100,bootstrap_method='poisson')
+        assert 0.0<=pval<=1.0
+        assert np.array_equal(bt.test_stat,np.array([-2,-2,2]))
+
+class ScanStrategy(SimpleStrategy):
+    def run_historical(self,account):
+        pass
+
+SCAN_STRATEGY = ScanStrategy({'sig':SimpleSignal(1)},['tick0'])
+
+class TestMultiStrategyBacktest:
+
+    def test_run_bootstrap_all(self):
+        bt = MultiStrategyBackTest(FAKE_BROKER,FAKE_ACCOUNT_FACTORY,[FAKE_STRATEGY]*3)
+        adj_p = bt.run_bootstrap_all(FAKE_BENCHMARK,test_size_each=10)
+        assert len(adj_p)==3
+        assert bt.complete
+        assert bt.tested_indices==[0,1,2]
+        assert len(bt.test_stat_list)==3
+
+    def test_run_bootstrap_all_workers(self):
+        bt = MultiStrategyBackTest(FAKE_BROKER,FAKE_ACCOUNT_FACTORY,[FAKE_STRATEGY]*5)
+        adj_p = bt.run_bootstrap_all(FAKE_BENCHMARK,test_size_each=10,n_workers=2)
+        assert len(adj_p)==5
+        assert bt.complete
+        assert bt.tested_indices==[0,1,2,3,4]
+
+    def test_run_bootstrap_all_seed(self):
+        bt = MultiStrategyBackTest(FAKE_BROKER,FAKE_ACCOUNT_FACTORY,[FAKE_STRATEGY]*4)
+        adj_p = bt.run_bootstrap_all(FAKE_BENCHMARK,test_size_each=20,seed=1)
+        assert np.array_equal(bt.run_bootstrap_all(FAKE_BENCHMARK,test_size_each=20,
+                                                   n_workers=3,seed=1),adj_p)
+
+    def test_run_bootstrap_all_budget(self):
+        bt = MultiStrategyBackTest(FAKE_BROKER,FAKE_ACCOUNT_FACTORY,[FAKE_STRATEGY]*3)
+        with pytest.warns(UserWarning):
+            adj_p = bt.run_bootstrap_all(FAKE_BENCHMARK,test_size_each=10,time_budget=0.0)
+        assert len(adj_p)==0
+        assert not bt.complete
+        assert bt.tested_indices==[]
+
+class TestParameterScanBacktest:
+
+    def test_priority(self):
+        scan = ParameterScanBackTest(FAKE_BROKER,FAKE_ACCOUNT_FACTORY,SCAN_STRATEGY,
+                                     {'resampling':[7,3,5]})
+        scan.run_bootstrap_all(FAKE_BENCHMARK,test_size_each=10,
+                               priority=cheapest_first)
+        assert scan.scan_complete
+        assert scan.param_list==[{'resampling':3},{'resampling':5},{'resampling':7}]
+        assert [s.resampling for s in scan.strategy_list]==[3,5,7]
+        df = scan.get_results_df(include_params=True)
+        assert list(df['params'])==scan.param_list
+
+        prior = pd.DataFrame({'params':[{'resampling':5},{'resampling':3}],
+                              'mean_excess_return':[2.0,1.0]})
+        scan.run_bootstrap_all(FAKE_BENCHMARK,test_size_each=10,
+                               priority=prior_best_first(prior))
+        assert scan.param_list==[{'resampling':5},{'resampling':3},{'resampling':7}]
+
+    def test_precompute_indicators(self):
+        broker = PaperBroker(pd.DataFrame(data={'tick0':np.arange(20.0),
+                                                'tick1':np.arange(20.0)**2},
+                                          index=pd.date_range(TIME_START,periods=20,freq='1min')))
+        filt = TickerOneToAnotherFilter(['tick0','tick1'],['tick0','tick1'])
+        strat = strategies.SimpleStrategy({'sig':ZeroCrossBuyUpSellDown(MACrossOver(2,5),filt)},
+                                          ['tick0','tick1'])
+        scan = ParameterScanBackTest(broker,FAKE_ACCOUNT_FACTORY,strat,
+                                     {'sig__indicator__period1':[2,3]})
+        strat_list = [strat.clone().set_params(**p) for p in scan.param_grid]
+        cache = scan.precompute_indicators(strat_list)
+        assert len(cache)==2
+        assert cache.lookup(broker.get_price_list(['tick0','tick1'],None,None),3,5) is not None
+
+    def test_precompute_indicators_not_recomputed(self,monkeypatch):
+        # with precomputed indicators, the scan reads every MACrossOver from
+        # the cache rather than computing it per strategy
+        times = pd.date_range(TIME_START,periods=121,freq='1min')
+        data_df = pd.DataFrame(data=100.0+np.random.RandomState(2).normal(0,1,(121,2)).cumsum(axis=0),
+                               index=times,columns=['tick0','tick1'])
+        broker = PaperBroker(data_df)
+        strat = strategies.SimpleStrategy({'sig':ZeroCrossBuyUpSellDown(MACrossOver(2,5),None)},
+                                          ['tick0','tick1'])
+        param_dict = {'sig__indicator__period1':[2,3],
+                      'sig__indicator__period2':[8,10]}
+        counts = {'computed':0,'cache_hits':0}
+        get_indicator_array = MACrossOver.get_indicator_array
+        def counted_array(self,values):
+            counts['computed'] += 1
+            return get_indicator_array(self,values)
+        lookup = MACrossOverCache.lookup
+        def counted_lookup(self,stock_df,period1,period2):
+            indi = lookup(self,stock_df,period1,period2)
+            counts['cache_hits'] += indi is not None
+            return indi
+        monkeypatch.setattr(MACrossOver,'get_indicator_array',counted_array)
+        monkeypatch.setattr(MACrossOverCache,'lookup',counted_lookup)
+        results = []
+        for precompute in [False,True]:
+            counts.update(computed=0,cache_hits=0)
+            scan = ParameterScanBackTest(broker,BasicAccountFactory(),strat,param_dict)
+            adj_p = scan.run_bootstrap_all(data_df['tick0'],test_size_each=50,seed=5,
+                                           precompute_indicators=precompute)
+            results.append((adj_p,dict(counts)))
+        assert results[0][1]['computed']>=4
+        assert results[1][1]=={'computed':0,'cache_hits':results[0][1]['computed']}
+        assert np.array_equal(results[0][0],results[1][0])
+
+    def test_threads_paper_broker(self):
+        # accounts of workers have their own orders, and each strategy its own
+        # random numbers, so threads give the results of a single worker
+        times = pd.date_range(TIME_START,periods=121,freq='1min')
+        data_df = pd.DataFrame(data=100.0+np.random.RandomState(1).normal(0,1,(121,2)).cumsum(axis=0),
+                               index=times,columns=['tick0','tick1'])
+        broker = PaperBroker(data_df)
+        strat = strategies.SimpleStrategy({'sig':ZeroCrossBuyUpSellDown(MACrossOver(2,5),None)},
+                                          ['tick0','tick1'])
+        param_dict = {'sig__indicator__period1':[2,3,4,6],
+                      'sig__indicator__period2':[8,10,12,15]}
+        results = []
+        for n_workers in [1,4]:
+            scan = ParameterScanBackTest(broker,BasicAccountFactory(),strat,param_dict)
+            adj_p = scan.run_bootstrap_all(data_df['tick0'],test_size_each=50,
+                                           n_workers=n_workers,seed=3)
+            results.append((adj_p,[t.total_trades for t in scan.test_data_list]))
+        assert len(results[0][0])==16
+        assert sum(results[0][1])>0
+        assert np.array_equal(results[0][0],results[1][0])
+        assert results[0][1]==results[1][1]
+        account0 = BasicAccountFactory().make_account(broker,times[0],times[-1])
+        account1 = BasicAccount(broker,times[0],times[-1])
+        assert account0.order_manager is not account1.order_manager
+
+    def test_budget(self):
+        scan = ParameterScanBackTest(FAKE_BROKER,FAKE_ACCOUNT_FACTORY,SCAN_STRATEGY,
+                                     {'resampling':[7,3,5]})
+        with pytest.warns(UserWarning):
+            scan.run_bootstrap_all(FAKE_BENCHMARK,test_size_each=10,time_budget=0.0)
+        assert not scan.scan_complete
+        assert scan.param_list==[]
+        assert scan.strategy_list==[]
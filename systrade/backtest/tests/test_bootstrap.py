@@ -0,0 +1,56 @@
+import pytest
+
+import numpy as np
+
+from systrade.backtest.bootstrap import PoissonBootstrap
+
+# ------------------------------------------------------------------------------
+# useful setup
+
+RNG = np.random.RandomState(1)
+RETURNS = RNG.normal(0.0,1.0,2000)
+
+# ------------------------------------------------------------------------------
+# testing
+
+class TestPoissonBootstrap:
+
+    def test_init(self):
+        with pytest.raises(ValueError):
+            PoissonBootstrap(0)
+        with pytest.raises(ValueError):
+            PoissonBootstrap(1.5)
+        boot = PoissonBootstrap(10)
+        with pytest.raises(RuntimeError):
+            boot.get_pval()
+
+    def test_update(self):
+        boot = PoissonBootstrap(100,seed=0)
+        with pytest.raises(ValueError):
+            boot.update([1.0,np.nan])
+        boot.update(RETURNS[:10])
+        boot.update([])
+        assert boot.n_obs==10
+        assert np.isclose(boot.mean,np.mean(RETURNS[:10]))
+
+    def test_chunks_same_as_whole(self):
+        whole = PoissonBootstrap(500,seed=3)
+        whole.update(RETURNS)
+        streamed = PoissonBootstrap(500,seed=3)
+        for chunk in np.array_split(RETURNS,7):
+            streamed.update(chunk)
+        assert np.allclose(whole.get_sample_means(),streamed.get_sample_means())
+        assert whole.get_pval()==streamed.get_pval()
+
+    def test_pval(self):
+        # no edge - p-value should not be small
+        boot = PoissonBootstrap(2000,seed=0)
+        boot.update(RETURNS-np.mean(RETURNS)+0.001)
+        assert boot.get_pval()>0.2
+        # strong edge - p-value should be small
+        boot = PoissonBootstrap(2000,seed=0)
+        boot.update(RETURNS+0.2)
+        assert boot.get_pval()<0.01
+        # spread of bootstrap means should be close to the standard error
+        assert np.isclose(np.std(boot.get_sample_means()),
+                          np.std(RETURNS)/np.sqrt(len(RETURNS)),rtol=0.1)
@@ -0,0 +1,91 @@
+import pytest
+
+import numpy as np
+import pandas as pd
+
+from systrade.backtest.costs import CostSweep
+from systrade.models.base import BaseStrategy
+from systrade.trading.brokers import PaperBroker
+from systrade.trading.accounts import BasicAccount
+from systrade.trading import orders
+
+# ------------------------------------------------------------------------------
+# useful setup
+
+T_START = pd.to_datetime('2019/07/10-09:30:00:000000', format='%Y/%m/%d-%H:%M:%S:%f')
+T_END   = pd.to_datetime('2019/07/10-10:00:00:000000', format='%Y/%m/%d-%H:%M:%S:%f')
+TIMEINDEX = pd.date_range(start=T_START,end=T_END,freq='1min')
+
+RNG = np.random.RandomState(0)
+DATA_DF = pd.DataFrame(data={'tick0':50.0+np.cumsum(RNG.normal(0,1,len(TIMEINDEX))),
+                             'tick1':40.0+np.cumsum(RNG.normal(0,1,len(TIMEINDEX)))},
+                       index=TIMEINDEX)
+
+ORDER_LIST = [{'type':'buy_market','time':T_START,'ticker':'tick0','quantity':2},
+              {'type':'buy_market','time':T_START+pd.DateOffset(minutes=3),'ticker':'tick1','quantity':1},
+              {'type':'sell_market','time':T_START+pd.DateOffset(minutes=10),'ticker':'tick0','quantity':1},
+              {'type':'sell_market','time':T_START+pd.DateOffset(minutes=20),'ticker':'tick1','quantity':3}]
+
+class FixedOrderStrategy(BaseStrategy):
+    def __init__(self,signal_dict,ticker_list,order_list=None):
+        self.order_list = order_list
+        super().__init__(signal_dict,ticker_list)
+
+    def get_order_list(self,stocks_df):
+        return [dict(o) for o in self.order_list]
+
+STRATEGY = FixedOrderStrategy({},['tick0','tick1'],ORDER_LIST)
+
+def run_account(spread,cost,slip):
+    broker = PaperBroker(DATA_DF,slippage_time=slip,transaction_cost=cost,
+                         spread_pct=spread)
+    account = BasicAccount(broker,T_START,T_END,order_manager=orders.OrderManager())
+    STRATEGY.run_historical(account)
+    return account.get_portfolio_df().sum(axis=1).values
+
+# ------------------------------------------------------------------------------
+# testing
+
+class TestCostSweep:
+
+    def test_matches_account(self):
+        sweep = CostSweep(PaperBroker(DATA_DF),STRATEGY)
+        spreads = [0.0,1.0,2.5]
+        costs = [0.0,0.3]
+        slips = [pd.DateOffset(minutes=0),pd.DateOffset(minutes=2)]
+        df = sweep.run(spreads,costs,slips,benchmark=DATA_DF['tick0'])
+        assert len(df)==12
+        for _,row in df.iterrows():
+            values = run_account(row['spread_pct'],row['transaction_cost'],
+                                 row['slippage_time'])
+            assert np.isclose(row['total_pnl'],values[-1])
+            assert np.isclose(row['mean_return'],np.mean(np.diff(values)))
+            bm_mean = np.mean(np.diff(DATA_DF['tick0'].values))
+            assert np.isclose(row['mean_excess_return'],np.mean(np.diff(values))-bm_mean)
+            assert row['total_trades']==4
+            assert np.isclose(row['total_fees'],4*row['transaction_cost'])
+
+    def test_breakeven(self):
+        sweep = CostSweep(PaperBroker(DATA_DF),STRATEGY)
+        df = sweep.run([1.0],[0.0])
+        be_cost = df['breakeven_transaction_cost'].iloc[0]
+        be_df = sweep.run([1.0],[be_cost])
+        assert np.isclose(be_df['total_pnl'].iloc[0],0.0)
+        be_spread = df['breakeven_spread_pct'].iloc[0]
+        be_df = sweep.run([be_spread],[0.0])
+        assert np.isclose(be_df['total_pnl'].iloc[0],0.0)
+
+    def test_unfilled_orders_dropped(self):
+        sweep = CostSweep(PaperBroker(DATA_DF),STRATEGY)
+        df = sweep.run(slippage_times=[pd.DateOffset(minutes=25)])
+        assert df['total_trades'].iloc[0]==2
+
+    def test_bad_orders(self):
+        strat = FixedOrderStrategy({},['tick0'],
+                                   [{'type':'buy_limit','time':T_START,
+                                     'ticker':'tick0','quantity':1,'limit':1.0}])
+        sweep = CostSweep(PaperBroker(DATA_DF),strat)
+        with pytest.raises(ValueError):
+            sweep.run()
+        with pytest.raises(TypeError):
+            CostSweep(PaperBroker(DATA_DF),STRATEGY).run(slippage_times=[1])
@@ -0,0 +1,86 @@
+import pytest
+
+import numpy as np
+
+from systrade.backtest import overfitting
+
+# ------------------------------------------------------------------------------
+# useful setup
+
+RNG = np.random.RandomState(0)
+NOISE = RNG.normal(0.0,1.0,(50,1600))
+
+# one strategy with a persistent edge over all time, the rest noise
+SKILLED = NOISE.copy()
+SKILLED[7] += 0.5
+
+# ------------------------------------------------------------------------------
+# testing
+
+class TestProbabilityOfBacktestOverfitting:
+
+    def test_partitions(self):
+        parts = overfitting._partition_matrix(16)
+        assert parts.shape==(12870,16)
+        assert np.all(parts.sum(axis=1)==8)
+        # every split is unique
+        assert len(set(map(bytes,parts)))==12870
+
+    def test_bad_input(self):
+        with pytest.raises(ValueError):
+            overfitting.probability_of_backtest_overfitting(NOISE[0])
+        with pytest.raises(ValueError):
+            overfitting.probability_of_backtest_overfitting(NOISE[:1])
+        with pytest.raises(ValueError):
+            overfitting.probability_of_backtest_overfitting(NOISE,n_blocks=5)
+        with pytest.raises(ValueError):
+            overfitting.probability_of_backtest_overfitting(NOISE[:,:10],n_blocks=16)
+
+    def test_noise_is_overfit(self):
+        res = overfitting.probability_of_backtest_overfitting(NOISE,n_blocks=16)
+        assert res.n_splits==12870
+        assert len(res.logits)==12870
+        # pure noise - best in-sample is no better than a coin flip out-of-sample
+        assert 0.3<res.pbo<0.7
+
+    def test_skilled_not_overfit(self):
+        res = overfitting.probability_of_backtest_overfitting(SKILLED,n_blocks=8)
+        assert res.pbo==0.0
+        assert np.all(res.is_best_index==7)
+
+    def test_matches_direct_split(self):
+        # check a single split against a direct calculation
+        returns = NOISE[:5,:40]
+        res = overfitting.probability_of_backtest_overfitting(returns,n_blocks=4)
+        parts = overfitting._partition_matrix(4)
+        blocks = np.split(returns,4,axis=1)
+        is_ret = np.concatenate([blocks[i] for i in range(4) if parts[0,i]],axis=1)
+        oos_ret = np.concatenate([blocks[i] for i in range(4) if not parts[0,i]],axis=1)
+        is_sr = is_ret.mean(axis=1)/is_ret.std(axis=1,ddof=1)
+        oos_sr = oos_ret.mean(axis=1)/oos_ret.std(axis=1,ddof=1)
+        assert res.is_best_index[0]==np.argmax(is_sr)
+        assert np.isclose(res.oos_performance[0],oos_sr[np.argmax(is_sr)])
+
+    def test_chunked_splits(self,monkeypatch):
+        # splits evaluated a few at a time give the same result as all at once
+        expected = overfitting.probability_of_backtest_overfitting(NOISE,n_blocks=8)
+        monkeypatch.setattr(overfitting,'SPLIT_CHUNK_SIZE',7*len(NOISE))
+        found = overfitting.probability_of_backtest_overfitting(NOISE,n_blocks=8)
+        assert found.pbo==expected.pbo
+        assert np.array_equal(found.is_best_index,expected.is_best_index)
+        assert np.array_equal(found.logits,expected.logits)
+        assert np.allclose(found.is_performance,expected.is_performance)
+        assert np.allclose(found.oos_performance,expected.oos_performance)
+
+
+class TestDeflatedSharpeRatio:
+
+    def test_skilled(self):
+        dsr,best,sharpe = overfitting.deflated_sharpe_ratio(SKILLED)
+        assert best==7
+        assert len(sharpe)==50
+        assert dsr>0.99
+
+    def test_noise(self):
+        dsr,best,sharpe = overfitting.deflated_sharpe_ratio(NOISE)
+        assert dsr<0.95
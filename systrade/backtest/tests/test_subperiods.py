@@ -0,0 +1,72 @@
+import pytest
+
+import numpy as np
+import pandas as pd
+
+from systrade.backtest import subperiods
+
+# ------------------------------------------------------------------------------
+# useful setup
+
+DAY_TIMES = [pd.date_range(d+' 09:30',d+' 16:00',freq='30min')
+             for d in ['2019-07-30','2019-07-31','2019-08-01','2019-08-02']]
+TIMES = DAY_TIMES[0].append(DAY_TIMES[1:])
+
+RNG = np.random.RandomState(0)
+PF_RETURNS = RNG.normal(0.0,1.0,len(TIMES)-1)
+BM_RETURNS = RNG.normal(0.0,1.0,len(TIMES)-1)
+
+def direct_stats(t0,t1):
+    inds = np.flatnonzero((TIMES>=t0)&(TIMES<=t1))
+    a,b = inds[0],inds[-1]
+    excess = (PF_RETURNS-BM_RETURNS)[a:b]
+    value = np.concatenate(([0.0],np.cumsum(PF_RETURNS)))[a:b+1]
+    dd = np.max(np.maximum.accumulate(value)-value)
+    return excess,dd
+
+# ------------------------------------------------------------------------------
+# testing
+
+class TestSubperiodStats:
+
+    def test_init(self):
+        with pytest.raises(ValueError):
+            subperiods.SubperiodStats(TIMES,PF_RETURNS[1:])
+
+    def test_window_stats(self):
+        stats = subperiods.SubperiodStats(TIMES,PF_RETURNS,BM_RETURNS)
+        windows = [(TIMES[i],TIMES[j]) for i in range(0,len(TIMES),3)
+                   for j in range(i+2,len(TIMES),5)]
+        df = stats.window_stats(windows)
+        assert len(df)==len(windows)
+        for (t0,t1),(_,row) in zip(windows,df.iterrows()):
+            excess,dd = direct_stats(t0,t1)
+            assert row['n_steps']==len(excess)
+            assert np.isclose(row['total_excess_return'],np.sum(excess))
+            assert np.isclose(row['mean_excess_return'],np.mean(excess))
+            assert np.isclose(row['std_excess_return'],np.std(excess,ddof=1))
+            assert np.isclose(row['max_drawdown'],dd)
+
+    def test_empty_window(self):
+        stats = subperiods.SubperiodStats(TIMES,PF_RETURNS)
+        df = stats.window_stats([(TIMES[0]+pd.DateOffset(minutes=1),
+                                  TIMES[0]+pd.DateOffset(minutes=2))])
+        assert df['n_steps'].iloc[0]==0
+        assert np.isnan(df['mean_excess_return'].iloc[0])
+        assert np.isnan(df['max_drawdown'].iloc[0])
+
+
+class TestWindows:
+
+    def test_calendar_windows(self):
+        windows = subperiods.calendar_windows(TIMES,'M')
+        assert windows==[(DAY_TIMES[0][0],DAY_TIMES[1][-1]),
+                         (DAY_TIMES[2][0],DAY_TIMES[3][-1])]
+
+    def test_rolling_windows(self):
+        windows = subperiods.rolling_windows(TIMES,2)
+        assert windows==[(DAY_TIMES[0][0],DAY_TIMES[1][-1]),
+                         (DAY_TIMES[1][0],DAY_TIMES[2][-1]),
+                         (DAY_TIMES[2][0],DAY_TIMES[3][-1])]
+        assert subperiods.rolling_windows(TIMES,2,step=2)==[windows[0],windows[2]]
+        assert subperiods.rolling_windows(TIMES,5)==[]
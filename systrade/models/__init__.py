@@ -1,4 +1,8 @@
-__all__=['filters',
+__all__=['events',
+         'features',
+         'filters',
+         'kernels',
          'indicators',
          'signals',
+         'sparse',
          'strategies']
@@ -50,28 +50,44 @@ This module is in no way endorsed by scikit-learn.
 
 import inspect
 import copy
+import operator
+import numpy as np
+import pandas as pd
 from collections import defaultdict
 from itertools import product
 
 from abc import ABC,abstractmethod
 
+from . import filters
+from . import sparse
+from . import graph
+from systrade.trading import orders
+
+# names of parameters of each parameterized class
+_PARAM_NAMES = dict()
+
 class BaseParameterizedObject:
     """ Base object for parametrized objects in models """
     @classmethod
     def _get_param_names(cls):
         """ get names of parameters of the object """
-        init_signature = inspect.signature(cls.__init__)
-        parameters = [p for p in init_signature.parameters.values()
-                      if p.name != 'self' and p.kind != p.VAR_KEYWORD]
-        # n.b VAR_KEYWORD meaansL A dict of keyword arguments that aren’t bound
-        # to any other parameter. This corresponds to a **kwargs parameter in a
-        # Python function definition.
-        for p in parameters:
-            # check if parameter kinds was of *args type (VAR_POSITIONAL)
-            if p.kind == p.VAR_POSITIONAL:
-                raise RuntimeError("systrade.models parametrized objects should"
-                                    "not use *args, or **kwargs in their init")
-        return sorted([p.name for p in parameters])
+        names = _PARAM_NAMES.get(cls)
+        if names is None:
+            init_signature = inspect.signature(cls.__init__)
+            parameters = [p for p in init_signature.parameters.values()
+                          if p.name != 'self' and p.kind != p.VAR_KEYWORD]
+            # n.b VAR_KEYWORD meaansL A dict of keyword arguments that aren’t bound
+            # to any other parameter. This corresponds to a **kwargs parameter in a
+            # Python function definition.
+            for p in parameters:
+                # check if parameter kinds was of *args type (VAR_POSITIONAL)
+                if p.kind == p.VAR_POSITIONAL:
+                    raise RuntimeError("systrade.models parametrized objects should"
+                                        "not use *args, or **kwargs in their init")
+            # signatures do not change, so names are found once per class
+            names = tuple(sorted([p.name for p in parameters]))
+            _PARAM_NAMES[cls] = names
+        return list(names)
 
     def get_params(self,deep=True):
         """ get parameters of the object
@@ -107,24 +123,43 @@ class BaseParameterizedObject:
         Args:
             - **params: keyword parameter name, value pairs.
         """
-        valid_params=self.get_params(deep=True)
+        valid_names=self._get_param_names()
         nested_params=defaultdict(dict)
         for key,value in params.items():
-            if key not in valid_params:
-                raise ValueError("Cannot set a parameter that does not exist")
             key,delim,subkey = key.partition('__')
+            if key not in valid_names:
+                raise ValueError("Cannot set a parameter that does not exist")
             if delim: #i.e string was able to be split be the delimiter
                     nested_params[key][subkey]=value
             else:
                 setattr(self,key,value)
 
         for key, sub_params in nested_params.items():
-            valid_params[key].set_params(**sub_params)
+            # nested objects validate their own parameter names
+            sub_object = getattr(self,key)
+            if not hasattr(sub_object,'set_params'):
+                raise ValueError("Cannot set a parameter that does not exist")
+            sub_object.set_params(**sub_params)
 
     def clone(self):
         """ clone (deep copy) the object"""
         return copy.deepcopy(self)
 
+    def fast_clone(self):
+        """ clone the parameter tree of the object, sharing all other members
+
+        Parameters that are parameterized objects are themselves fast cloned,
+        so that set_params on the clone does not change the original. Other
+        members (e.g filters, ticker lists, data) are shared with the original,
+        and should be treated as immutable.
+        """
+        new = copy.copy(self)
+        for key in self._get_param_names():
+            value = getattr(self,key,None)
+            if isinstance(value,BaseParameterizedObject):
+                setattr(new,key,value.fast_clone())
+        return new
+
 
 class BaseIndicator(BaseParameterizedObject,ABC):
     """ Abstract base class for indicators """
@@ -144,6 +179,108 @@ class BaseIndicator(BaseParameterizedObject,ABC):
         """
         pass
 
+    def get_indicator_array(self,x):
+        """ apply indicator to an array of stock(s) prices
+
+        Indicators built on systrade.models.kernels override this to skip
+        dataframe construction, by default get_indicator is used.
+
+        Args:
+            - x: array of prices (time x tickers)
+
+        Returns:
+            - indi: array of the indicator (time x tickers)
+        """
+        return np.asarray(self.get_indicator(pd.DataFrame(x)).values)
+
+    def get_indicator_at(self,stock_df,rows,cols):
+        """ apply indicator to stock(s), at given times and tickers only
+
+        Indicators that can be found at a point without the full history of
+        the indicator (e.g moving averages from cumulative sums) override this
+        to skip the other points, by default get_indicator is used.
+
+        Args:
+            - stock_df: dataframe of stock(s), indexed by time
+            - rows: integer array of the index into time of each point
+            - cols: integer array of the index into tickers of each point
+
+        Returns:
+            - values: array of the indicator at each point, equal to
+                      get_indicator(stock_df).values[rows,cols]
+        """
+        indi = np.asarray(self.get_indicator(stock_df))
+        if indi.ndim==1:
+            indi = indi[:,np.newaxis]
+        return indi[rows,cols]
+
+    def from_intermediates(self,inter):
+        """ apply indicator given intermediates shared with other indicators
+
+        Indicators built on systrade.models.kernels override this to use the
+        memoised arrays of inter, by default get_indicator_array is used.
+
+        Args:
+            - inter: a models.indicators.SharedIntermediates of the prices
+
+        Returns:
+            - indi: array of the indicator (time x tickers)
+        """
+        return np.asarray(self.get_indicator_array(inter.x)).reshape(inter.x.shape)
+
+
+
+class BaseIncrementalIndicator(BaseIndicator):
+    """ Abstract base class for indicators that can be updated bar by bar
+
+    As well as get_indicator on a full history, incremental indicators keep a
+    state that is updated with one bar (prices of all tickers at one time) at
+    a time, for live use. The state is a dictionary of numpy arrays and
+    numbers, so that it can be saved and restored with get_state/set_state.
+    """
+    @abstractmethod
+    def init_state(self,n_tickers):
+        """ initialize state to be updated, bar by bar, for a set of tickers
+
+        Args:
+            - n_tickers: number of tickers in each bar (or list of tickers)
+
+        Returns:
+            - state: the initial state dictionary
+        """
+        pass
+
+    @abstractmethod
+    def update(self,bar):
+        """ update the state with the next bar, and get the indicator value
+
+        Args:
+            - bar: array of prices of each ticker at the next time
+
+        Returns:
+            - value: array of the indicator for each ticker at the time of this
+                     bar, as get_indicator would give for that time
+        """
+        pass
+
+    def get_state(self):
+        """ get a copy of the current state dictionary """
+        if getattr(self,'_state',None) is None:
+            raise RuntimeError("state of indicator has not been initialized")
+        return copy.deepcopy(self._state)
+
+    def fast_clone(self):
+        """ clone the parameter tree of the object, see
+        BaseParameterizedObject.fast_clone. Any state is copied, not shared.
+        """
+        new = super().fast_clone()
+        if hasattr(self,'_state'):
+            new._state = copy.deepcopy(self._state)
+        return new
+
+    def set_state(self,state):
+        """ set the state dictionary, e.g from a previous get_state() """
+        self._state = copy.deepcopy(state)
 
 class BaseSignal(BaseParameterizedObject,ABC):
     """ Abstract Base Class  for signal objects
@@ -164,8 +301,6 @@ class BaseSignal(BaseParameterizedObject,ABC):
             self.filter  = filter
         else:
             self.filter  = filter.clone()
-        param_dict=self.get_params()
-        print("signal: ",param_dict)
 
     @abstractmethod
     def request_historical(self,stocks_df,signal_name):
@@ -183,6 +318,90 @@ class BaseSignal(BaseParameterizedObject,ABC):
         """
         pass
 
+    def input_frame(self,stocks_df):
+        """ select the data this signal's indicator is applied to
+
+        The filter is compiled against the columns of stocks_df (see
+        models.filters.CompiledFilter), so that the selection shares the
+        memory of stocks_df where possible.
+
+        Args:
+            - stocks_df: pandas dataframe of stock prices, indexed by time
+        Returns:
+            - stock_df: dataframe of the tickers selected by the filter's
+                        apply_in (all of stocks_df if there is no filter)
+        """
+        if not isinstance(stocks_df,pd.DataFrame):
+            raise TypeError("stocks_df must be a pandas DataFrame")
+        if self.filter is not None and not hasattr(self.filter,'compile'):
+            stock_df = self.filter.apply_in(stocks_df) # new df, not overwritten
+            if isinstance(stock_df,pd.Series):
+                stock_df = stock_df.to_frame()
+            return stock_df
+        compiled = filters.compile_filter(self.filter,stocks_df.columns.to_list())
+        return compiled.select_df(stocks_df)
+
+    def signals_from_indicator(self,indi,times,columns,signal_name='signal'):
+        """ find signals from this signal's indicator, already computed
+
+        Signals that override this can share their indicator with other
+        signals, when compiled into a models.graph.SignalGraph. By default
+        signals are not split into indicator and signal steps.
+
+        Args:
+            - indi: array of the indicator (time x columns), as from the
+                    indicator's get_indicator applied to input_frame(stocks_df)
+            - times: pandas DatetimeIndex of the indicator
+            - columns: list of tickers of the columns of indi
+            - signal_name: a name to give this signal
+        Returns:
+            - signals: a models.sparse.SparseSignals object
+        """
+        raise NotImplementedError("signal does not find signals from a "
+                                  "precomputed indicator")
+
+    def request_historical_sparse(self,stocks_df,signal_name='signal'):
+        """ use historical data to get signals in compact form
+
+        Signals should override this when they can find signals directly in
+        compact form. By default, the output of request_historical is converted.
+
+        Args:
+            - stocks_df: pandas dataframe of stock prices, indexed by time
+            - signal_name: a name to give this signal
+        Returns:
+            - signals: a models.sparse.SparseSignals object, with tickers being
+                       the tickers that the signal considers, and values +/-1
+                       for a buy/sell signal.
+        """
+        signal_dict = self.request_historical(stocks_df,signal_name)
+        if isinstance(signal_dict,sparse.SparseSignals):
+            return signal_dict
+        if isinstance(signal_dict,sparse.SignalDictView):
+            return signal_dict.sparse
+        return sparse.SparseSignals.from_dict(signal_dict,stocks_df.index,
+                                              name=signal_name)
+
+    def init_live(self,tickers):
+        """ initialize signals to be updated bar by bar, e.g for live trading
+
+        Args:
+            - tickers: list of tickers of each bar given to update_live
+        """
+        raise NotImplementedError("signal does not support bar by bar updates")
+
+    def update_live(self,bar):
+        """ update with the next bar, and get signals at that bar's time
+
+        Args:
+            - bar: array of prices of the tickers given to init_live, at the
+                   next time
+        Returns:
+            - (tickers,values): list of tickers with a signal at this bar, and
+                                array of their values, +/-1 for buy/sell
+        """
+        raise NotImplementedError("signal does not support bar by bar updates")
+
     def _get_params(self,deep=True):
         """ get parameters of this signal """
         out_dict = super().get_params(deep)
@@ -295,6 +514,17 @@ class BaseStrategy(BaseParameterizedObject,ABC):
         return self
 
 
+    def fast_clone(self):
+        """ clone the parameter tree of the strategy and its signals
+
+        See BaseParameterizedObject.fast_clone. The signal_dict is copied, with
+        each signal fast cloned, while the ticker_list is shared.
+        """
+        new = super().fast_clone()
+        new.signal_dict = {name:sig.fast_clone()
+                           for name,sig in self.signal_dict.items()}
+        return new
+
     def signal_requests(self,stocks_df):
         """ returns dictionary with a list of requests for each ticker (key)
 
@@ -319,10 +549,43 @@ class BaseStrategy(BaseParameterizedObject,ABC):
         # each signal in the signal dictionary oif this strategy
         for sig_name,sig in self.signal_dict.items():
             these_reqs = sig.request_historical(stocks_df,signal_name=sig_name)
+            if isinstance(these_reqs,sparse.SparseSignals):
+                these_reqs = these_reqs.as_dict()
             for ticker in these_reqs:
                 requests_dict[ticker].append(these_reqs[ticker])
         return requests_dict
 
+    def compile(self,stocks_df):
+        """ compile the strategy's signals into a graph of indicators/signals
+
+        Args:
+            - stocks_df: dataframe of tickers value over time
+        Returns:
+            - signal_graph: a models.graph.SignalGraph, see
+                            models.graph.compile_strategy
+        """
+        return graph.compile_strategy(self,stocks_df)
+
+    def sparse_signal_requests(self,stocks_df,n_workers=1):
+        """ returns all signals of the strategy, merged in compact form
+
+        As signal_requests, without making a dataframe per ticker and signal.
+        Signals are evaluated through the compiled signal graph (see compile),
+        so indicators and signals shared by several signals are found once.
+
+        Args:
+            - stocks_df: dataframe of tickers value over time
+        Keyword Args:
+            - n_workers: number of threads to evaluate independent indicators
+                         and signals with (defaults to 1)
+
+        Returns:
+            - signals: a models.sparse.SparseSignals object, with tickers being
+                       the strategy's ticker_list, holding the signals of all
+                       signals of the strategy (+/-1 where a signal is found).
+        """
+        return self.compile(stocks_df).evaluate(stocks_df,n_workers=n_workers)
+
     @abstractmethod
     def get_order_list(self,stocks_df):
         """ compulsory method for inherited classes to get a list of orders
@@ -332,6 +595,45 @@ class BaseStrategy(BaseParameterizedObject,ABC):
         """
         pass
 
+    def get_order_batch(self,stocks_df):
+        """ get the orders of get_order_list as a columnar batch
+
+        Strategies that can generate orders as arrays should override this, by
+        default the output of get_order_list is converted.
+
+        Returns:
+            - batch: a trading.orders.OrderBatch of order requests
+        """
+        return orders.OrderBatch.from_order_list(self.get_order_list(stocks_df))
+
+    def init_live(self):
+        """ initialize the strategy to consume bars one at a time
+
+        Strategies that can run on a live feed (see trading.live.LiveRunner)
+        override init_live, update_live and flush_live.
+        """
+        raise NotImplementedError("strategy does not support bar by bar updates")
+
+    def update_live(self,time,bar):
+        """ update with the next bar, and get orders to place at that time
+
+        Args:
+            - time: (pandas timestamp) time of the bar
+            - bar: array of prices of each ticker of ticker_list at time
+        Returns:
+            - order_list: list of order dictionaries (see get_order_list) ready
+                          to be placed after this bar
+        """
+        raise NotImplementedError("strategy does not support bar by bar updates")
+
+    def flush_live(self):
+        """ get orders still pending when the feed ends
+
+        Returns:
+            - order_list: list of order dictionaries
+        """
+        return []
+
     def risk_check_cancellations(self,account):
         """ cancel orders that are active but no longer wanted """
         pass
@@ -344,6 +646,19 @@ class BaseStrategy(BaseParameterizedObject,ABC):
         """ place/cancel orders to optimize portfolio """
         pass
 
+    def place_historical_orders(self,account,stocks_df):
+        """ place the strategy's orders on historical data with an account
+
+        Args:
+            - account: A tradings.account object that handles order placement
+            - stocks_df: dataframe of tickers values indexed by time
+        """
+        if hasattr(account,'place_historical_order_batch'):
+            account.place_historical_order_batch(self.get_order_batch(stocks_df))
+        else:
+            for o in self.get_order_list(stocks_df):
+                account.place_historical_order(**o)
+
     def run_historical(self,account):
         """ run historical trading
 
@@ -351,11 +666,7 @@ class BaseStrategy(BaseParameterizedObject,ABC):
             - account: A tradings.account object that handles order placement
         """
         stocks_df = account.get_data(self.ticker_list)
-        order_list = self.get_order_list(stocks_df)
-        # placed_orders = dict()
-        for o in order_list:
-            account.place_historical_order(**o)
-        #     placed_orders[id] = o
+        self.place_historical_orders(account,stocks_df)
 
         alltimes = copy.deepcopy(account.times)
         for t_idx,t_val in alltimes.iteritems():
@@ -373,22 +684,125 @@ class BaseStrategy(BaseParameterizedObject,ABC):
         return "Strategy with params : " + str(self.get_params())
 
 
+# comparison operators of ParamGrid constraints, and each with sides swapped
+CONSTRAINT_OPS = {'<':operator.lt,'<=':operator.le,'>':operator.gt,
+                  '>=':operator.ge,'==':operator.eq,'!=':operator.ne}
+_SWAPPED_OPS = {'<':'>','<=':'>=','>':'<','>=':'<=','==':'==','!=':'!='}
+
+
 class ParamGrid:
-    """ class to store a grid of parameters """
-    def __init__(self,param_dict):
+    """ class to store a grid of parameters
+
+    Points of the grid are all combinations of the values of each parameter,
+    less those excluded by constraints and symmetries:
+
+    - constraints: tuples (a,op,b) of a parameter name, a comparison operator
+      (one of CONSTRAINT_OPS) and a parameter name or a constant, e.g
+      ('sig__indicator__period1','<','sig__indicator__period2'). Points where
+      a constraint is False are skipped. A string b that is not a parameter
+      name is taken as a constant only if all values of a are strings, so that
+      a misspelled parameter name is an error.
+    - symmetries: groups of interchangeable members, each member a tuple of
+      parameter names, e.g [('sig0__indicator__period1','sig0__indicator__period2'),
+      ('sig1__indicator__period1','sig1__indicator__period2')] for two signals
+      whose settings may be swapped. Of points differing only by a permutation
+      of the members' values, only the one with members in order of their
+      values' positions in the value lists is kept. Corresponding parameters
+      of the members should take the same values, and constraints should be
+      the same for each member.
+
+    Points are generated in the order of the full grid, checking each
+    constraint as soon as its parameters are set, so that skipped points cost
+    nothing. The number of points is found without enumerating the grid:
+    parameters linked by constraints or symmetries are counted together, by
+    the same pruned search over their values, and the counts of independent
+    groups multiplied.
+    """
+    def __init__(self,param_dict,constraints=None,symmetries=None):
         """ initialize
 
         Args:
             - param_dict: a dictionary of parameters, keys as their names, with
                           values being lists of values the parameter should take
+        Keyword Args:
+            - constraints: (optional) list of (a,op,b) constraints
+            - symmetries: (optional) list of symmetry groups, each a list of
+                          members (tuples of parameter names)
         """
         if isinstance(param_dict,dict):
             self.param_dict = param_dict
         else:
             raise TypeError("param_dict should be a dictionary")
+        self.constraints = self._check_constraints(constraints)
+        self.symmetries = self._check_symmetries(symmetries)
+        self._check_invariance()
+
+    def _check_constraints(self,constraints):
+        checked = []
+        for c in ([] if constraints is None else constraints):
+            if not isinstance(c,(tuple,list)) or len(c)!=3:
+                raise TypeError("constraints should be (a,op,b) tuples")
+            a,op,b = c
+            if a not in self.param_dict:
+                raise ValueError(str(a)+" of a constraint is not a parameter of the grid")
+            if op not in CONSTRAINT_OPS:
+                raise ValueError("constraint operators should be one of: "
+                                 +str(list(CONSTRAINT_OPS.keys())))
+            if (isinstance(b,str) and b not in self.param_dict
+                    and not all(isinstance(v,str) for v in self.param_dict[a])):
+                raise ValueError(str(b)+" of a constraint is not a parameter of the grid")
+            checked.append((a,op,b))
+        return checked
+
+    def _check_symmetries(self,symmetries):
+        checked = []
+        for group in ([] if symmetries is None else symmetries):
+            members = [(m,) if isinstance(m,str) else tuple(m) for m in group]
+            if len(members)<2:
+                raise ValueError("symmetry groups should have at least 2 members")
+            for m in members:
+                if len(m)!=len(members[0]):
+                    raise ValueError("members of a symmetry group should have "
+                                     "the same number of parameters")
+                for name,first in zip(m,members[0]):
+                    if name not in self.param_dict:
+                        raise ValueError(str(name)+" of a symmetry is not a "
+                                         "parameter of the grid")
+                    if list(self.param_dict[name])!=list(self.param_dict[first]):
+                        raise ValueError("parameters of members of a symmetry "
+                                         "group should take the same values")
+            names = [n for m in members for n in m]
+            if len(set(names))!=len(names):
+                raise ValueError("a parameter appears more than once in a symmetry group")
+            checked.append(members)
+        return checked
+
+    def _is_param(self,b):
+        return isinstance(b,str) and b in self.param_dict
+
+    def _normed(self,constraint):
+        """ constraint with its parameter names in a fixed order """
+        a,op,b = constraint
+        if self._is_param(b) and b<a:
+            return (b,_SWAPPED_OPS[op],a)
+        return (a,op,b)
+
+    def _check_invariance(self):
+        """ check that swapping any two members of a symmetry group maps the
+        constraints onto themselves """
+        normed = set(self._normed(c) for c in self.constraints)
+        for members in self.symmetries:
+            for m0,m1 in zip(members[:-1],members[1:]):
+                swap = dict(zip(m0,m1))
+                swap.update(zip(m1,m0))
+                for a,op,b in normed:
+                    mapped = (swap.get(a,a),op,swap.get(b,b) if self._is_param(b) else b)
+                    if self._normed(mapped) not in normed:
+                        raise ValueError("constraints should be the same for each "
+                                         "member of a symmetry group")
 
     @classmethod
-    def check_and_create(cls,param_dict,strategy):
+    def check_and_create(cls,param_dict,strategy,constraints=None,symmetries=None):
         """ check if pd is a dictionary with allowed parameters """
         for key,value in param_dict.items():
             if not isinstance(value,list):
@@ -398,24 +812,92 @@ class ParamGrid:
         for p in param_dict.keys():
             if p not in valid_params:
                 raise ValueError(p," is not a valid parameter of strategy to be set")
-        return cls(param_dict)
+        return cls(param_dict,constraints=constraints,symmetries=symmetries)
+
+    def _checks(self,keys):
+        """ checks of points as functions of value indices, with the names of
+        the parameters each depends on """
+        values = {k:list(self.param_dict[k]) for k in keys}
+        checks = []
+        for a,op,b in self.constraints:
+            compare = CONSTRAINT_OPS[op]
+            if self._is_param(b):
+                checks.append(((a,b),lambda ia,ib,a=a,b=b,compare=compare:
+                                      compare(values[a][ia],values[b][ib])))
+            else:
+                checks.append(((a,),lambda ia,a=a,b=b,compare=compare:
+                                     compare(values[a][ia],b)))
+        for members in self.symmetries:
+            n = len(members[0])
+            for m0,m1 in zip(members[:-1],members[1:]):
+                checks.append((m0+m1,lambda *idx,n=n: idx[:n]<=idx[n:]))
+        return checks
+
+    def _index_points(self,keys):
+        """ value indices of the valid points of the parameters keys, which no
+        check links to other parameters, in the order of their full product """
+        if not keys:
+            yield ()
+            return
+        sizes = [len(self.param_dict[k]) for k in keys]
+        depth_of = {k:d for d,k in enumerate(keys)}
+        # each check is made at the depth of the last of its parameters
+        checks_at = [[] for _ in keys]
+        for names,check in self._checks(keys):
+            if names[0] in depth_of:
+                checks_at[max(depth_of[n] for n in names)].append(
+                    ([depth_of[n] for n in names],check))
+        idx = [0]*len(keys)
+        # depth first over the grid, in the order of the full product,
+        # skipping all points below a partial point failing a check
+        def points(depth):
+            for i in range(sizes[depth]):
+                idx[depth] = i
+                if all(check(*[idx[d] for d in deps])
+                       for deps,check in checks_at[depth]):
+                    if depth==len(keys)-1:
+                        yield tuple(idx)
+                    else:
+                        yield from points(depth+1)
+        yield from points(0)
 
     def __iter__(self):
-        items = sorted(self.param_dict.items())
-        if not items:
-            yield {} # n.b truth value is False
-        else:
-            keys, values = zip(*items)
-            # iterate over all possible combinations of the values
-            # but n.b iterate as a generator with yield statement
-            for v in product(*values):
-                params = dict(zip(keys, v))
-                yield params
+        keys = sorted(self.param_dict)
+        values = [list(self.param_dict[k]) for k in keys]
+        for idx in self._index_points(keys):
+            # n.b the empty grid has one point, {}, whose truth value is False
+            yield dict(zip(keys,(v[i] for v,i in zip(values,idx))))
+
+    def _components(self):
+        """ groups of parameters linked by constraints or symmetries """
+        parent = {k:k for k in self.param_dict}
+        def find(k):
+            while parent[k]!=k:
+                parent[k] = parent[parent[k]]
+                k = parent[k]
+            return k
+        links = [(a,b) for a,op,b in self.constraints if self._is_param(b)]
+        for members in self.symmetries:
+            names = [n for m in members for n in m]
+            links.extend(zip(names[:-1],names[1:]))
+        for a,b in links:
+            parent[find(a)] = find(b)
+        components = defaultdict(list)
+        for k in sorted(self.param_dict):
+            components[find(k)].append(k)
+        return list(components.values())
+
+    def _count(self,keys):
+        """ number of valid combinations of the parameters keys, which no
+        check links to other parameters """
+        return sum(1 for _ in self._index_points(keys))
 
     def __len__(self):
         """ total number of paramter sets to try """
-        keys, vals = zip(*self.param_dict.items())
         length = 1
-        for v in vals:
-            length *= len(v)
+        for keys in self._components():
+            if len(keys)==1 and not any(c[0]==keys[0] for c in self.constraints):
+                length *= len(self.param_dict[keys[0]])
+            else:
+                length *= self._count(keys)
         return length
@@ -0,0 +1,273 @@
+""" Module for sampling events: the bars at which prices have moved significantly
+
+Most bars carry little information, and signals need only be evaluated at bars
+where prices have moved. The symmetric CUSUM filter tracks, for each ticker,
+the cumulative upward and downward moves since its last event:
+
+    s_pos[t] = max(0,s_pos[t-1]+d[t]),   s_neg[t] = min(0,s_neg[t-1]+d[t])
+
+where d are the changes of (log) prices. An event is seen when s_neg falls
+below -threshold (a downward event, s_neg is reset to 0) or else when s_pos
+rises above threshold (an upward event, s_pos is reset to 0).
+
+The filter is sequential in time, and is found for all tickers at once, either
+stepping bar by bar or, for few tickers, stepping through blocks of bars from
+one event to the next (see cusum_events).
+
+Events are returned as a models.sparse.SparseSignals, with values +1/-1 for
+upward/downward events.
+"""
+import copy
+
+import numpy as np
+
+from .base import BaseParameterizedObject
+from .features import FeatureCache
+from . import sparse
+
+# cusum_events(method='auto') steps through blocks of BLOCK_SIZE bars with up to
+# BLOCKS_MAX_TICKERS tickers, and bar by bar otherwise
+BLOCK_SIZE = 64
+BLOCKS_MAX_TICKERS = 16
+
+
+def _ffill(x):
+    """ fill NaNs of x (time x tickers) with the last valid value before """
+    valid = ~np.isnan(x)
+    if np.all(valid):
+        return x
+    last = np.where(valid,np.arange(x.shape[0])[:,np.newaxis],0)
+    np.maximum.accumulate(last,axis=0,out=last)
+    return x[last,np.arange(x.shape[1])[np.newaxis,:]]
+
+def _cusum_loop(changes,threshold):
+    """ cusum_events directions (time-1 x tickers), bar by bar over all tickers """
+    directions = np.zeros(changes.shape,dtype=sparse.VALUE_DTYPE)
+    s_pos = np.zeros((changes.shape[1],))
+    s_neg = np.zeros((changes.shape[1],))
+    for t in range(changes.shape[0]):
+        np.maximum(s_pos+changes[t],0.0,out=s_pos)
+        np.minimum(s_neg+changes[t],0.0,out=s_neg)
+        down = s_neg<-threshold
+        up = ~down&(s_pos>threshold)
+        s_neg[down] = 0.0
+        s_pos[up] = 0.0
+        directions[t] = up
+        directions[t,down] = -1
+    return directions
+
+def _cusum_blocks(changes,threshold):
+    """ cusum_events directions (time-1 x tickers), by blocks of times
+
+    As s_pos[t] = cs[t]-min(cs[r]-s_pos[r],cs[r+1..t]), for the cumulative sum
+    cs of changes, from any time r without an event in (r,t] (and similarly
+    for s_neg), the filter is found over a block from running minima and
+    maxima of cs, up to the first event of each ticker. Tickers with an event
+    are then found again from their event onwards, until no more events are
+    in the block.
+    """
+    n_times,n_ticks = changes.shape
+    directions = np.zeros(changes.shape,dtype=sparse.VALUE_DTYPE)
+    cs = np.cumsum(changes,axis=0)
+    # cs-s_pos and cs-s_neg as of the last time processed of each ticker
+    pos_anchor = np.zeros((n_ticks,))
+    neg_anchor = np.zeros((n_ticks,))
+    for b0 in range(0,n_times,BLOCK_SIZE):
+        block = cs[b0:b0+BLOCK_SIZE]
+        rows = np.arange(len(block))[:,np.newaxis]
+        # first row of the block not yet processed, of each ticker
+        start = np.zeros((n_ticks,),dtype=np.int64)
+        active = np.arange(n_ticks)
+        while len(active)>0:
+            sub = block[:,active]
+            before = rows<start[active]
+            lo = np.minimum.accumulate(np.where(before,np.inf,sub),axis=0)
+            hi = np.maximum.accumulate(np.where(before,-np.inf,sub),axis=0)
+            s_pos = sub-np.minimum(lo,pos_anchor[active])
+            s_neg = sub-np.maximum(hi,neg_anchor[active])
+            hit = ~before&((s_neg<-threshold)|(s_pos>threshold))
+            has_hit = np.any(hit,axis=0)
+
+            # tickers without another event in the block carry on to its end
+            done = ~has_hit
+            pos_anchor[active[done]] = np.minimum(pos_anchor[active[done]],lo[-1,done])
+            neg_anchor[active[done]] = np.maximum(neg_anchor[active[done]],hi[-1,done])
+
+            cols = np.flatnonzero(has_hit)
+            k = np.argmax(hit[:,cols],axis=0)
+            ticks = active[cols]
+            sp = s_pos[k,cols]
+            sn = s_neg[k,cols]
+            down = sn<-threshold
+            directions[b0+k,ticks] = np.where(down,-1,1)
+            pos_anchor[ticks] = sub[k,cols]-np.where(down,sp,0.0)
+            neg_anchor[ticks] = sub[k,cols]-np.where(down,0.0,sn)
+            start[ticks] = k+1
+            active = ticks
+    return directions
+
+def cusum_events(x,threshold,method='auto'):
+    """ events of the symmetric CUSUM filter on each ticker
+
+    Changes across NaNs in x are taken from the last valid value, and changes
+    before the first valid value are zero.
+
+    Args:
+        - x: array of (log) prices (time x tickers), or 1d for a single ticker
+        - threshold: (> 0) size of the cumulative move giving an event
+    Keyword Args:
+        - method: 'loop' to step through bars with all tickers at once (cost
+                  ~ time python steps), 'blocks' to step through blocks of bars
+                  and events (cost ~ events per ticker python steps, but more
+                  work in each), or 'auto' (default) for 'blocks' with up to
+                  BLOCKS_MAX_TICKERS tickers and 'loop' otherwise.
+    Returns:
+        - (positions,ticker_ids,directions): integer arrays of the index into
+                                             time and into tickers of each
+                                             event, and +1/-1 for an upward or
+                                             downward event. Events are ordered
+                                             by time, then by ticker.
+    """
+    if not threshold>0:
+        raise ValueError("threshold should be > 0")
+    x = np.asarray(x,dtype=np.float64)
+    if x.ndim==1:
+        x = x[:,np.newaxis]
+    changes = np.diff(_ffill(x),axis=0)
+    changes[np.isnan(changes)] = 0.0
+    if method=='auto':
+        method = 'blocks' if x.shape[1]<=BLOCKS_MAX_TICKERS else 'loop'
+    if method=='loop':
+        directions = _cusum_loop(changes,threshold)
+    elif method=='blocks':
+        directions = _cusum_blocks(changes,threshold)
+    else:
+        raise ValueError("method should be 'auto', 'loop' or 'blocks'")
+    rows,ticker_ids = np.nonzero(directions)
+    return rows+1,ticker_ids,directions[rows,ticker_ids]
+
+
+class CusumEventSampler(BaseParameterizedObject):
+    """ Sampler of events by the symmetric CUSUM filter, see cusum_events
+
+    Events are memoised in a models.features.FeatureCache shared by all clones
+    of the sampler, so that signals (and parameter scans) sampling the same
+    data with the same threshold find events once.
+    """
+    def __init__(self,threshold,log_prices=True):
+        """ initialize
+
+        Args:
+            - threshold: (> 0) size of the cumulative move giving an event
+        Keyword Args:
+            - log_prices: if True (default) moves are of log prices, so that
+                          threshold is a fraction of the price (e.g 0.01 for
+                          about 1%). Otherwise moves are of prices.
+        """
+        if not isinstance(threshold,(int,float)) or not threshold>0:
+            raise ValueError("threshold should be a number > 0")
+        self.threshold = threshold
+        self.log_prices = log_prices
+        self.event_cache = FeatureCache()
+
+    def _prices(self,x):
+        x = np.asarray(x,dtype=np.float64)
+        if self.log_prices:
+            with np.errstate(divide='ignore',invalid='ignore'):
+                return np.log(x)
+        return x
+
+    def get_event_arrays(self,x):
+        """ events of an array of prices (time x tickers), see cusum_events """
+        return cusum_events(self._prices(x),self.threshold)
+
+    def get_events(self,stock_df):
+        """ events of stock(s)
+
+        Args:
+            - stock_df: dataframe of stock(s), indexed by time
+        Returns:
+            - events: models.sparse.SparseSignals named 'events', with tickers
+                      as the columns of stock_df, and values +1/-1 for upward
+                      or downward events
+        """
+        def make():
+            positions,ticker_ids,directions = self.get_event_arrays(stock_df.values)
+            return sparse.SparseSignals(stock_df.index,stock_df.columns.to_list(),
+                                        positions,ticker_ids,directions,
+                                        name='events')
+        key = ('events',tuple(stock_df.columns),self.threshold,self.log_prices)
+        return self.event_cache.get(key,stock_df,make)
+
+    def get_broker_events(self,broker,ticker_list,t0=None,t1=None):
+        """ events of a broker's prices, from its price matrix
+
+        Args:
+            - broker: a trading.brokers object
+            - ticker_list: list of tickers
+        Keyword Args:
+            - t0: (pandas timestamp) first time, defaults to the broker's first
+            - t1: (pandas timestamp) last time, defaults to the broker's last
+        Returns:
+            - events: models.sparse.SparseSignals, see get_events
+        """
+        bt0,bt1 = broker.get_firstlast_times()
+        t0 = bt0 if t0 is None else t0
+        t1 = bt1 if t1 is None else t1
+        times,values = broker.get_price_matrix(ticker_list,t0,t1)
+        positions,ticker_ids,directions = self.get_event_arrays(values)
+        return sparse.SparseSignals(times,ticker_list,positions,ticker_ids,
+                                    directions,name='events')
+
+    def fast_clone(self):
+        """ clone the sampler, see BaseParameterizedObject.fast_clone. Any
+        state of init_state is copied, not shared, while the event_cache is
+        shared.
+        """
+        new = super().fast_clone()
+        if hasattr(self,'_state'):
+            new._state = copy.deepcopy(self._state)
+        return new
+
+    def init_state(self,n_tickers):
+        """ initialize the filter to be updated bar by bar
+
+        Args:
+            - n_tickers: number of tickers in each update
+        """
+        self._state = {'last':np.full((n_tickers,),np.nan),
+                       's_pos':np.zeros((n_tickers,)),
+                       's_neg':np.zeros((n_tickers,))}
+
+    def update(self,prices):
+        """ update the filter with the prices of the next bar
+
+        Events are those of get_event_arrays at the same time, given the same
+        history.
+
+        Args:
+            - prices: array of the price of each ticker
+        Returns:
+            - directions: int8 array of each ticker, +1/-1 for an upward or
+                          downward event at this bar, else 0
+        """
+        state = getattr(self,'_state',None)
+        if state is None:
+            raise RuntimeError("init_state should be called before update")
+        x = self._prices(prices)
+        change = x-state['last']
+        change[np.isnan(change)] = 0.0
+        state['last'] = np.where(np.isnan(x),state['last'],x)
+        s_pos = np.maximum(0.0,state['s_pos']+change)
+        s_neg = np.minimum(0.0,state['s_neg']+change)
+        down = s_neg<-self.threshold
+        up = ~down&(s_pos>self.threshold)
+        s_neg[down] = 0.0
+        s_pos[up] = 0.0
+        state['s_pos'] = s_pos
+        state['s_neg'] = s_neg
+        return (up.astype(sparse.VALUE_DTYPE)-down.astype(sparse.VALUE_DTYPE))
+
+    def __repr__(self):
+        return "CusumEventSampler(threshold="+str(self.threshold)+ \
+               ",log_prices="+str(self.log_prices)+")"
@@ -0,0 +1,228 @@
+""" Module for building lagged feature arrays from indicators, e.g for models
+
+Models that predict from the last few values of several indicators take, at
+each time, a (lags x features) window of the indicator values. Building these
+with pandas shift/concat copies the data once per lag. Here windows are strided
+views of the indicator array (numpy sliding_window_view, or as_strided where
+numpy is too old for it), so that lagging copies nothing:
+
+    builder = FeatureBuilder({'ma':MACrossOver(5,20),'rsi':RSI(14)},n_lags=10)
+    windows = builder.get_lagged_features(stock_df)
+    # windows[t,i] is the (10 x 2) window of ticker i ending at time t+9
+
+Arrays given to a model (e.g a scikit-learn estimator) are found from windows
+with a single copy, see design_matrix.
+
+A FeatureCache memoises features and model outputs by the data they are found
+from. It is shared by all clones of the objects holding it (deep copies
+included), so that a parameter scan computes each distinct set of features
+once. It holds at most maxsize entries, dropping the least recently used.
+"""
+from collections import OrderedDict
+
+import numpy as np
+
+from .base import BaseParameterizedObject
+from .indicators import IndicatorBank
+from .graph import _object_key
+from systrade import precision
+
+try:
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError: # numpy < 1.20
+    sliding_window_view = None
+
+
+def lag_windows(x,n_lags):
+    """ windows of the last n_lags times of an array, as a view
+
+    Args:
+        - x: array with time on axis 0, e.g (time x features)
+        - n_lags: number of times in each window
+    Returns:
+        - windows: read-only view of x of shape (time-n_lags+1 x ... x n_lags x
+                   last axis of x), e.g (samples x lags x features) for 2d x.
+                   windows[s] holds x[s:s+n_lags], oldest first.
+    """
+    x = np.asarray(x)
+    if x.ndim<2:
+        raise ValueError("x should have time on axis 0 and features on the last axis")
+    if not isinstance(n_lags,(int,np.integer)) or n_lags<1:
+        raise ValueError("n_lags should be a positive integer")
+    if n_lags>x.shape[0]:
+        raise ValueError("n_lags is longer than the data")
+    if sliding_window_view is not None:
+        windows = sliding_window_view(x,n_lags,axis=0)
+    else:
+        windows = np.lib.stride_tricks.as_strided(
+                        x,shape=(x.shape[0]-n_lags+1,)+x.shape[1:]+(n_lags,),
+                        strides=x.strides+(x.strides[0],),writeable=False)
+    # lags from the last axis to before the features
+    return np.moveaxis(windows,-1,-2)
+
+def design_matrix(windows):
+    """ flatten lag windows into rows of a 2d array, as taken by models
+
+    This is the one copy of the data made in building features.
+
+    Args:
+        - windows: array (samples x ... x lags x features), from lag_windows
+    Returns:
+        - (X,valid): array (valid samples x lags*features) of the windows
+                     without NaNs, and boolean array (samples x ...) of which
+                     windows are in X (in C order)
+    """
+    valid = ~np.any(np.isnan(windows),axis=(-2,-1))
+    X = windows[valid]
+    return X.reshape((X.shape[0],-1)),valid
+
+def _same_values(a,b):
+    """ whether arrays are equal, with NaNs equal to each other """
+    if a.shape!=b.shape:
+        return False
+    with np.errstate(invalid='ignore'):
+        return bool(np.all((a==b)|(np.isnan(a)&np.isnan(b))))
+
+
+def _same_buffer(a,b):
+    """ whether arrays are views of the same memory, e.g the values of one
+    dataframe (DataFrame.values is a new view on each call) """
+    return (a.__array_interface__['data'][0]==b.__array_interface__['data'][0]
+            and a.shape==b.shape and a.strides==b.strides and a.dtype==b.dtype)
+
+def _fingerprint(stock_df):
+    """ cheap summary of a dataframe, equal for equal data """
+    index = stock_df.index
+    bounds = (index[0],index[-1]) if len(index)>0 else ()
+    return (stock_df.shape,str(stock_df.values.dtype),bounds)
+
+
+class FeatureCache:
+    """ Memo of arrays found from data, shared by clones
+
+    Entries are keyed by what they are found from (e.g indicator parameters)
+    and by the data: an entry is reused for equal data on equal times, whether
+    or not it is the same dataframe object. Entries are looked up by a cheap
+    fingerprint of the data (shape, dtype and first and last times); the data
+    is then compared in full only if it is not in the memory of the data the
+    entry was last found or checked for, so that repeated lookups on the same
+    dataframe cost nothing. Data should not be modified in place once used.
+    """
+    def __init__(self,maxsize=128):
+        """ initialize
+
+        Keyword Args:
+            - maxsize: (optional) most entries held, the least recently used
+                       are dropped first. None for no bound. Defaults to 128.
+        """
+        if maxsize is not None and (not isinstance(maxsize,(int,np.integer))
+                                    or maxsize<1):
+            raise ValueError("maxsize should be a positive integer or None")
+        self.maxsize = maxsize
+        self._memo = OrderedDict() # (key,fingerprint): (index,values,output)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._memo)
+
+    def __deepcopy__(self,memo):
+        # shared by all clones
+        return self
+
+    def clear(self):
+        """ remove all entries """
+        self._memo = OrderedDict()
+
+    def get(self,key,stock_df,make):
+        """ get the entry of a key for data, making it if not held
+
+        Args:
+            - key: hashable key of what the entry is found from
+            - stock_df: dataframe of the data the entry is found from
+            - make: function of no arguments making the entry
+        Returns:
+            - entry: output of make, for this or equal data
+        """
+        values = stock_df.values
+        memo_key = (key,_fingerprint(stock_df))
+        held = self._memo.get(memo_key)
+        if held is not None:
+            index,held_values,output = held
+            if index is stock_df.index and _same_buffer(held_values,values):
+                same = True
+            else:
+                same = index.equals(stock_df.index) and _same_values(held_values,values)
+                if same:
+                    # later lookups on this data are by identity
+                    self._memo[memo_key] = (stock_df.index,values,output)
+            if same:
+                self._memo.move_to_end(memo_key)
+                self.hits += 1
+                return output
+        self.misses += 1
+        output = make()
+        self._memo[memo_key] = (stock_df.index,values,output)
+        self._memo.move_to_end(memo_key)
+        if self.maxsize is not None and len(self._memo)>self.maxsize:
+            self._memo.popitem(last=False)
+        return output
+
+
+class FeatureBuilder(BaseParameterizedObject):
+    """ Lagged windows of several indicators, as features for models """
+    def __init__(self,indicators,n_lags=5):
+        """ initialize
+
+        Args:
+            - indicators: dictionary of feature names and models.indicator
+                          objects, in the order of the features
+        Keyword Args:
+            - n_lags: number of times in each window, defaults to 5
+        """
+        if not isinstance(indicators,dict) or len(indicators)==0:
+            raise TypeError("indicators should be a non-empty dictionary")
+        if not isinstance(n_lags,(int,np.integer)) or n_lags<1:
+            raise ValueError("n_lags should be a positive integer")
+        IndicatorBank(indicators) # check indicators
+        self.indicators = indicators
+        self.n_lags = n_lags
+
+    def key(self):
+        """ hashable key of the indicators this builder finds features from """
+        return tuple((name,_object_key(ind)) for name,ind in self.indicators.items())
+
+    def get_features(self,stock_df):
+        """ all indicators on stock(s)
+
+        Args:
+            - stock_df: dataframe of stock(s), indexed by time
+        Returns:
+            - features: array (time x tickers x features), in the float dtype
+                        of systrade.precision (a view of the indicators)
+        """
+        indis = IndicatorBank(self.indicators).get_indicator_arrays(stock_df.values)
+        return np.moveaxis(indis,0,-1)
+
+    def get_lagged_features(self,stock_df,cache=None):
+        """ windows of the last n_lags values of all indicators
+
+        Args:
+            - stock_df: dataframe of stock(s), indexed by time
+        Keyword Args:
+            - cache: (optional) FeatureCache to find the indicators in
+        Returns:
+            - windows: read-only view of shape (time-n_lags+1 x tickers x
+                       n_lags x features). windows[s] are the windows ending at
+                       time s+n_lags-1.
+        """
+        if cache is None:
+            features = self.get_features(stock_df)
+        else:
+            features = cache.get(('features',self.key(),precision.get_float_dtype()),
+                                 stock_df,lambda: self.get_features(stock_df))
+        return lag_windows(features,self.n_lags)
+
+    def __repr__(self):
+        return "FeatureBuilder("+str(list(self.indicators.keys()))+ \
+               ",n_lags="+str(self.n_lags)+")"
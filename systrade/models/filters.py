@@ -1,6 +1,19 @@
-""" module for filters for tickers to be used for signals """
+""" module for filters for tickers to be used for signals
+
+Filters select tickers by label. For wide universes, a filter can be compiled
+against a list of tickers (e.g a broker's get_tick_list()) into a
+CompiledFilter, resolving its tickers to integer column positions once. Input
+columns are then selected from a price matrix as a numpy view (no copy) where
+the positions are evenly spaced, and outputs are mapped with integer arrays.
+"""
 import copy
 
+import numpy as np
+import pandas as pd
+
+# number of ticker lists each filter keeps a compiled form for
+MAX_COMPILED_PER_FILTER = 8
+
 class TickerOneToManyFilter:
     " Filter out many tickers for input, and output for single ticker only "
     def __init__(self, tick_in, tick_list_out):
@@ -41,6 +54,14 @@ class TickerOneToManyFilter:
         out[self.tick_in] = self.tick_list_out
         return out
 
+    def input_tickers(self):
+        """ list of tickers the filter selects on input """
+        return [self.tick_in]
+
+    def compile(self,tickers):
+        """ resolve the filter against a list of tickers, see CompiledFilter """
+        return _compile_cached(self,tickers)
+
     def clone(self):
         return copy.deepcopy(self)
 
@@ -86,5 +107,165 @@ class TickerOneToAnotherFilter:
         """
         return {self.tick_list_in[i]:[self.tick_list_out[i]] for i in range(len(self.tick_list_in))}
 
+    def input_tickers(self):
+        """ list of tickers the filter selects on input """
+        return list(self.tick_list_in)
+
+    def compile(self,tickers):
+        """ resolve the filter against a list of tickers, see CompiledFilter """
+        return _compile_cached(self,tickers)
+
     def clone(self):
         return copy.deepcopy(self)
+
+
+class CompiledFilter:
+    """ A filter resolved to integer column positions in a list of tickers """
+    def __init__(self,tickers,in_positions,out_tickers,out_sources):
+        """ initialize
+
+        Args:
+            - tickers: list of tickers that positions index into
+            - in_positions: integer array, position in tickers of each input
+                            ticker of the filter
+            - out_tickers: list of output tickers of the filter
+            - out_sources: integer array, for each output ticker, the index into
+                           in_positions of the input it takes its signals from
+        """
+        self.tickers = list(tickers)
+        self.in_positions = np.asarray(in_positions,dtype=np.int64)
+        self.in_tickers = [self.tickers[i] for i in self.in_positions]
+        self.out_tickers = list(out_tickers)
+        self.out_sources = np.asarray(out_sources,dtype=np.int64)
+
+    @classmethod
+    def from_output_map(cls,tickers,tick_list_in,output_map):
+        """ compile a filter from its input tickers and output map
+
+        Where an output ticker is mapped to from several inputs, the last input
+        is kept (as when building signal dictionaries input by input).
+
+        Args:
+            - tickers: list of tickers to resolve against
+            - tick_list_in: list of input tickers of the filter
+            - output_map: dictionary of input ticker to list of output tickers
+        Returns:
+            - compiled: CompiledFilter
+        """
+        positions = pd.Index(tickers).get_indexer(tick_list_in)
+        if np.any(positions<0):
+            missing = [t for t,p in zip(tick_list_in,positions) if p<0]
+            raise KeyError("filter tickers not in tickers: "+str(missing))
+        source = dict()
+        for i,tick in enumerate(tick_list_in):
+            for tick_out in output_map[tick]:
+                source[tick_out] = i
+        return cls(tickers,positions,list(source.keys()),list(source.values()))
+
+    def is_identity(self):
+        """ whether the filter selects all tickers, in order """
+        return _positions_to_slice(self.in_positions)==slice(0,len(self.tickers),1)
+
+    def select(self,prices):
+        """ select the filter's input columns of a price matrix
+
+        Args:
+            - prices: array (time x tickers), tickers as self.tickers
+        Returns:
+            - selected: array (time x input tickers), a view of prices where
+                        the input positions are evenly spaced
+        """
+        return take_columns(prices,self.in_positions)
+
+    def select_df(self,data_df):
+        """ select the filter's input columns of a dataframe
+
+        Args:
+            - data_df: dataframe with columns as self.tickers
+        Returns:
+            - selected_df: dataframe of the input columns, sharing data_df's
+                           memory where possible
+        """
+        if self.is_identity():
+            return data_df
+        return pd.DataFrame(self.select(data_df.values),index=data_df.index,
+                            columns=self.in_tickers)
+
+
+def compile_filter(filter,tickers):
+    """ compile a filter (or None, for all tickers) against a list of tickers
+
+    Args:
+        - filter: a models.filter object, or None
+        - tickers: list of tickers
+    Returns:
+        - compiled: CompiledFilter
+    """
+    if filter is None:
+        n = len(tickers)
+        return CompiledFilter(tickers,np.arange(n),tickers,np.arange(n))
+    return filter.compile(tickers)
+
+def take_columns(x,positions):
+    """ columns of a 2d array at integer positions, as a view where possible
+
+    Args:
+        - x: array (time x tickers)
+        - positions: integer array of column positions
+    Returns:
+        - selected: array (time x len(positions)), a view of x if the
+                    positions are evenly spaced and increasing
+    """
+    positions = np.asarray(positions,dtype=np.int64)
+    col_slice = _positions_to_slice(positions)
+    if col_slice is not None:
+        return x[:,col_slice]
+    return x[:,positions]
+
+def column_view(data_df,tickers):
+    """ select columns of a dataframe by ticker, sharing memory where possible
+
+    Args:
+        - data_df: dataframe, with tickers as columns
+        - tickers: list of tickers to select
+    Returns:
+        - selected_df: dataframe of the tickers
+    """
+    positions = data_df.columns.get_indexer(tickers)
+    if np.any(positions<0):
+        missing = [t for t,p in zip(tickers,positions) if p<0]
+        raise KeyError("tickers not in columns: "+str(missing))
+    if _positions_to_slice(positions)==slice(0,len(data_df.columns),1):
+        return data_df
+    return pd.DataFrame(take_columns(data_df.values,positions),
+                        index=data_df.index,columns=list(tickers))
+
+def _compile_cached(filter,tickers):
+    """ compile a filter, reusing its last compiled form for the same tickers
+
+    Filters are not expected to change once made (they are shared between
+    fast clones of signals), so only the tickers are checked.
+    """
+    tickers = tuple(tickers)
+    cache = getattr(filter,'_compiled',None)
+    if cache is None:
+        cache = dict()
+        filter._compiled = cache
+    if tickers not in cache:
+        if len(cache)>=MAX_COMPILED_PER_FILTER:
+            cache.clear()
+        cache[tickers] = CompiledFilter.from_output_map(tickers,
+                                                        filter.input_tickers(),
+                                                        filter.output_map())
+    return cache[tickers]
+
+def _positions_to_slice(positions):
+    """ a slice equivalent to indexing by positions, or None if there is none """
+    if len(positions)==0:
+        return slice(0,0,1)
+    if len(positions)==1:
+        return slice(positions[0],positions[0]+1,1)
+    steps = np.diff(positions)
+    if steps[0]>0 and np.all(steps==steps[0]):
+        return slice(positions[0],positions[-1]+1,steps[0])
+    return None
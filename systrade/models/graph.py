@@ -0,0 +1,236 @@
+""" Module for compiling strategies into a graph of indicators and signals
+
+A strategy's signal_dict holds signals that each own an indicator and a filter,
+so that signals with identically configured indicators compute them separately.
+compile_strategy instead builds a directed acyclic graph of nodes:
+
+    indicator -> signal -> combiner
+
+Indicator nodes are keyed on the indicator's class and parameters. As
+indicators act on each ticker individually (see BaseIndicator.get_indicator),
+one indicator node is evaluated once on the union of the tickers of all
+signals using it, and each signal takes its own columns. Signal nodes are keyed
+on the signal's class, parameters, filter mapping and input tickers, so that
+identical signals (under different names) are evaluated once. The combiner
+merges the signals of the strategy into a models.sparse.SparseSignals.
+
+Signals sampling events (see models.events) need the indicator only at event
+bars. They take it from an indicator node when another signal computes the
+same indicator anyway, and otherwise find it at the events alone (see
+BaseIndicator.get_indicator_at).
+
+Nodes are evaluated in topological order. Nodes of the same level do not
+depend on each other, and can be evaluated in a thread pool (numpy releases
+the GIL for most of the work of indicators).
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import base
+from . import filters
+from . import sparse
+
+
+def _object_key(obj):
+    """ key of a parameterized object: its class and (non-object) parameters """
+    params = obj.get_params()
+    return (type(obj).__module__,type(obj).__qualname__,
+            tuple(sorted((k,repr(v)) for k,v in params.items()
+                         if not hasattr(v,'get_params'))))
+
+def _filter_key(filter):
+    if filter is None:
+        return None
+    return (type(filter).__module__,type(filter).__qualname__,
+            repr(filter.output_map()))
+
+def _shares_indicator(signal):
+    """ whether the signal can find signals from a precomputed indicator """
+    return (type(signal).signals_from_indicator
+            is not base.BaseSignal.signals_from_indicator)
+
+def _samples_events(signal):
+    """ whether the signal looks at its indicator at event bars only """
+    return getattr(signal,'event_sampler',None) is not None
+
+
+class IndicatorNode:
+    """ Node evaluating an indicator on the union of tickers of its signals """
+    def __init__(self,key,indicator):
+        self.key = key
+        self.indicator = indicator
+        self.columns = []
+        self.deps = []
+
+    def add_columns(self,columns):
+        for c in columns:
+            if c not in self.columns:
+                self.columns.append(c)
+
+    def evaluate(self,stocks_df,inputs):
+        stock_df = filters.column_view(stocks_df,self.columns)
+        indi = np.asarray(self.indicator.get_indicator(stock_df),dtype=np.float64)
+        if indi.ndim==1:
+            indi = indi[:,np.newaxis]
+        return indi
+
+
+class SignalNode:
+    """ Node finding signals from the output of an IndicatorNode """
+    def __init__(self,key,signal,columns,indicator_node):
+        self.key = key
+        self.signal = signal
+        self.columns = columns
+        self.indicator_node = indicator_node
+        self.deps = [indicator_node.key]
+
+    def evaluate(self,stocks_df,inputs):
+        col_index = {c:i for i,c in enumerate(self.indicator_node.columns)}
+        cols = [col_index[c] for c in self.columns]
+        indi = filters.take_columns(inputs[self.indicator_node.key],cols)
+        if _samples_events(self.signal):
+            events = self.signal.event_sampler.get_events(
+                            filters.column_view(stocks_df,self.columns))
+            return self.signal.signals_from_indicator(indi,stocks_df.index,
+                                                      self.columns,events=events)
+        return self.signal.signals_from_indicator(indi,stocks_df.index,
+                                                  self.columns)
+
+
+class RequestNode:
+    """ Node for signals that find signals from data directly
+
+    As the output of such signals may depend on more than their parameters
+    (e.g their name), these nodes are not merged.
+    """
+    def __init__(self,key,signal,signal_name):
+        self.key = key
+        self.signal = signal
+        self.signal_name = signal_name
+        self.deps = []
+
+    def evaluate(self,stocks_df,inputs):
+        return self.signal.request_historical_sparse(stocks_df,
+                                                     signal_name=self.signal_name)
+
+
+class CombinerNode:
+    """ Node merging the signals of a strategy """
+    def __init__(self,key,signal_keys,tickers):
+        self.key = key
+        self.deps = list(signal_keys)
+        self.tickers = tickers
+
+    def evaluate(self,stocks_df,inputs):
+        return sparse.merge_signals([inputs[k] for k in self.deps],
+                                    tickers=self.tickers)
+
+
+class SignalGraph:
+    """ Directed acyclic graph of nodes, with identical nodes merged """
+    def __init__(self):
+        self.nodes = dict()
+        self.output_key = None
+
+    def add_node(self,node):
+        """ add a node, or get the existing node with the same key
+
+        Args:
+            - node: node to add
+        Returns:
+            - node: the node in the graph with node's key
+        """
+        if node.key not in self.nodes:
+            self.nodes[node.key] = node
+        return self.nodes[node.key]
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def count(self,node_type):
+        """ number of nodes of a type, e.g IndicatorNode """
+        return sum(isinstance(n,node_type) for n in self.nodes.values())
+
+    def levels(self):
+        """ keys of nodes grouped into levels of a topological order
+
+        Returns:
+            - levels: list of lists of node keys. Nodes depend only on nodes of
+                      earlier levels.
+        """
+        depth = dict()
+        def node_depth(key):
+            if key not in depth:
+                deps = self.nodes[key].deps
+                depth[key] = 1+max([node_depth(d) for d in deps],default=-1)
+            return depth[key]
+        levels = []
+        for key in self.nodes:
+            d = node_depth(key)
+            while len(levels)<=d:
+                levels.append([])
+            levels[d].append(key)
+        return levels
+
+    def evaluate(self,stocks_df,n_workers=1):
+        """ evaluate all nodes, and return the output of the output node
+
+        Args:
+            - stocks_df: dataframe of tickers value over time
+        Keyword Args:
+            - n_workers: number of threads to evaluate nodes of the same level
+                         with (defaults to 1)
+        Returns:
+            - output: the output of the output node
+        """
+        results = dict()
+        if n_workers>1:
+            with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                for level in self.levels():
+                    outputs = executor.map(
+                        lambda k: self.nodes[k].evaluate(stocks_df,results),level)
+                    results.update(zip(level,outputs))
+        else:
+            for level in self.levels():
+                for key in level:
+                    results[key] = self.nodes[key].evaluate(stocks_df,results)
+        return results[self.output_key]
+
+
+def compile_strategy(strategy,stocks_df):
+    """ compile a strategy's signals into a SignalGraph
+
+    Args:
+        - strategy: a models.strategy object
+        - stocks_df: dataframe of tickers value over time (only its columns
+                     are used, to find the tickers selected by filters)
+    Returns:
+        - graph: SignalGraph, whose output is a models.sparse.SparseSignals of
+                 all signals of the strategy, as from
+                 strategy.sparse_signal_requests
+    """
+    empty_df = stocks_df.iloc[:0]
+    graph = SignalGraph()
+    signal_keys = []
+    # indicators computed in full, which signals sampling events can share
+    full_keys = set(('indicator',_object_key(sig.indicator))
+                    for sig in strategy.signal_dict.values()
+                    if _shares_indicator(sig) and not _samples_events(sig))
+    for sig_name,sig in strategy.signal_dict.items():
+        if _shares_indicator(sig):
+            ind_key = ('indicator',_object_key(sig.indicator))
+        if _shares_indicator(sig) and (not _samples_events(sig) or ind_key in full_keys):
+            columns = sig.input_frame(empty_df).columns.to_list()
+            ind_node = graph.add_node(IndicatorNode(ind_key,sig.indicator))
+            ind_node.add_columns(columns)
+            key = ('signal',_object_key(sig),_filter_key(sig.filter),
+                   tuple(columns))
+            node = graph.add_node(SignalNode(key,sig,columns,ind_node))
+        else:
+            node = graph.add_node(RequestNode(('request',sig_name),sig,sig_name))
+        signal_keys.append(node.key)
+    graph.output_key = ('combiner',)
+    graph.add_node(CombinerNode(graph.output_key,signal_keys,
+                                strategy.ticker_list))
+    return graph
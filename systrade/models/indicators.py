@@ -6,6 +6,20 @@ Notes
 All indicator classes should inherit from base/BaseIndicator, and provide a
 get_indicator method. For details of this method see docstring of
 base/BaseIndicator or the get_indicator method in MACrossOver in this module.
+
+Indicators that can also be updated one bar at a time (e.g for live trading)
+inherit from base/BaseIncrementalIndicator, and provide init_state and update
+methods, see MACrossOver in this module.
+
+Indicators built on systrade.models.kernels compute from a SharedIntermediates
+object (from_intermediates), which memoises arrays such as cumulative sums,
+returns and EMAs of the prices. An IndicatorBank computes many indicators on
+the same prices from a single SharedIntermediates, so that each intermediate is
+found once. As MACrossOver, indicators in this module use the prices before
+each time, so that a signal at a time does not use the price traded at.
+
+Indicator outputs are in the float dtype of systrade.precision (float64 by
+default), intermediates are always computed in float64.
 """
 
 #from abc import ABC,abstractmethod
@@ -13,11 +27,15 @@ import numpy as np
 import pandas as pd
 import copy
 import warnings
+from contextlib import contextmanager
 from pandas.tseries.offsets import DateOffset
 
 from .base import BaseIndicator
+from .base import BaseIncrementalIndicator
+from . import kernels
+from systrade import precision
 
-class MACrossOver(BaseIndicator):
+class MACrossOver(BaseIncrementalIndicator):
     """ Indicator for moving average crossover"""
     def __init__(self,period1,period2,win_type=None):
         """
@@ -57,16 +75,575 @@ class MACrossOver(BaseIndicator):
         max_p = max(self.period1,self.period2)
         if max_p>=len(stock_df.index):
             raise ValueError("MACrossOver period(s) are longer than the data")
-        indi = stock_df.rolling(self.period1,self.win_type).mean().shift() \
-              - stock_df.rolling(self.period2,self.win_type).mean().shift()
-        # get the values at the time longest period first met
-        tmp_val = indi.iloc[max_p].values
-        #print(tmp_val)
-        tmp_vals = np.tile(tmp_val,(max_p,1))
+        if self.win_type is None:
+            for cache in _ACTIVE_CACHES:
+                indi = cache.lookup(stock_df,self.period1,self.period2)
+                if indi is not None:
+                    return indi
+        return _like_input(stock_df,self.get_indicator_array(stock_df.values))
+
+    def get_indicator_at(self,stock_df,rows,cols):
+        """ apply moving average indicator to stock(s), at given points only
+
+        Without a win_type, each point is a difference of the cumulative sum of
+        the prices, so the moving averages are not found at other times.
+        Values equal those of get_indicator.
+
+        Args:
+            - stock_df: dataframe of stock(s), indexed by time
+            - rows: integer array of the index into time of each point
+            - cols: integer array of the index into tickers of each point
+
+        Returns:
+            - values: array of the indicator at each point
+        """
+        max_p = max(self.period1,self.period2)
+        if max_p>=len(stock_df.index):
+            raise ValueError("MACrossOver period(s) are longer than the data")
+        if self.win_type is not None:
+            return super().get_indicator_at(stock_df,rows,cols)
+        for cache in _ACTIVE_CACHES:
+            indi = cache.lookup(stock_df,self.period1,self.period2)
+            if indi is not None:
+                return np.asarray(indi.values)[rows,cols]
+        x = np.asarray(stock_df.values,dtype=np.float64)
+        if x.ndim==1:
+            x = x[:,np.newaxis]
+        cs = kernels.cumsum0(x)
+        nans = kernels.nancount0(x) if np.isnan(x).any() else None
+        # averages of the points before each time, from max_p on (see
+        # from_intermediates)
+        rows = np.maximum(np.asarray(rows,dtype=np.int64),max_p)
+        cols = np.asarray(cols,dtype=np.int64)
+        def average(p):
+            ma = (cs[rows,cols]-cs[rows-p,cols])/p
+            if nans is not None:
+                ma[nans[rows,cols]-nans[rows-p,cols]>0] = np.nan
+            return ma
+        values = average(self.period1)-average(self.period2)
+        return precision.as_float(values)
+
+    def get_indicator_array(self,x):
+        """ apply moving average indicator to an array of stock(s) prices
+
+        Args:
+            - x: array of prices (time x tickers)
+
+        Returns:
+            - indi: array of the indicator (time x tickers)
+        """
+        return _from_prices(self,x)
+
+    def from_intermediates(self,inter):
+        """ apply moving average indicator from shared intermediates
+
+        Args:
+            - inter: SharedIntermediates of the prices
+
+        Returns:
+            - indi: array of the indicator (time x tickers)
+        """
+        max_p = max(self.period1,self.period2)
+        if max_p>=inter.n_times:
+            raise ValueError("MACrossOver period(s) are longer than the data")
+        if self.win_type is None:
+            ma1 = inter.sma(self.period1)
+            ma2 = inter.sma(self.period2)
+        else:
+            ma1 = inter.weighted_ma(self.period1,self.win_type)
+            ma2 = inter.weighted_ma(self.period2,self.win_type)
+        # averages of the points before each time
+        indi = kernels.shift(ma1) - kernels.shift(ma2)
         # repeat the values at time max_p for all times up to then (prevents a fake crossover)
-        indi.iloc[0:max_p] = tmp_vals
+        indi[:max_p] = indi[max_p]
         return indi
 
+    def init_state(self,n_tickers):
+        """ initialize state for bar by bar updates
+
+        The state holds a ring buffer of the last max(period1,period2) bars,
+        and running sums (of bars with NaNs as 0) and counts of NaN bars over
+        each period, for all tickers at once - so that each update costs the
+        same regardless of period length. With a
+        win_type, each update instead weights the bars of each period in the
+        buffer by the (cached) window weights, at a cost ~ period.
+
+        Args:
+            - n_tickers: number of tickers in each bar (or list of tickers)
+
+        Returns:
+            - state: the initial state dictionary
+        """
+        if not isinstance(n_tickers,(int,np.integer)):
+            n_tickers = len(n_tickers)
+        max_p = max(self.period1,self.period2)
+        self._state = {'buffer': np.zeros((max_p,n_tickers)),
+                       'position': 0,
+                       'count': 0,
+                       'sum1': np.zeros((n_tickers,)),
+                       'sum2': np.zeros((n_tickers,)),
+                       'nans1': np.zeros((n_tickers,),dtype=np.int64),
+                       'nans2': np.zeros((n_tickers,),dtype=np.int64)}
+        return self.get_state()
+
+    def update(self,bar):
+        """ update with the next bar, and get the indicator at that bar's time
+
+        As in get_indicator, the indicator at a given time uses the moving
+        averages of bars prior to that time. Values are identical to
+        get_indicator from the max(period1,period2)'th bar onwards, before that
+        they are NaN (get_indicator backfills those times with a later value).
+        As in get_indicator, a NaN bar gives NaN only while it is in a window.
+
+        Args:
+            - bar: array of prices of each ticker at the next time
+
+        Returns:
+            - value: array of the indicator for each ticker at this bar's time
+        """
+        state = self._state
+        bar = np.asarray(bar,dtype=np.float64)
+        buffer = state['buffer']
+        max_p,pos,count = len(buffer),state['position'],state['count']
+        if count<max_p:
+            value = np.full(buffer.shape[1],np.nan)
+        elif self.win_type is None:
+            value = state['sum1']/self.period1 - state['sum2']/self.period2
+            value[(state['nans1']>0)|(state['nans2']>0)] = np.nan
+        else:
+            value = self._window_average(self.period1,buffer,pos) \
+                    - self._window_average(self.period2,buffer,pos)
+        # slide each window along by one bar
+        if self.win_type is None:
+            bar_nans = np.isnan(bar)
+            for p,key,nans_key in ((self.period1,'sum1','nans1'),
+                                   (self.period2,'sum2','nans2')):
+                if count>=p:
+                    old = buffer[(pos-p)%max_p]
+                    old_nans = np.isnan(old)
+                    state[key] -= np.where(old_nans,0.0,old)
+                    state[nans_key] -= old_nans
+                state[key] += np.where(bar_nans,0.0,bar)
+                state[nans_key] += bar_nans
+        buffer[pos] = bar
+        pos = (pos+1)%max_p
+        if pos==0 and self.win_type is None:
+            # buffer holds the last max_p bars in order - resum to stop
+            # rounding errors of the running sums accumulating
+            for p,key,nans_key in ((self.period1,'sum1','nans1'),
+                                   (self.period2,'sum2','nans2')):
+                state[key] = np.nansum(buffer[max_p-p:],axis=0)
+                state[nans_key] = np.sum(np.isnan(buffer[max_p-p:]),axis=0)
+        state['position'] = pos
+        state['count'] = count+1
+        return value
+
+    def _window_average(self,period,buffer,pos):
+        """ weighted average of the last period bars of a full ring buffer,
+        whose oldest bar is at pos """
+        weights = kernels.window_weights(period,self.win_type)
+        rows = (pos+len(buffer)-period+np.arange(period))%len(buffer)
+        return np.dot(weights,buffer[rows])/np.sum(weights)
+
+
+def _check_periods(name,*periods):
+    for p in periods:
+        if not isinstance(p,(int,np.integer)):
+            raise TypeError(name+": periods should be integers")
+        if p<1:
+            raise ValueError(name+": periods should be positive")
+
+def _check_length(name,max_p,stock_df):
+    if max_p>=len(stock_df.index):
+        raise ValueError(name+" period(s) are longer than the data")
+
+
+class BollingerBands(BaseIndicator):
+    """ Indicator of the position of price within Bollinger bands
+
+    (price - moving average)/(n_std * moving standard deviation): -1 and +1 at
+    the lower and upper band, and crossing zero as the price crosses its
+    moving average.
+    """
+    def __init__(self,period=20,n_std=2.0):
+        """
+        Args:
+            - period: number of previous points for the average and std
+            - n_std: number of standard deviations from the average to bands
+        """
+        _check_periods("BollingerBands",period)
+        if not isinstance(n_std,(int,float)):
+            raise TypeError("BollingerBands: n_std should be a number")
+        if n_std<=0:
+            raise ValueError("BollingerBands: n_std should be > 0")
+        self.period = period
+        self.n_std = n_std
+
+    def get_indicator(self,stock_df):
+        """ apply indicator to stock(s), see BaseIndicator.get_indicator """
+        _check_length("BollingerBands",self.period,stock_df)
+        return _like_input(stock_df,self.get_indicator_array(stock_df.values))
+
+    def get_indicator_array(self,x):
+        return _from_prices(self,x)
+
+    def from_intermediates(self,inter):
+        ma = inter.sma(self.period)
+        std = inter.rolling_std('prices',self.period)
+        with np.errstate(divide='ignore',invalid='ignore'):
+            pos = np.where(std>0.0,(inter.x-ma)/(self.n_std*std),np.nan)
+        return kernels.shift(pos)
+
+
+class RSI(BaseIndicator):
+    """ Relative strength index
+
+    100*average gain/(average gain + average loss) of price changes, with
+    averages by Wilder's smoothing (an EMA with alpha = 1/period). 50 where
+    the price has not changed over the smoothing.
+    """
+    def __init__(self,period=14):
+        """
+        Args:
+            - period: smoothing period of gains and losses
+        """
+        _check_periods("RSI",period)
+        self.period = period
+
+    def get_indicator(self,stock_df):
+        """ apply indicator to stock(s), see BaseIndicator.get_indicator """
+        _check_length("RSI",self.period,stock_df)
+        return _like_input(stock_df,self.get_indicator_array(stock_df.values))
+
+    def get_indicator_array(self,x):
+        return _from_prices(self,x)
+
+    def from_intermediates(self,inter):
+        gain,loss = inter.wilder_gain_loss(self.period)
+        with np.errstate(divide='ignore',invalid='ignore'):
+            rsi = np.where(gain+loss>0.0,100.0*gain/(gain+loss),50.0)
+        rsi[:self.period] = np.nan # fewer than period changes
+        return kernels.shift(rsi)
+
+
+class MACD(BaseIndicator):
+    """ Moving average convergence divergence histogram
+
+    MACD line (EMA of span fast - EMA of span slow), less its signal line (EMA
+    of the MACD line of span signal), crossing zero as the MACD line crosses
+    its signal line.
+    """
+    def __init__(self,fast=12,slow=26,signal=9):
+        """
+        Args:
+            - fast: span of the fast EMA
+            - slow: span of the slow EMA
+            - signal: span of the EMA of the MACD line
+        """
+        _check_periods("MACD",fast,slow,signal)
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+
+    def get_indicator(self,stock_df):
+        """ apply indicator to stock(s), see BaseIndicator.get_indicator """
+        _check_length("MACD",max(self.fast,self.slow),stock_df)
+        return _like_input(stock_df,self.get_indicator_array(stock_df.values))
+
+    def get_indicator_array(self,x):
+        return _from_prices(self,x)
+
+    def from_intermediates(self,inter):
+        macd = inter.ema(self.fast)-inter.ema(self.slow)
+        hist = macd-kernels.ema(macd,span=self.signal)
+        return kernels.shift(hist)
+
+
+class RollingVolatility(BaseIndicator):
+    """ Rolling standard deviation of simple returns """
+    def __init__(self,period=20):
+        """
+        Args:
+            - period: number of previous returns in each window
+        """
+        _check_periods("RollingVolatility",period)
+        self.period = period
+
+    def get_indicator(self,stock_df):
+        """ apply indicator to stock(s), see BaseIndicator.get_indicator """
+        _check_length("RollingVolatility",self.period,stock_df)
+        return _like_input(stock_df,self.get_indicator_array(stock_df.values))
+
+    def get_indicator_array(self,x):
+        return _from_prices(self,x)
+
+    def from_intermediates(self,inter):
+        return kernels.shift(inter.rolling_std('returns',self.period))
+
+
+class SharedIntermediates:
+    """ Arrays of prices shared between indicators, each computed once
+
+    Intermediates are computed when first asked for and memoised, for an
+    IndicatorBank to share them between all its indicators.
+    """
+    def __init__(self,x):
+        """ initialize
+
+        Args:
+            - x: array of prices (time x tickers), or 1d for a single ticker
+        """
+        x = np.asarray(x,dtype=np.float64)
+        self.was_1d = x.ndim==1
+        if self.was_1d:
+            x = x[:,np.newaxis]
+        self.x = x
+        self.n_times = x.shape[0]
+        self._memo = dict()
+
+    def _get(self,key,make):
+        if key not in self._memo:
+            self._memo[key] = make()
+        return self._memo[key]
+
+    def as_input_shape(self,y):
+        """ reshape a (time x tickers) array like the input prices """
+        if self.was_1d:
+            return y[:,0]
+        return y
+
+    def cumsum(self):
+        """ cumulative sum of prices, see kernels.cumsum0 """
+        return self._get('cumsum',lambda: kernels.cumsum0(self.x))
+
+    def nancount(self):
+        """ cumulative count of NaN prices, see kernels.nancount0 """
+        return self._get('nancount',lambda: kernels.nancount0(self.x))
+
+    def sma(self,period):
+        """ simple moving average of prices """
+        return self._get(('sma',period),
+                         lambda: kernels.sma_from_cumsum(self.cumsum(),period,
+                                                         nans=self.nancount()))
+
+    def weighted_ma(self,period,win_type):
+        """ weighted moving average of prices with a window type, see
+        kernels.weighted_ma """
+        return self._get(('weighted_ma',period,win_type),
+                         lambda: kernels.weighted_ma(
+                                    self.x,kernels.window_weights(period,win_type)))
+
+    def ema(self,span):
+        """ exponential moving average of prices, see kernels.ema """
+        return self._get(('ema',span),lambda: kernels.ema(self.x,span=span))
+
+    def returns(self):
+        """ simple returns, NaN at the first time """
+        def make():
+            r = np.full(self.x.shape,np.nan)
+            with np.errstate(divide='ignore',invalid='ignore'):
+                r[1:] = self.x[1:]/self.x[:-1]-1.0
+            return r
+        return self._get('returns',make)
+
+    def changes(self):
+        """ price changes, NaN at the first time """
+        def make():
+            d = np.full(self.x.shape,np.nan)
+            d[1:] = self.x[1:]-self.x[:-1]
+            return d
+        return self._get('changes',make)
+
+    def _series(self,name):
+        """ series of intermediates by name, and the first time it is defined """
+        if name=='prices':
+            return self.x,0
+        if name=='returns':
+            return self.returns(),1
+        raise ValueError("unknown series: "+str(name))
+
+    def centred_cumsums(self,name):
+        """ centred cumulative sums (see kernels.centred_cumsums) of a series
+
+        Args:
+            - name: 'prices' or 'returns'
+        """
+        def make():
+            v,start = self._series(name)
+            return kernels.centred_cumsums(v[start:])
+        return self._get(('centred_cumsums',name),make)
+
+    def rolling_std(self,name,period):
+        """ rolling standard deviation of a series, NaN without a full window
+
+        Args:
+            - name: 'prices' or 'returns'
+            - period: number of points in each window
+        """
+        def make():
+            v,start = self._series(name)
+            std = np.full(v.shape,np.nan)
+            cs,cs_sq,nans = self.centred_cumsums(name)
+            std[start:] = kernels.rolling_std_from_cumsums(cs,cs_sq,period,
+                                                           nans=nans)
+            return std
+        return self._get(('rolling_std',name,period),make)
+
+    def wilder_gain_loss(self,period):
+        """ Wilder-smoothed gains and losses of prices, NaN at the first time """
+        def make():
+            d = self.changes()[1:]
+            gain = np.full(self.x.shape,np.nan)
+            loss = np.full(self.x.shape,np.nan)
+            if len(d)>0:
+                gain[1:] = kernels.ema(np.clip(d,0.0,None),alpha=1.0/period)
+                loss[1:] = kernels.ema(np.clip(-d,0.0,None),alpha=1.0/period)
+            return gain,loss
+        return self._get(('wilder',period),make)
+
+
+def _from_prices(indicator,x):
+    """ an indicator's from_intermediates on prices x, shaped like x, in the
+    float dtype of systrade.precision """
+    inter = SharedIntermediates(x)
+    return precision.as_float(inter.as_input_shape(indicator.from_intermediates(inter)))
+
+
+class IndicatorBank:
+    """ Many indicators computed together on the same prices
+
+    Indicators are registered by name, and computed from one SharedIntermediates
+    of the prices, so that intermediates used by several indicators (cumulative
+    sums, squared sums, returns, EMAs) are found once. Indicators without a
+    from_intermediates of their own are computed as usual.
+    """
+    def __init__(self,indicators=None):
+        """ initialize
+
+        Keyword Args:
+            - indicators: (optional) dictionary of names and indicators to
+                          register
+        """
+        self.indicators = dict()
+        if indicators is not None:
+            for name,indicator in indicators.items():
+                self.register(name,indicator)
+
+    def register(self,name,indicator):
+        """ register an indicator
+
+        Args:
+            - name: name of the indicator in the output
+            - indicator: a models.indicator object
+        Returns:
+            - self
+        """
+        if not isinstance(indicator,BaseIndicator):
+            raise TypeError("indicator should inherit models.base.BaseIndicator")
+        if name in self.indicators:
+            raise ValueError("an indicator is already registered as: "+str(name))
+        self.indicators[name] = indicator
+        return self
+
+    def __len__(self):
+        return len(self.indicators)
+
+    def get_indicator_arrays(self,x):
+        """ compute all indicators on an array of prices
+
+        Args:
+            - x: array of prices (time x tickers)
+        Returns:
+            - indis: array (indicators x time x tickers), in registered order,
+                     in the float dtype of systrade.precision
+        """
+        inter = SharedIntermediates(x)
+        indis = np.empty((len(self.indicators),)+inter.x.shape,
+                         dtype=precision.get_float_dtype())
+        for i,indicator in enumerate(self.indicators.values()):
+            indis[i] = np.asarray(indicator.from_intermediates(inter)).reshape(inter.x.shape)
+        return indis
+
+    def get_indicators(self,stock_df):
+        """ compute all indicators on stock(s)
+
+        Args:
+            - stock_df: dataframe of stock(s), indexed by time
+        Returns:
+            - indi_df: dataframe with columns of a MultiIndex of (indicator
+                       name, ticker), indexed by time
+        """
+        if isinstance(stock_df,pd.Series):
+            stock_df = stock_df.to_frame()
+        indis = self.get_indicator_arrays(stock_df.values)
+        n_times,n_ticks = indis.shape[1:]
+        columns = pd.MultiIndex.from_product([list(self.indicators.keys()),
+                                              stock_df.columns])
+        return pd.DataFrame(data=indis.transpose(1,0,2).reshape(n_times,-1),
+                            index=stock_df.index,columns=columns)
+
+
+class MACrossOverCache:
+    """ MACrossOver indicators of many period pairs, precomputed on one dataframe
+
+    While a cache is active (see use_cache), MACrossOver.get_indicator, without
+    a win_type, returns values from the cache when asked for a period pair it
+    holds on the same times as the cached data, for any subset of its tickers.
+    """
+    def __init__(self,stock_df,period_pairs):
+        """ compute indicators for all period pairs
+
+        Args:
+            - stock_df: dataframe of stock(s), indexed by time
+            - period_pairs: list of (period1,period2) tuples
+        """
+        pairs = sorted(set((int(p1),int(p2)) for p1,p2 in period_pairs))
+        self.index = stock_df.index
+        self.columns = stock_df.columns
+        values = batch_ma_crossover(stock_df.values,pairs)
+        self._values = {pair:values[i] for i,pair in enumerate(pairs)}
+
+    def __len__(self):
+        return len(self._values)
+
+    def lookup(self,stock_df,period1,period2):
+        """ get a cached indicator, or None if not available for stock_df
+
+        Args:
+            - stock_df: dataframe of stock(s), indexed by time
+            - period1: first period of the MACrossOver
+            - period2: second period of the MACrossOver
+        Returns:
+            - indi: dataframe of the indicator, as from MACrossOver.get_indicator,
+                    or None
+        """
+        values = self._values.get((period1,period2))
+        if values is None:
+            return None
+        if not (stock_df.index is self.index or stock_df.index.equals(self.index)):
+            return None
+        cols = self.columns.get_indexer(stock_df.columns)
+        if np.any(cols<0):
+            return None
+        return pd.DataFrame(data=values[:,cols],index=stock_df.index,
+                            columns=stock_df.columns)
+
+
+_ACTIVE_CACHES = []
+
+@contextmanager
+def use_cache(cache):
+    """ context in which MACrossOver indicators are read from a cache
+
+    Args:
+        - cache: a MACrossOverCache object
+    """
+    _ACTIVE_CACHES.append(cache)
+    try:
+        yield cache
+    finally:
+        _ACTIVE_CACHES.remove(cache)
+
 # -------------------- useful functions  ---------------------------------------
 
 def moving_average(x,period):
@@ -75,12 +652,50 @@ def moving_average(x,period):
         - x: numpy array to calculate moving average of (over axis 0)
         - p: period to use for moving average (units: number of elements)
     Returns:
-        -ma: moving average of x with period p, of shape(x)
+        -ma: moving average of x with period p, of shape(x). Points before a
+             full period are set to the first full average.
     """
-    if len(np.shape(x))==1:
-        np.expand_dims(x,axis=1)
-    cs=np.cumsum(x,axis=0)
-    ma=np.zeros_like(cs)
-    ma[period+1:] = (cs[period:-1]-cs[1:-period])/float(period)
-    ma[:period] = ma[period+1]
+    ma = kernels.sma(x,period)
+    ma[:period-1] = ma[period-1]
     return ma
+
+def _like_input(stock_df,values):
+    """ put indicator values in a dataframe (or series) like stock_df, in the
+    float dtype of systrade.precision """
+    values = precision.as_float(values)
+    if isinstance(stock_df,pd.Series):
+        return pd.Series(data=values,index=stock_df.index,name=stock_df.name)
+    return pd.DataFrame(data=values,index=stock_df.index,columns=stock_df.columns)
+
+def batch_ma_crossover(x,period_pairs):
+    """ MACrossOver indicators for many period pairs from one cumulative sum
+
+    The moving average of every period is a difference of the cumulative sum
+    of x, so the cumulative sum is found once and each distinct period costs a
+    single subtraction. Values match MACrossOver.get_indicator for each pair.
+
+    Args:
+        - x: 2d array of prices (time x tickers)
+        - period_pairs: list of (period1,period2) tuples
+    Returns:
+        - indis: array of shape (pairs x time x tickers)
+    """
+    x = np.asarray(x,dtype=np.float64)
+    if x.ndim==1:
+        x = x[:,np.newaxis]
+    n_times = x.shape[0]
+    cs = kernels.cumsum0(x)
+    nans = kernels.nancount0(x)
+    # moving average of bars before each time (i.e shifted by one bar)
+    averages = dict()
+    for p in set(p for pair in period_pairs for p in pair):
+        if p>=n_times:
+            raise ValueError("MACrossOver period(s) are longer than the data")
+        averages[p] = kernels.shift(kernels.sma_from_cumsum(cs,p,nans=nans))
+    indis = np.empty((len(period_pairs),)+x.shape,dtype=precision.get_float_dtype())
+    for i,(p1,p2) in enumerate(period_pairs):
+        max_p = max(p1,p2)
+        np.subtract(averages[p1],averages[p2],out=indis[i])
+        # repeat value at time max_p for all times up to then, as get_indicator
+        indis[i,:max_p] = indis[i,max_p]
+    return indis
@@ -0,0 +1,321 @@
+""" Module of rolling-window kernels on numpy arrays
+
+Kernels operate on 2d float arrays of shape (time x tickers), over axis 0 (1d
+arrays are treated as a single ticker and returned as 1d). Indicators build on
+these kernels and only convert to pandas DataFrames at their API boundary.
+
+Rolling kernels follow pandas conventions: the value at time t uses the window
+of points ending at (and including) t, and times without a full window are NaN.
+"""
+import functools
+
+import numpy as np
+from scipy import signal as sig
+
+# weighted_ma(method='auto') sums windows directly up to this period, and
+# convolves by FFT for longer windows
+DIRECT_MAX_PERIOD = 32
+
+
+def _as_2d(x):
+    """ get x as a 2d float array, and whether x was 1d """
+    x = np.asarray(x,dtype=np.float64)
+    if x.ndim==1:
+        return x[:,np.newaxis],True
+    if x.ndim!=2:
+        raise ValueError("kernels operate on 1d or 2d (time x tickers) arrays")
+    return x,False
+
+def _as_input_shape(y,was_1d):
+    if was_1d:
+        return y[:,0]
+    return y
+
+def _check_period(period,n_times):
+    if not isinstance(period,(int,np.integer)) or period<1:
+        raise ValueError("period should be a positive integer")
+    if period>n_times:
+        raise ValueError("period is longer than the data")
+
+
+def cumsum0(x):
+    """ cumulative sum over time with a leading row of zeros, NaNs taken as 0
+
+    Accumulated in float64, so that any window sum is a difference of two rows.
+    Windows holding NaNs are found from nancount0.
+
+    Args:
+        - x: array (time x tickers)
+    Returns:
+        - cs: array of shape (time+1 x tickers), cs[t] = sum of x[:t]
+    """
+    x,was_1d = _as_2d(x)
+    cs = np.zeros((x.shape[0]+1,x.shape[1]))
+    np.cumsum(np.where(np.isnan(x),0.0,x),axis=0,out=cs[1:])
+    return _as_input_shape(cs,was_1d)
+
+def nancount0(x):
+    """ cumulative count of NaNs over time with a leading row of zeros
+
+    Args:
+        - x: array (time x tickers)
+    Returns:
+        - counts: integer array (time+1 x tickers), counts[t] = NaNs in x[:t]
+    """
+    x,was_1d = _as_2d(x)
+    counts = np.zeros((x.shape[0]+1,x.shape[1]),dtype=np.int64)
+    np.cumsum(np.isnan(x),axis=0,out=counts[1:])
+    return _as_input_shape(counts,was_1d)
+
+def _window_diff(cs,period):
+    """ differences cs[t+period]-cs[t] of a cumulative sum (time+1 x tickers) """
+    n_times = cs.shape[0]-1
+    return cs[period:]-cs[:n_times-period+1]
+
+def sma_from_cumsum(cs,period,nans=None):
+    """ simple moving average from a cumulative sum given by cumsum0
+
+    Args:
+        - cs: array (time+1 x tickers) from cumsum0
+        - period: number of points to average over
+    Keyword Args:
+        - nans: (optional) array (time+1 x tickers) from nancount0 of the same
+                data, windows holding a NaN are NaN (as pandas). Without it
+                the data is taken to have no NaNs.
+    Returns:
+        - ma: array (time x tickers) of moving average
+    """
+    cs,was_1d = _as_2d(cs)
+    n_times = cs.shape[0]-1
+    _check_period(period,n_times)
+    ma = np.full((n_times,cs.shape[1]),np.nan)
+    ma[period-1:] = _window_diff(cs,period)/period
+    if nans is not None:
+        nans,_ = _as_2d(nans)
+        ma[period-1:][_window_diff(nans,period)>0] = np.nan
+    return _as_input_shape(ma,was_1d)
+
+def sma(x,period):
+    """ simple moving average
+
+    Args:
+        - x: array (time x tickers)
+        - period: number of points to average over
+    Returns:
+        - ma: array (time x tickers) of moving average, NaN for windows holding
+              a NaN
+    """
+    return sma_from_cumsum(cumsum0(x),period,nans=nancount0(x))
+
+def ema(x,span=None,alpha=None):
+    """ exponential moving average, by a linear recursive filter
+
+    y[t] = alpha*x[t] + (1-alpha)*y[t-1], with y[0] = x[0]. This is pandas
+    ewm(...,adjust=False).mean() for data without NaNs.
+
+    Args:
+        - x: array (time x tickers)
+    Keyword Args:
+        - span: span of the average, alpha = 2/(span+1)
+        - alpha: smoothing factor, on (0,1]. Give one of span or alpha.
+    Returns:
+        - ma: array (time x tickers) of moving average
+    """
+    if (span is None)==(alpha is None):
+        raise ValueError("give exactly one of span or alpha")
+    if span is not None:
+        if span<1:
+            raise ValueError("span should be >= 1")
+        alpha = 2.0/(span+1.0)
+    if not 0.0<alpha<=1.0:
+        raise ValueError("alpha should be on (0,1]")
+    x,was_1d = _as_2d(x)
+    if x.shape[0]==0:
+        return _as_input_shape(x.copy(),was_1d)
+    zi = (1.0-alpha)*x[:1]
+    ma,_ = sig.lfilter([alpha],[1.0,alpha-1.0],x,axis=0,zi=zi)
+    return _as_input_shape(ma,was_1d)
+
+@functools.lru_cache(maxsize=128)
+def window_weights(period,win_type):
+    """ weights of a window type, as used for pandas rolling windows
+
+    Weights are cached per (period, win_type), and returned read-only.
+
+    Args:
+        - period: number of points in the window
+        - win_type: scipy.signal window type, e.g 'hamming', or tuple of type
+                    and its parameters, e.g ('gaussian',5)
+    Returns:
+        - weights: array of size period
+    """
+    weights = sig.get_window(win_type,period,fftbins=False)
+    weights.setflags(write=False)
+    return weights
+
+def _fft_size(n):
+    return 1<<int(np.ceil(np.log2(n)))
+
+def _convolve_fft(x,kernel,n_out):
+    """ first n_out points of the full convolution of x (over axis 0) by kernel
+    as a single FFT of the whole of x """
+    n_fft = _fft_size(x.shape[0]+len(kernel)-1)
+    conv = np.fft.irfft(np.fft.rfft(x,n_fft,axis=0)
+                        *np.fft.rfft(kernel,n_fft)[:,np.newaxis],
+                        n_fft,axis=0)
+    return conv[:n_out]
+
+def _convolve_overlap_add(x,kernel,n_out):
+    """ first n_out points of the full convolution of x (over axis 0) by kernel
+
+    by overlap-add: x is split into blocks, each convolved by an FFT of a size
+    set by the kernel rather than by x, and the tail of each block's
+    convolution added to the start of the next. All blocks (and tickers) are
+    transformed together.
+    """
+    period = len(kernel)
+    n_fft = _fft_size(8*period)
+    block = n_fft-period+1
+    n_blocks = -(-n_out//block)
+    padded = np.zeros((n_blocks*block,x.shape[1]))
+    n_in = min(x.shape[0],n_blocks*block)
+    padded[:n_in] = x[:n_in]
+    blocks = padded.reshape(n_blocks,block,x.shape[1])
+    conv = np.fft.irfft(np.fft.rfft(blocks,n_fft,axis=1)
+                        *np.fft.rfft(kernel,n_fft)[np.newaxis,:,np.newaxis],
+                        n_fft,axis=1)
+    out = conv[:,:block].copy()
+    out[1:,:period-1] += conv[:-1,block:block+period-1]
+    return out.reshape(n_blocks*block,x.shape[1])[:n_out]
+
+def weighted_ma(x,weights,method='auto'):
+    """ weighted moving average with given window weights
+
+    y[t] = sum_k weights[k]*x[t-period+1+k] / sum(weights)
+
+    Args:
+        - x: array (time x tickers)
+        - weights: window weights, oldest point first, size period
+    Keyword Args:
+        - method: 'direct' to sum over the window (cost ~ time*period), 'fft'
+                  to convolve by a single FFT (cost ~ time*log(time)),
+                  'overlap_add' to convolve by FFTs of blocks (cost ~
+                  time*log(period)), or 'auto' (default) for 'direct' with
+                  periods up to DIRECT_MAX_PERIOD and 'overlap_add' otherwise.
+                  With either FFT, NaNs are convolved as zeros and the windows
+                  holding them set to NaN, as the direct sum (and pandas).
+    Returns:
+        - ma: array (time x tickers) of weighted moving average
+    """
+    x,was_1d = _as_2d(x)
+    weights = np.asarray(weights,dtype=np.float64)
+    period = len(weights)
+    n_times = x.shape[0]
+    _check_period(period,n_times)
+    if method=='auto':
+        method = 'direct' if period<=DIRECT_MAX_PERIOD else 'overlap_add'
+    ma = np.full(x.shape,np.nan)
+    if method=='direct':
+        valid = np.zeros((n_times-period+1,x.shape[1]))
+        for k in range(period):
+            valid += weights[k]*x[k:n_times-period+1+k]
+    elif method in ('fft','overlap_add'):
+        # a NaN would spread over the whole FFT block
+        nans = nancount0(x) if np.isnan(x).any() else None
+        if nans is not None:
+            x = np.where(np.isnan(x),0.0,x)
+        convolve = _convolve_fft if method=='fft' else _convolve_overlap_add
+        valid = convolve(x,weights[::-1],n_times)[period-1:]
+        if nans is not None:
+            valid[_window_diff(nans,period)>0] = np.nan
+    else:
+        raise ValueError("method should be 'auto', 'direct', 'fft' or 'overlap_add'")
+    ma[period-1:] = valid/np.sum(weights)
+    return _as_input_shape(ma,was_1d)
+
+def rolling_std(x,period,ddof=1):
+    """ rolling standard deviation
+
+    Found from cumulative sums of x and x**2, after removing the mean of each
+    ticker to limit cancellation error.
+
+    Args:
+        - x: array (time x tickers)
+        - period: number of points in each window
+    Keyword Args:
+        - ddof: delta degrees of freedom (defaults to 1, as pandas)
+    Returns:
+        - std: array (time x tickers)
+    """
+    x,was_1d = _as_2d(x)
+    cs,cs_sq,nans = centred_cumsums(x)
+    return _as_input_shape(rolling_std_from_cumsums(cs,cs_sq,period,ddof,nans=nans),
+                           was_1d)
+
+def centred_cumsums(x):
+    """ cumulative sums of x and x**2, after removing the mean of each ticker
+
+    Args:
+        - x: array (time x tickers)
+    Returns:
+        - (cs,cs_sq,nans): arrays (time+1 x tickers), as from cumsum0, and the
+                           cumulative count of NaNs, as from nancount0
+    """
+    x,was_1d = _as_2d(x)
+    with np.errstate(invalid='ignore'):
+        centred = x-np.nanmean(x,axis=0)
+    return (_as_input_shape(cumsum0(centred),was_1d),
+            _as_input_shape(cumsum0(centred**2),was_1d),
+            _as_input_shape(nancount0(x),was_1d))
+
+def rolling_std_from_cumsums(cs,cs_sq,period,ddof=1,nans=None):
+    """ rolling standard deviation from cumulative sums of centred_cumsums
+
+    Args:
+        - cs: array (time+1 x tickers), cumulative sum of (centred) x
+        - cs_sq: array (time+1 x tickers), cumulative sum of (centred) x**2
+        - period: number of points in each window
+    Keyword Args:
+        - ddof: delta degrees of freedom (defaults to 1, as pandas)
+        - nans: (optional) cumulative count of NaNs of x, windows holding a NaN
+                are NaN
+    Returns:
+        - std: array (time x tickers)
+    """
+    if period<=ddof:
+        raise ValueError("period should be greater than ddof")
+    mean = sma_from_cumsum(cs,period,nans=nans)
+    mean_sq = sma_from_cumsum(cs_sq,period,nans=nans)
+    var = (mean_sq-mean**2)*period/(period-ddof)
+    return np.sqrt(np.clip(var,0.0,None))
+
+def rolling_zscore(x,period):
+    """ rolling z-score: distance of x from its moving average in rolling std
+
+    Args:
+        - x: array (time x tickers)
+        - period: number of points in each window
+    Returns:
+        - z: array (time x tickers), NaN where the rolling std is 0
+    """
+    x,was_1d = _as_2d(x)
+    std = rolling_std(x,period)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        z = np.where(std>0.0,(x-sma(x,period))/std,np.nan)
+    return _as_input_shape(z,was_1d)
+
+def shift(x,n=1):
+    """ shift x forward in time by n points, filling with NaN
+
+    Args:
+        - x: array (time x tickers)
+    Keyword Args:
+        - n: (int >= 0) number of points to shift by, defaults to 1
+    Returns:
+        - shifted: array (time x tickers)
+    """
+    x,was_1d = _as_2d(x)
+    shifted = np.full(x.shape,np.nan)
+    if n<len(x):
+        shifted[n:] = x[:len(x)-n]
+    return _as_input_shape(shifted,was_1d)
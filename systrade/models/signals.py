@@ -12,24 +12,132 @@ import numpy as np
 import pandas as pd
 
 from .base import BaseSignal
+from .base import BaseIncrementalIndicator
+from . import filters
+from . import sparse
+from .features import FeatureBuilder
+from .features import FeatureCache
+from .features import design_matrix
 
 
+def _output_columns(filter,columns):
+    """ output tickers of a filter, and the input column each takes signals from
+
+    Each output ticker takes the signals of the last input column mapped to it
+    (as when building a dictionary column by column).
+    """
+    if filter is not None and not hasattr(filter,'compile'):
+        compiled = filters.CompiledFilter.from_output_map(
+                        columns,columns,filter.output_map())
+    else:
+        compiled = filters.compile_filter(filter,columns)
+    return compiled.out_tickers,compiled.in_positions[compiled.out_sources]
+
+def _zero_crossings(indi,times,tickers_out,source_cols,signal_name):
+    """ signals where columns of indi cross zero, +1 upwards and -1 downwards
+
+    Args:
+        - indi: array (time x columns)
+        - times: pandas DatetimeIndex of indi
+        - tickers_out: list of output tickers
+        - source_cols: array of the column of indi of each output ticker
+        - signal_name: a name to give the signals
+    Returns:
+        - signals: a models.sparse.SparseSignals object
+    """
+    indi = np.asarray(indi,dtype=np.float64)
+    if indi.ndim==1:
+        indi = indi[:,np.newaxis]
+    # crossing where indicator changes sign between consecutive times
+    # (NaN comparisons are False, so no crossing is seen at the first time)
+    with np.errstate(invalid='ignore'):
+        cross = indi[1:]*indi[:-1]<0.0
+    rows,cols = np.nonzero(cross)
+    grads = np.sign(indi[rows+1,cols]-indi[rows,cols])
+    return _signals_by_output(rows+1,cols,grads,indi.shape[1],times,
+                              tickers_out,source_cols,signal_name)
+
+def _event_points(events):
+    """ (rows,cols) of events, ordered by column and then by time """
+    order = np.lexsort((events.positions,events.ticker_ids))
+    return (events.positions[order].astype(np.int64),
+            events.ticker_ids[order].astype(np.int64))
+
+def _event_crossings(sampled,rows,cols,n_cols,times,tickers_out,source_cols,
+                     signal_name):
+    """ signals where an indicator, sampled at events, crosses zero
+
+    A signal is given at an event of a column when the indicator has changed
+    sign since the column's previous event, +1 upwards and -1 downwards.
+
+    Args:
+        - sampled: array of the indicator at each event
+        - rows: array of the index into time of each event
+        - cols: array of the column of each event, events ordered by column
+                and then by time (see _event_points)
+        - n_cols: number of columns of the indicator
+        - times: pandas DatetimeIndex of the indicator
+        - tickers_out: list of output tickers
+        - source_cols: array of the column of the indicator of each output
+                       ticker
+        - signal_name: a name to give the signals
+    Returns:
+        - signals: a models.sparse.SparseSignals object
+    """
+    sampled = np.asarray(sampled,dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        cross = (cols[1:]==cols[:-1])&(sampled[1:]*sampled[:-1]<0.0)
+    idx = np.flatnonzero(cross)+1
+    grads = np.sign(sampled[idx]-sampled[idx-1])
+    return _signals_by_output(rows[idx],cols[idx],grads,n_cols,times,
+                              tickers_out,source_cols,signal_name)
+
+def _signals_by_output(rows,cols,grads,n_cols,times,tickers_out,source_cols,
+                       signal_name):
+    """ signals of output tickers from signals (rows,cols,grads) of columns,
+    each output ticker taking the signals of its source column """
+    # group signals by column, keeping time order within each column
+    order = np.argsort(cols,kind='stable')
+    rows,cols,grads = rows[order],cols[order],grads[order]
+    col_starts = np.searchsorted(cols,np.arange(n_cols+1))
+    lengths = col_starts[source_cols+1]-col_starts[source_cols]
+    out_starts = np.cumsum(lengths)-lengths
+    take = np.arange(np.sum(lengths))+np.repeat(col_starts[source_cols]-out_starts,
+                                                lengths)
+    return sparse.SparseSignals(times,
+                                tickers_out,
+                                rows[take],
+                                np.repeat(np.arange(len(tickers_out)),lengths),
+                                grads[take],
+                                name=signal_name)
+
 
 class ZeroCrossBuyUpSellDown(BaseSignal):
     """ Signal that checks for indicator crossing zero
 
     This signal goves a buy signal for positive gradient crossing, and sell for
     a negative gradient crossing
+
+    With an event sampler (e.g models.events.CusumEventSampler), the indicator
+    is only looked at on each ticker's event bars: a signal is given at an
+    event bar when the indicator has changed sign since the ticker's previous
+    event bar.
     """
-    def __init__(self,indicator,filter,extra_param=0.0):
+    def __init__(self,indicator,filter,extra_param=0.0,event_sampler=None):
         """ Signal initialised with an indicator and a filter, and other params
         Args:
             - indicator: a models.indicator object to collect indicator for
                          signal to base its decisions on
             - filter: a models.filter object for ticker selection
             - extra_param: an extra parameter of this signal
+            - event_sampler: (optional) a models.events object giving the bars
+                             at which to look for crossings, defaults to all
+                             bars
         """
+        if event_sampler is not None and not hasattr(event_sampler,'get_events'):
+            raise TypeError("event_sampler should provide get_events")
         self.extra_param=extra_param
+        self.event_sampler=event_sampler
         super().__init__(indicator,filter)
 
 
@@ -45,31 +153,259 @@ class ZeroCrossBuyUpSellDown(BaseSignal):
                            signal considers (selected by this signal's filter),
                            and values being dataframes, indexed by times at which
                            signals are seen, and a column named by argument
-                           'signal_name', with +/-1 for a buy/sell signal.
+                           'signal_name', with +/-1 for a buy/sell signal. This
+                           is a read-only view of request_historical_sparse,
+                           building each dataframe when first accessed.
+        """
+        return self.request_historical_sparse(stocks_df,signal_name).as_dict()
+
+    def request_historical_sparse(self,stocks_df,signal_name='signal'):
+        """ use historical data to get signals in compact form
+
+        Crossings of all tickers are found together on the 2d indicator array.
+
+        Args:
+            - stocks_df: pandas dataframe of tickers over time
+            - signal_name: a name to give this signal
+
+        Returns:
+            - signals: a models.sparse.SparseSignals object, with tickers being
+                       the tickers that the signal considers (selected by this
+                       signal's filter), and values +/-1 for a buy/sell signal.
         """
         if not isinstance(signal_name,str):
             raise TypeError("singal_name must be a string")
-        if not isinstance(stocks_df,pd.DataFrame):
-            raise TypeError("singal_name must be a string")
-        if self.filter is not None:
-            stock_df = self.filter.apply_in(stocks_df) # new df, not overwritten
+        stock_df = self.input_frame(stocks_df)
+        columns = stock_df.columns.to_list()
+        if self.event_sampler is not None:
+            # the indicator is only needed at events
+            rows,cols = _event_points(self.event_sampler.get_events(stock_df))
+            sampled = self.indicator.get_indicator_at(stock_df,rows,cols)
+            tickers_out,source_cols = self._output_columns(columns)
+            return _event_crossings(sampled,rows,cols,len(columns),
+                                    stock_df.index,tickers_out,source_cols,
+                                    signal_name)
+        indi = self.indicator.get_indicator(stock_df)
+        return self.signals_from_indicator(indi,stock_df.index,columns,
+                                           signal_name)
+
+    def signals_from_indicator(self,indi,times,columns,signal_name='signal',
+                               events=None):
+        """ find signals from this signal's indicator, already computed
+
+        Crossings of all tickers are found together on the 2d indicator array.
+        With an event sampler, the events of the prices of columns should be
+        given, as the sampler needs the prices.
+
+        Args:
+            - indi: array (or dataframe) of the indicator (time x columns)
+            - times: pandas DatetimeIndex of the indicator
+            - columns: list of tickers of the columns of indi, the tickers
+                       selected by the filter's apply_in
+            - signal_name: a name to give this signal
+            - events: (optional) models.sparse.SparseSignals of the events of
+                      the event sampler on the columns, as from its get_events
+
+        Returns:
+            - signals: a models.sparse.SparseSignals object, see
+                       request_historical_sparse
+        """
+        tickers_out,source_cols = self._output_columns(columns)
+        if self.event_sampler is None:
+            return _zero_crossings(indi,times,tickers_out,source_cols,signal_name)
+        if events is None:
+            raise ValueError("events are needed to find signals with an event sampler")
+        indi = np.asarray(indi,dtype=np.float64)
+        if indi.ndim==1:
+            indi = indi[:,np.newaxis]
+        rows,cols = _event_points(events)
+        return _event_crossings(indi[rows,cols],rows,cols,indi.shape[1],times,
+                                tickers_out,source_cols,signal_name)
+
+    def _output_columns(self,columns):
+        """ output tickers, and the input column each takes its signals from """
+        return _output_columns(self.filter,columns)
+
+    def fast_clone(self):
+        """ clone the parameter tree of the signal, see
+        BaseParameterizedObject.fast_clone. Any bar by bar state is copied,
+        not shared.
+        """
+        new = super().fast_clone()
+        if hasattr(self,'_live_state'):
+            new._live_state = copy.deepcopy(self._live_state)
+        return new
+
+    def init_live(self,tickers):
+        """ initialize bar by bar signals, see BaseSignal.init_live
+
+        Requires an incremental indicator (see base.BaseIncrementalIndicator),
+        and an event sampler that can be updated bar by bar, if any.
+        """
+        if not isinstance(self.indicator,BaseIncrementalIndicator):
+            raise TypeError("live signals need an incremental indicator")
+        if self.event_sampler is not None and not hasattr(self.event_sampler,'update'):
+            raise TypeError("live signals need an event sampler with update")
+        tickers = list(tickers)
+        columns = self.input_frame(pd.DataFrame(columns=tickers)).columns.to_list()
+        tickers_out,source_cols = self._output_columns(columns)
+        self.indicator.init_state(len(columns))
+        if self.event_sampler is not None:
+            self.event_sampler.init_state(len(columns))
+        self._live_state = {'in_positions': pd.Index(tickers).get_indexer(columns),
+                            'tickers_out': tickers_out,
+                            'source_cols': source_cols,
+                            'previous': np.full((len(columns),),np.nan)}
+
+    def update_live(self,bar):
+        """ update with the next bar, and get signals at that bar's time
+
+        Crossings are those request_historical_sparse finds at the same time,
+        once the indicator has its full history (at the previous event bar,
+        with an event sampler).
+
+        Args:
+            - bar: array of prices of the tickers given to init_live, at the
+                   next time
+        Returns:
+            - (tickers,values): list of tickers with a signal at this bar, and
+                                array of their values, +/-1 for buy/sell
+        """
+        state = getattr(self,'_live_state',None)
+        if state is None:
+            raise RuntimeError("init_live should be called before update_live")
+        bar = np.asarray(bar,dtype=np.float64)
+        prices = bar[state['in_positions']]
+        indi = np.asarray(self.indicator.update(prices))
+        # indicator at the previous bar, or at the previous event bar
+        previous = state['previous']
+        with np.errstate(invalid='ignore'):
+            cross = indi*previous<0.0
+        grads = np.sign(indi-previous)
+        if self.event_sampler is not None:
+            sampled = self.event_sampler.update(prices)!=0
+            cross &= sampled
+            state['previous'] = np.where(sampled,indi,previous)
         else:
-            stock_df = stocks_df
+            state['previous'] = indi
+        outs = np.flatnonzero(cross[state['source_cols']])
+        return ([state['tickers_out'][i] for i in outs],
+                grads[state['source_cols'][outs]].astype(sparse.VALUE_DTYPE))
 
-        indi = self.indicator.get_indicator(stock_df)
-        signal_dict = dict()
-        in_to_out_dict = self.filter.output_map()
-        # loop over tickers
-        for c in stock_df.columns.to_list():
-            indi_comp_0 = indi[c].values*indi[c].shift().values # <zero at cross
-            indi_comp_0[0] = 1.0 # instead of NaN - make >0 - supresses warnings
-            indi_comp_g = np.sign(indi[c].values-indi[c].shift().values) #grad - up or down
-            cross_inds  = np.where(indi_comp_0<0.0) # indices of crossing
-            # for this ticker, dataframe of all crossing times, and whether indicator
-            # was growing or falling
-            mydf = pd.DataFrame(index=stock_df.iloc[cross_inds].index,
-                                data={signal_name:indi_comp_g[cross_inds]})
-            # append dataframe into dict of signals
-            for tick_out in in_to_out_dict[c]:
-                signal_dict[tick_out] = mydf
-        return signal_dict
+
+class _Identity:
+    """ hashable key of an object by identity, keeping the object alive """
+    def __init__(self,obj):
+        self.obj = obj
+
+    def __hash__(self):
+        return id(self.obj)
+
+    def __eq__(self,other):
+        return isinstance(other,_Identity) and other.obj is self.obj
+
+
+class ModelSignal(BaseSignal):
+    """ Signal from the predictions of a model on lagged indicator features
+
+    A fitted model (any object with the scikit-learn predict API, e.g an
+    estimator or pipeline) predicts from the FeatureBuilder's windows of the
+    last n_lags values of its indicators, for all tickers and times in one
+    batch. A buy signal is given when the prediction crosses above threshold,
+    and a sell signal when it crosses below.
+
+    Features and predictions are memoised in a models.features.FeatureCache
+    shared by all clones of the signal, so that a parameter scan over e.g the
+    threshold computes them once. The estimator is shared by fast clones, and
+    should not be refit once in use.
+    """
+    RESPONSES = ('predict','predict_proba','decision_function')
+
+    def __init__(self,features,estimator,filter=None,threshold=0.0,
+                 response='predict'):
+        """ initialize
+
+        Args:
+            - features: a models.features.FeatureBuilder of the model's inputs
+            - estimator: fitted model taking arrays (samples x n_lags*features)
+                         of windows flattened in C order, see
+                         models.features.design_matrix
+        Keyword Args:
+            - filter: a models.filter object for ticker selection
+            - threshold: value of the model output to signal crossings of,
+                         defaults to 0
+            - response: method of the estimator giving its output, one of
+                        'predict' (default), 'predict_proba' (taking the
+                        probability of the last class) or 'decision_function'
+        """
+        if not isinstance(features,FeatureBuilder):
+            raise TypeError("features should be a models.features.FeatureBuilder")
+        if response not in self.RESPONSES:
+            raise ValueError("response should be one of: "+str(self.RESPONSES))
+        if not hasattr(estimator,response):
+            raise TypeError("estimator has no method "+response)
+        self.features = features
+        self.estimator = estimator
+        self.threshold = threshold
+        self.response = response
+        self.feature_cache = FeatureCache()
+        super().__init__(None,filter)
+
+    def get_predictions(self,stock_df):
+        """ model output for each ticker at each time
+
+        Args:
+            - stock_df: dataframe of stock(s), indexed by time
+        Returns:
+            - predictions: array (time x tickers), NaN where the window of
+                           features is incomplete (or has NaNs)
+        """
+        key = ('predictions',self.features.key(),self.features.n_lags,
+               _Identity(self.estimator),self.response)
+        def make():
+            windows = self.features.get_lagged_features(stock_df,
+                                                        cache=self.feature_cache)
+            X,valid = design_matrix(windows)
+            predictions = np.full(stock_df.shape,np.nan)
+            if len(X)>0:
+                y = np.asarray(getattr(self.estimator,self.response)(X),
+                               dtype=np.float64)
+                if y.ndim==2:
+                    y = y[:,-1]
+                predictions[self.features.n_lags-1:][valid] = y
+            return predictions
+        return self.feature_cache.get(key,stock_df,make)
+
+    def request_historical(self,stocks_df,signal_name='signal'):
+        """ use historical data to get a dictionary of signals
+
+        Args:
+            - stocks_df: pandas dataframe of tickers over time
+            - signal_name: a name to give this signal as output column
+
+        Returns:
+            - signal_dict: a dictionary of tickers and dataframes of signals,
+                           see ZeroCrossBuyUpSellDown.request_historical
+        """
+        return self.request_historical_sparse(stocks_df,signal_name).as_dict()
+
+    def request_historical_sparse(self,stocks_df,signal_name='signal'):
+        """ use historical data to get signals in compact form
+
+        Args:
+            - stocks_df: pandas dataframe of tickers over time
+            - signal_name: a name to give this signal
+
+        Returns:
+            - signals: a models.sparse.SparseSignals object, with tickers being
+                       the tickers that the signal considers (selected by this
+                       signal's filter), and values +/-1 for a buy/sell signal.
+        """
+        if not isinstance(signal_name,str):
+            raise TypeError("singal_name must be a string")
+        stock_df = self.input_frame(stocks_df)
+        score = self.get_predictions(stock_df)-self.threshold
+        tickers_out,source_cols = _output_columns(self.filter,
+                                                  stock_df.columns.to_list())
+        return _zero_crossings(score,stock_df.index,tickers_out,source_cols,
+                               signal_name)
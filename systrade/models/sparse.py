@@ -0,0 +1,306 @@
+""" Module for compact (sparse) storage of buy/sell signals
+
+Signals are rare events on a (time x tickers) grid. Rather than a dataframe per
+ticker, SparseSignals stores all signals of a signal object as three flat
+arrays: the bar index (int32) into a time index, the ticker id (int16) into a
+list of tickers, and the signal value (int8, +1 buy / -1 sell).
+
+SignalDictView presents SparseSignals with the dictionary-of-dataframes
+contract of BaseSignal.request_historical, building each ticker's dataframe
+only when it is asked for.
+
+Signals of several signal objects are combined with merge_signals, and summed
+into time buckets (as strategies collate them) with resample_to_bucket.
+"""
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+POSITION_DTYPE = np.int32
+TICKER_DTYPE = np.int16
+VALUE_DTYPE = np.int8
+
+
+class SparseSignals:
+    """ Signals of many tickers as flat arrays of positions, tickers, values """
+    def __init__(self,times,tickers,positions,ticker_ids,values,name='signal'):
+        """ initialize
+
+        Args:
+            - times: pandas DatetimeIndex that positions index into
+            - tickers: list of tickers that ticker_ids index into
+            - positions: integer array, index into times of each signal
+            - ticker_ids: integer array, index into tickers of each signal
+            - values: array of signal values (+/-1 for buy/sell)
+
+        Keyword Args:
+            - name: name of the signal (defaults to 'signal')
+        """
+        self.times = times
+        self.tickers = list(tickers)
+        if len(self.tickers)>np.iinfo(TICKER_DTYPE).max:
+            raise ValueError("too many tickers for SparseSignals")
+        self.positions = np.asarray(positions,dtype=POSITION_DTYPE)
+        self.ticker_ids = np.asarray(ticker_ids,dtype=TICKER_DTYPE)
+        self.values = np.asarray(values,dtype=VALUE_DTYPE)
+        if not (len(self.positions)==len(self.ticker_ids)==len(self.values)):
+            raise ValueError("positions, ticker_ids and values should be the"
+                             " same length")
+        self.name = name
+        self._order = None
+        self._tick_index = {t:i for i,t in enumerate(self.tickers)}
+
+    @classmethod
+    def from_dict(cls,signal_dict,times,name='signal'):
+        """ make SparseSignals from a dictionary of signal dataframes
+
+        Args:
+            - signal_dict: dictionary of signals, as from request_historical of
+                           a models.signals object
+            - times: pandas DatetimeIndex including all times of the signals
+        Keyword Args:
+            - name: name of the signal (defaults to 'signal')
+        Returns:
+            - signals: SparseSignals object
+        """
+        times = pd.DatetimeIndex(times)
+        tickers = list(signal_dict.keys())
+        positions = []
+        values = []
+        for df in signal_dict.values():
+            pos = times.get_indexer(df.index)
+            if np.any(pos<0):
+                raise ValueError("signal times should be within times")
+            vals = np.asarray(df.values,dtype=np.float64).ravel()
+            if np.any(vals!=np.round(vals)):
+                raise ValueError("signal values should be integers, e.g +/-1")
+            positions.append(pos)
+            values.append(vals)
+        lengths = [len(p) for p in positions]
+        if len(tickers)>0:
+            positions = np.concatenate(positions)
+            values = np.concatenate(values)
+        return cls(times,tickers,positions,
+                   np.repeat(np.arange(len(tickers)),lengths),
+                   values,name=name)
+
+    @classmethod
+    def from_dense(cls,matrix,times,tickers,name='signal'):
+        """ make SparseSignals from a dense (time x tickers) matrix of signals
+
+        Args:
+            - matrix: integer array (time x tickers), non-zero where there is a
+                      signal
+            - times: pandas DatetimeIndex of the rows of matrix
+            - tickers: list of tickers of the columns of matrix
+        Keyword Args:
+            - name: name of the signal (defaults to 'signal')
+        Returns:
+            - signals: SparseSignals object
+        """
+        matrix = np.asarray(matrix)
+        if matrix.shape!=(len(times),len(tickers)):
+            raise ValueError("matrix should be of shape (times x tickers)")
+        positions,ticker_ids = np.nonzero(matrix)
+        return cls(times,tickers,positions,ticker_ids,
+                   matrix[positions,ticker_ids],name=name)
+
+    def to_dense(self):
+        """ signals as a dense int8 matrix (time x tickers), 0 without a signal
+
+        Signals at the same time and ticker are summed, clipped to the range of
+        int8.
+        """
+        shape = (len(self.times),len(self.tickers))
+        flat = self.positions.astype(np.int64)*shape[1]+self.ticker_ids
+        unique,inverse = np.unique(flat,return_inverse=True)
+        sums = np.zeros((len(unique),),dtype=np.int64)
+        np.add.at(sums,inverse,self.values)
+        info = np.iinfo(VALUE_DTYPE)
+        dense = np.zeros(shape,dtype=VALUE_DTYPE)
+        dense.flat[unique] = np.clip(sums,info.min,info.max)
+        return dense
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self,ticker):
+        return ticker in self._tick_index
+
+    @property
+    def nbytes(self):
+        """ memory used by the signal arrays, in bytes """
+        return self.positions.nbytes+self.ticker_ids.nbytes+self.values.nbytes
+
+    def _ticker_slices(self):
+        """ order of signals by (ticker, position), and start of each ticker """
+        if self._order is None:
+            order = np.lexsort((self.positions,self.ticker_ids))
+            starts = np.searchsorted(self.ticker_ids[order],
+                                     np.arange(len(self.tickers)+1))
+            self._order = (order,starts)
+        return self._order
+
+    def sorted_by_ticker(self):
+        """ all signals sorted by ticker, and by time within each ticker
+
+        Returns:
+            - (positions,ticker_ids,values): arrays
+        """
+        order,_ = self._ticker_slices()
+        return self.positions[order],self.ticker_ids[order],self.values[order]
+
+    def ticker_signals(self,ticker):
+        """ positions and values of signals on one ticker, in time order
+
+        Args:
+            - ticker: ticker to get signals of
+        Returns:
+            - (positions,values): arrays
+        """
+        tick_id = self._tick_index[ticker]
+        order,starts = self._ticker_slices()
+        inds = order[starts[tick_id]:starts[tick_id+1]]
+        return self.positions[inds],self.values[inds]
+
+    def ticker_df(self,ticker):
+        """ dataframe of signals on one ticker, as from request_historical
+
+        Args:
+            - ticker: ticker to get signals of
+        Returns:
+            - df: dataframe indexed by times of signals, with a float column
+                  named by this signal's name, +/-1 for buy/sell
+        """
+        positions,values = self.ticker_signals(ticker)
+        return pd.DataFrame(index=self.times[positions],
+                            data={self.name:values.astype(np.float64)})
+
+    def as_dict(self):
+        """ get a lazy dictionary-of-dataframes view, see SignalDictView """
+        return SignalDictView(self)
+
+    def resample_to_bucket(self,minutes):
+        """ sum signals of each ticker over time buckets
+
+        Buckets follow pandas resample(str(minutes)+'T',closed='right',
+        label='right') of each ticker's signals: bucket edges are multiples of
+        the bucket size from midnight of the ticker's first signal, a bucket
+        includes its right edge and is labelled by it. Bucket labels are found
+        with integer arithmetic on the signal timestamps, for all tickers at
+        once.
+
+        Args:
+            - minutes: (int) size of the buckets in minutes
+        Returns:
+            - bucketed: SparseSignals with times being the labels of buckets
+                        with any signals, and values the sum of signals in each
+                        bucket, where that sum is not zero. Sums are clipped to
+                        the range of int8, preserving their sign.
+        """
+        if not isinstance(minutes,(int,np.integer)) or minutes<1:
+            raise ValueError("minutes should be a positive integer")
+        order,starts = self._ticker_slices()
+        ids = self.ticker_ids[order].astype(np.int64)
+        t_ns = self.times.asi8[self.positions[order]]
+        values = self.values[order].astype(np.int64)
+        if len(values)==0:
+            return SparseSignals(self.times[:0],self.tickers,[],[],[],name=self.name)
+
+        # signals are sorted by ticker and time: the first of each ticker is
+        # its earliest, whose day is the origin of that ticker's buckets
+        has_sigs = starts[1:]>starts[:-1]
+        first_times = self.times[self.positions[order[starts[:-1][has_sigs]]]]
+        day0 = np.zeros((len(self.tickers),),dtype=np.int64)
+        day0[has_sigs] = first_times.floor('D').asi8
+        size = np.int64(minutes)*60*10**9
+        rel = t_ns-day0[ids]
+        labels = day0[ids]-((-rel)//size)*size # ceil to bucket right edge
+
+        new_group = np.ones((len(values),),dtype=bool)
+        new_group[1:] = (ids[1:]!=ids[:-1])|(labels[1:]!=labels[:-1])
+        group_starts = np.flatnonzero(new_group)
+        sums = np.add.reduceat(values,group_starts)
+        keep = sums!=0
+        group_ids = ids[group_starts][keep]
+        group_labels = labels[group_starts][keep]
+        info = np.iinfo(VALUE_DTYPE)
+        sums = np.clip(sums[keep],info.min,info.max)
+
+        unique_labels = np.unique(group_labels)
+        bucket_times = pd.DatetimeIndex(unique_labels)
+        if self.times.tz is not None:
+            bucket_times = bucket_times.tz_localize('UTC').tz_convert(self.times.tz)
+        return SparseSignals(bucket_times,self.tickers,
+                             np.searchsorted(unique_labels,group_labels),
+                             group_ids,sums,name=self.name)
+
+
+def merge_signals(signal_list,tickers=None,name='signal'):
+    """ merge many SparseSignals into one
+
+    Args:
+        - signal_list: list of SparseSignals objects
+    Keyword Args:
+        - tickers: (optional) list of tickers of the merged signals. Defaults to
+                   all tickers of the signals, in order of first appearance. If
+                   given, all tickers of the signals should be in this list.
+        - name: name of the merged signal (defaults to 'signal')
+    Returns:
+        - merged: SparseSignals with all signals of signal_list. The times of
+                  the merged signals are the union of the times of each.
+    """
+    if tickers is None:
+        tickers = []
+        for sigs in signal_list:
+            tickers.extend(t for t in sigs.tickers if t not in tickers)
+    tick_index = pd.Index(tickers)
+    if len(signal_list)==0:
+        return SparseSignals(pd.DatetimeIndex([]),tickers,[],[],[],name=name)
+    times = signal_list[0].times
+    same_times = all(sigs.times.equals(times) for sigs in signal_list)
+    if not same_times:
+        for sigs in signal_list[1:]:
+            times = times.union(sigs.times)
+    positions = []
+    ticker_ids = []
+    for sigs in signal_list:
+        tick_map = tick_index.get_indexer(sigs.tickers)
+        if np.any(tick_map<0):
+            missing = [t for t,i in zip(sigs.tickers,tick_map) if i<0]
+            raise KeyError("signals found for tickers not in tickers: "+str(missing))
+        ticker_ids.append(tick_map[sigs.ticker_ids])
+        if same_times:
+            positions.append(sigs.positions)
+        else:
+            positions.append(times.get_indexer(sigs.times[sigs.positions]))
+    return SparseSignals(times,tickers,
+                         np.concatenate(positions),
+                         np.concatenate(ticker_ids),
+                         np.concatenate([sigs.values for sigs in signal_list]),
+                         name=name)
+
+
+class SignalDictView(Mapping):
+    """ Read-only dictionary view of SparseSignals
+
+    Keys are the tickers of the signals, values are dataframes of the signals
+    on each ticker (see SparseSignals.ticker_df), made when first requested.
+    """
+    def __init__(self,sparse_signals):
+        self.sparse = sparse_signals
+        self._frames = dict()
+
+    def __getitem__(self,ticker):
+        if ticker not in self._frames:
+            if ticker not in self.sparse:
+                raise KeyError(ticker)
+            self._frames[ticker] = self.sparse.ticker_df(ticker)
+        return self._frames[ticker]
+
+    def __iter__(self):
+        return iter(self.sparse.tickers)
+
+    def __len__(self):
+        return len(self.sparse.tickers)
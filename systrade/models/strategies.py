@@ -11,8 +11,12 @@ import pandas as pd
 import numpy as np
 import time as timer
 import matplotlib.pyplot as plt
+from abc import abstractmethod
 
 from .base import BaseStrategy
+from .base import BaseIndicator
+from . import filters
+from systrade.trading import orders
 
 # TODO: extend strategy types
  # examples - how the signals are combined - could be done in many ways
@@ -43,48 +47,295 @@ class SimpleStrategy(BaseStrategy):
             Args:
                 - stocks_df: dataframe of tickers values indexed by time
             Returns:
-                - order_list: a list of trading.orders objects
+                - order_list: a list of order dictionaries
         """
+        return self.get_order_batch(stocks_df).to_list()
 
-        requests_dict = self.signal_requests(stocks_df)
+    def get_order_batch(self,stocks_df):
+        """ generate a batch of orders based on historical data
+
+        Signals of all tickers are summed into resampling-minute intervals at
+        once, and a buy (sell) order placed at the end of each interval where
+        they sum to a positive (negative) value.
+
+            Args:
+                - stocks_df: dataframe of tickers values indexed by time
+            Returns:
+                - batch: a trading.orders.OrderBatch, ordered by ticker (as in
+                         ticker_list) and then time
+        """
+        signals = self.sparse_signal_requests(stocks_df)
+        bucketed = signals.resample_to_bucket(self.resampling)
+        positions,ticker_ids,sums = bucketed.sorted_by_ticker()
+        type_codes = np.where(sums>0,orders.ORDER_TYPES.index('buy_market'),
+                                     orders.ORDER_TYPES.index('sell_market'))
+        return orders.OrderBatch(type_codes,
+                                 bucketed.times[positions],
+                                 ticker_ids,
+                                 bucketed.tickers,
+                                 np.ones((len(sums),),dtype=np.int64))
+
+    def fast_clone(self):
+        """ clone the parameter tree of the strategy, see
+        BaseStrategy.fast_clone. Any bar by bar state is copied, not shared.
+        """
+        new = super().fast_clone()
+        if hasattr(self,'_live_buckets'):
+            new._live_buckets = dict(self._live_buckets)
+            new._live_day0 = dict(self._live_day0)
+        return new
+
+    def init_live(self):
+        """ initialize the strategy to consume bars one at a time
+
+        Each signal is initialized for bars of ticker_list (see
+        BaseSignal.init_live), and sums of signals are kept for each pending
+        (ticker, bucket).
+        """
+        for sig in self.signal_dict.values():
+            sig.init_live(self.ticker_list)
+        self._live_buckets = dict() # (label ns, ticker id): sum of signals
+        self._live_day0 = dict() # ticker id: midnight (ns) of first signal
+        self._live_tz = None
+
+    def update_live(self,time,bar):
+        """ update with the next bar, and get orders of buckets that closed
+
+        Signals at a time are added to the bucket they fall in, as in
+        get_order_batch. A bucket closes at the first bar at or after its
+        label (its right edge), and its order is placed with the label as its
+        time, so that orders match get_order_list on the same bars.
+
+        Args:
+            - time: (pandas timestamp) time of the bar
+            - bar: array of prices of each ticker of ticker_list at time
+        Returns:
+            - order_list: list of order dictionaries of closed buckets, ordered
+                          by time and then by ticker_list
+        """
+        if not hasattr(self,'_live_buckets'):
+            raise RuntimeError("init_live should be called before update_live")
+        time = pd.Timestamp(time)
+        self._live_tz = time.tz
+        size = np.int64(self.resampling)*60*10**9
+        tick_index = {t:i for i,t in enumerate(self.ticker_list)}
+        for sig in self.signal_dict.values():
+            tickers,values = sig.update_live(bar)
+            for ticker,value in zip(tickers,values):
+                tick_id = tick_index[ticker]
+                if tick_id not in self._live_day0:
+                    self._live_day0[tick_id] = time.floor('D').value
+                day0 = self._live_day0[tick_id]
+                label = day0-((day0-time.value)//size)*size
+                key = (label,tick_id)
+                self._live_buckets[key] = self._live_buckets.get(key,0)+int(value)
+        closed = sorted(k for k in self._live_buckets if k[0]<=time.value)
+        return self._bucket_orders(closed)
+
+    def flush_live(self):
+        """ get orders of buckets still open when the feed ends
+
+        Returns:
+            - order_list: list of order dictionaries, see update_live
+        """
+        if not hasattr(self,'_live_buckets'):
+            return []
+        return self._bucket_orders(sorted(self._live_buckets.keys()))
+
+    def _bucket_orders(self,keys):
+        """ pop buckets of keys, and get orders of those with non-zero sums """
         order_list = []
-        for ticker in requests_dict:
-            # concat all the dataframes for this ticker into single dataframe
-            # where each signal will have a column
-            tmp_df = pd.concat(requests_dict[ticker],sort=False)
-            # now collate over time periods to get a 'master signal' from the
-            # various input signals
-            #resample into 5 min intervals
-            tmp_df = tmp_df.resample(str(self.resampling)+'T',
-                                     closed='right',
-                                     label='right').sum()
-            # sum over all signals
-            tmp_df['sum'] = tmp_df.sum(axis=1)
-            # drop the original signal columns
-            tmp_df = tmp_df.drop(columns=list(self.signal_dict.keys()))
-            # this is a simple selection - anywhere the sum over signals gave
-            # a positive or negative overall signal in that 5 minute period
-            tmp_df = tmp_df.loc[~(tmp_df==0).all(axis=1)]
-
-            for idx,row in tmp_df.iterrows():
-                if row['sum']>0:
-                    # signals sum to positive request - buy
-                    #order_list.append(orders.BuyMarketOrder(idx,ticker,1))
-                    order_list.append({'type': 'buy_market',
-                                       'time': idx,
-                                       'ticker': ticker,
-                                       'quantity': 1})
-                elif row['sum']<0:
-                    # signals sum to negative request - sell
-                    #order_list.append(orders.SellMarketOrder(idx,ticker,1))
-                    order_list.append({'type': 'sell_market',
-                                       'time': idx,
-                                       'ticker': ticker,
-                                       'quantity': 1})
-                else:
-                    # zeros should have been removed above- error for safety
-                    raise RuntimeError("0 encountered in collated signals")
+        for label,tick_id in keys:
+            total = self._live_buckets.pop((label,tick_id))
+            if total==0:
+                continue
+            time = pd.Timestamp(label)
+            if self._live_tz is not None:
+                time = time.tz_localize('UTC').tz_convert(self._live_tz)
+            order_list.append({'type': 'buy_market' if total>0 else 'sell_market',
+                               'time': time,
+                               'ticker': self.ticker_list[tick_id],
+                               'quantity': 1})
         return order_list
 
     def __repr__(self):
         return "Simple"+super().__repr__()
+
+
+class TargetPositionStrategy(BaseStrategy):
+    """ Abstract base for strategies that give target holdings of each ticker
+
+    Strategies inheriting this provide target_positions, the number of each
+    ticker of ticker_list to hold at each rebalance time. Orders are the
+    minimal set of market orders moving holdings through the targets, found
+    for all tickers and times at once (see
+    trading.orders.OrderBatch.from_target_positions). When run historically,
+    targets are diffed against the account's current holdings.
+
+    Parameters are those of the subclass's __init__, with those of nested
+    objects (e.g an indicator) as '<name>__<parameter>'.
+    """
+    def __init__(self,ticker_list):
+        """ initialize
+
+        Args:
+            - ticker_list: list of tickers the strategy holds
+        """
+        super().__init__(dict(),ticker_list)
+
+    def get_params(self,deep=True):
+        """ get parameters of the strategy and its nested objects
+
+        Args:
+            - deep: (bool, optional) if True, get parameters of nested objects,
+                    as '<name>__<parameter>'
+        Returns:
+            - out_dict: dictionary of parameters
+        """
+        out_dict = super(BaseStrategy,self).get_params(deep)
+        out_dict.pop('ticker_list',None)
+        return out_dict
+
+    def set_params(self,**params):
+        """ set parameters of the strategy and its nested objects
+
+        Args:
+            - **params: keyword arguments for any parameters of the strategy,
+                        see valid options by calling strategy.get_params()
+        Returns:
+            - self
+        """
+        super(BaseStrategy,self).set_params(**params)
+        return self
+
+    @abstractmethod
+    def target_positions(self,stocks_df):
+        """ target holdings of each ticker at each rebalance time
+
+        Args:
+            - stocks_df: dataframe of tickers values indexed by time
+        Returns:
+            - (times,targets): pandas DatetimeIndex of rebalance times, and
+                               integer array (times x tickers of ticker_list)
+                               of the number of each ticker to hold from then
+        """
+        pass
+
+    def get_order_list(self,stocks_df):
+        """ generate a list of orders based on historical data
+            Args:
+                - stocks_df: dataframe of tickers values indexed by time
+            Returns:
+                - order_list: a list of order dictionaries
+        """
+        return self.get_order_batch(stocks_df).to_list()
+
+    def get_order_batch(self,stocks_df,initial_holdings=None):
+        """ generate a batch of orders based on historical data
+
+        Orders are the changes of target positions between rebalances.
+
+            Args:
+                - stocks_df: dataframe of tickers values indexed by time
+            Keyword Args:
+                - initial_holdings: (optional) array of the number of each
+                                    ticker held before the first rebalance,
+                                    defaults to none
+            Returns:
+                - batch: a trading.orders.OrderBatch, ordered by time and then
+                         by ticker (as in ticker_list)
+        """
+        times,targets = self.target_positions(stocks_df)
+        return orders.OrderBatch.from_target_positions(times,targets,
+                                                       self.ticker_list,
+                                                       initial=initial_holdings)
+
+    def place_historical_orders(self,account,stocks_df):
+        """ place orders moving the account's holdings through the targets
+
+        Args:
+            - account: A tradings.account object that handles order placement
+            - stocks_df: dataframe of tickers values indexed by time
+        """
+        initial = None
+        if hasattr(account,'get_current_holdings'):
+            initial = account.get_current_holdings(self.ticker_list)
+        batch = self.get_order_batch(stocks_df,initial_holdings=initial)
+        if hasattr(account,'place_historical_order_batch'):
+            account.place_historical_order_batch(batch)
+        else:
+            for o in batch:
+                account.place_historical_order(**o)
+
+
+class CrossSectionalRankStrategy(TargetPositionStrategy):
+    """ A strategy ranking all tickers by an indicator at each rebalance
+
+    Every rebalance bars, tickers are ranked by the indicator (all rebalance
+    bars at once, by a single argsort over tickers), and the target position is
+    long quantity of the top quantile of tickers and short quantity of the
+    bottom quantile. Orders are the changes in target positions between
+    rebalances, starting from no positions. Tickers whose indicator is NaN at
+    a rebalance are not ranked, and are targeted to hold nothing.
+    """
+    def __init__(self,indicator,ticker_list,quantile=0.1,rebalance=30,quantity=1):
+        """ initialize
+
+        Args:
+            - indicator: a models.indicator object to rank tickers by
+            - ticker_list: list of tickers to rank
+        Keyword Args:
+            - quantile: fraction of ranked tickers to go long (top) and short
+                        (bottom), on (0,0.5]. Defaults to 0.1 (deciles).
+            - rebalance: number of bars between rebalances, defaults to 30
+            - quantity: number of each ticker held long or short, defaults to 1
+        """
+        if not isinstance(indicator,BaseIndicator):
+            raise TypeError("indicator should inherit models.base.BaseIndicator")
+        if not isinstance(quantile,(int,float)):
+            raise TypeError("quantile should be a number")
+        if not 0.0<quantile<=0.5:
+            raise ValueError("quantile should be on (0,0.5]")
+        if not isinstance(rebalance,(int,np.integer)) or rebalance<1:
+            raise ValueError("rebalance should be a positive integer")
+        if not isinstance(quantity,(int,np.integer)) or quantity<1:
+            raise ValueError("quantity should be a positive integer")
+        self.indicator = indicator
+        self.quantile = quantile
+        self.rebalance = rebalance
+        self.quantity = quantity
+        super().__init__(ticker_list)
+
+    def rebalance_rows(self,n_times):
+        """ indices of the bars at which to rebalance, of n_times bars """
+        return np.arange(0,n_times,self.rebalance)
+
+    def target_positions(self,stocks_df):
+        """ target positions of each ticker at each rebalance bar
+
+        Args:
+            - stocks_df: dataframe of tickers values indexed by time
+        Returns:
+            - (times,targets): pandas DatetimeIndex of the rebalance bars, and
+                               integer array (rebalances x tickers of
+                               ticker_list) of target positions
+        """
+        stock_df = filters.column_view(stocks_df,self.ticker_list)
+        indi = np.asarray(self.indicator.get_indicator(stock_df),dtype=np.float64)
+        if indi.ndim==1:
+            indi = indi[:,np.newaxis]
+        rows = self.rebalance_rows(len(stock_df.index))
+        values = indi[rows]
+        # NaNs sort last, so ranks of valid tickers are 0..n_valid-1
+        order = np.argsort(values,axis=1,kind='stable')
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks,order,np.arange(values.shape[1])[np.newaxis,:],axis=1)
+        n_valid = np.sum(~np.isnan(values),axis=1)[:,np.newaxis]
+        n_side = np.floor(self.quantile*n_valid).astype(np.int64)
+        longs = (ranks>=n_valid-n_side)&(ranks<n_valid)
+        shorts = ranks<n_side
+        targets = self.quantity*(longs.astype(np.int64)-shorts.astype(np.int64))
+        return stock_df.index[rows],targets
+
+    def __repr__(self):
+        return "CrossSectionalRank"+super().__repr__()
@@ -135,6 +135,24 @@ class TestBaseParameterizedObject:
         assert nested_ch.c.b==4
         nested_ch.set_params(c__a=5)
         assert nested_ch.c.a==5
+        with pytest.raises(ValueError):
+            tmp.set_params(z=1)
+        with pytest.raises(ValueError):
+            nested_ch.set_params(c__z=1)
+        with pytest.raises(ValueError):
+            nested_ch.set_params(a__z=1)
+
+    def test_fast_clone(self):
+        tmp = Tmp(1,[2,3])
+        nested_ch = Child(1,2,tmp)
+        cl = nested_ch.fast_clone()
+        assert (cl.a,cl.b,cl.c.a,cl.c.b)==(1,2,1,[2,3])
+        cl.set_params(a=4,c__a=5)
+        assert nested_ch.a==1
+        assert nested_ch.c.a==1
+        assert cl.c is not tmp
+        # non-object parameters are shared
+        assert cl.c.b is tmp.b
 
 
 class TestBaseSignal:
@@ -169,6 +187,21 @@ class TestBaseSignal:
 
 class TestBaseStrategy:
 
+    def test_fast_clone(self):
+        filt = TickerOneToAnotherFilter(['tick0'],['tick0'])
+        sig = FakeSignal(FakeIndicator(1),filt)
+        strat = FakeStrategy({'thesig':sig},['tick0','tick1'])
+        cl = strat.fast_clone()
+        assert cl.get_params()==strat.get_params()
+        cl.set_params(a=2,thesig__a=3,thesig__indicator__a=4)
+        assert strat.get_params()=={'a':0,'thesig__a':0,
+                                    'thesig__indicator':FakeIndicator(1),
+                                    'thesig__indicator__a':1}
+        assert cl.signal_dict['thesig'].indicator.a==4
+        # filters and tickers are shared, not copied
+        assert cl.signal_dict['thesig'].filter is strat.signal_dict['thesig'].filter
+        assert cl.ticker_list is strat.ticker_list
+
     def test_init(self):
         with pytest.raises(TypeError):
             strat = FakeStrategy(1,['tick0'])
@@ -91,6 +91,24 @@ class TestBaseStrategy:
         assert len(sig_reqs_dict['tick1'])==1
         assert sig_reqs_dict['tick1'][0].loc[T2]['s1']==1
 
+    def test_sparse_signal_requests(self):
+        indi = FakeIndicator(1)
+        sig1 = FakeSignal(indi)
+        sig2 = FakeSignal(indi)
+        strat = FakeStrategy({'s1':sig1,'s2':sig2},['tick0','tick1'])
+        signals = strat.sparse_signal_requests(DATA_DF)
+        assert signals.tickers==['tick0','tick1']
+        assert len(signals)==4
+        positions,values = signals.ticker_signals('tick0')
+        assert list(signals.times[positions])==[T1,T2,T3]
+        assert list(values)==[1,-1,-1]
+        positions,values = signals.ticker_signals('tick1')
+        assert list(signals.times[positions])==[T2]
+        assert list(values)==[1]
+        strat = FakeStrategy({'s1':sig1,'s2':sig2},['tick0'])
+        with pytest.raises(KeyError):
+            strat.sparse_signal_requests(DATA_DF)
+
     def test_run_historical(self):
         indi = FakeIndicator(1)
         sig1 = FakeSignal(indi)
@@ -0,0 +1,100 @@
+import pytest
+
+import numpy as np
+import pandas as pd
+
+import systrade.models.events as sysevents
+from systrade.trading.brokers import PaperBroker
+
+TIMEINDEX = pd.date_range(start='2019-07-10 09:30',periods=400,freq='1min')
+DATA_DF = pd.DataFrame(data=100.0*np.exp(np.random.RandomState(2).normal(0,0.002,(400,3)).cumsum(axis=0)),
+                       index=TIMEINDEX,columns=['tick0','tick1','tick2'])
+
+def reference_events(x,threshold):
+    """ the symmetric CUSUM filter, bar by bar and ticker by ticker """
+    out = []
+    for j in range(x.shape[1]):
+        s_pos = s_neg = 0.0
+        last = np.nan
+        for t in range(x.shape[0]):
+            change = x[t,j]-last
+            if np.isnan(change):
+                change = 0.0
+            if not np.isnan(x[t,j]):
+                last = x[t,j]
+            s_pos = max(0.0,s_pos+change)
+            s_neg = min(0.0,s_neg+change)
+            if s_neg<-threshold:
+                s_neg = 0.0
+                out.append((t,j,-1))
+            elif s_pos>threshold:
+                s_pos = 0.0
+                out.append((t,j,1))
+    return sorted(out)
+
+class TestCusumEvents:
+
+    @pytest.mark.parametrize('method',['loop','blocks','auto'])
+    def test_matches_reference(self,method):
+        rng = np.random.RandomState(0)
+        for n_ticks,threshold in [(3,0.5),(5,2.0),(30,4.0)]:
+            x = rng.normal(0,1,(700,n_ticks)).cumsum(axis=0)
+            x[rng.rand(700,n_ticks)<0.02] = np.nan
+            positions,ticker_ids,directions = sysevents.cusum_events(x,threshold,
+                                                                     method=method)
+            found = list(zip(positions.tolist(),ticker_ids.tolist(),
+                             directions.tolist()))
+            assert len(found)>0
+            assert found==reference_events(x,threshold)
+
+    def test_inputs(self):
+        positions,ticker_ids,directions = sysevents.cusum_events(np.array([0.,1.,2.5,2.,0.]),1.0)
+        assert list(positions)==[2,4]
+        assert list(ticker_ids)==[0,0]
+        assert list(directions)==[1,-1]
+        assert len(sysevents.cusum_events(np.zeros((1,3)),1.0)[0])==0
+        with pytest.raises(ValueError):
+            sysevents.cusum_events(np.zeros((5,3)),0.0)
+        with pytest.raises(ValueError):
+            sysevents.cusum_events(np.zeros((5,3)),1.0,method='bad')
+
+
+class TestCusumEventSampler:
+
+    def test_get_events(self):
+        sampler = sysevents.CusumEventSampler(0.005)
+        events = sampler.get_events(DATA_DF)
+        assert events.name=='events'
+        assert events.tickers==['tick0','tick1','tick2']
+        positions,ticker_ids,directions = sysevents.cusum_events(np.log(DATA_DF.values),0.005)
+        assert np.array_equal(events.positions,positions)
+        assert np.array_equal(events.values,directions)
+        with pytest.raises(ValueError):
+            sysevents.CusumEventSampler(-1.0)
+
+    def test_cache_shared_by_clones(self):
+        sampler = sysevents.CusumEventSampler(0.005)
+        events = sampler.get_events(DATA_DF)
+        assert sampler.fast_clone().get_events(DATA_DF.copy()) is events
+        clone = sampler.clone()
+        assert clone.event_cache is sampler.event_cache
+        clone.set_params(threshold=0.01)
+        assert len(clone.get_events(DATA_DF).values)<len(events.values)
+        assert sampler.event_cache.hits==1 and sampler.event_cache.misses==2
+
+    def test_broker_events(self):
+        sampler = sysevents.CusumEventSampler(0.005)
+        events = sampler.get_broker_events(PaperBroker(DATA_DF),['tick2','tick0'])
+        expected = sampler.get_events(DATA_DF[['tick2','tick0']])
+        assert events.tickers==['tick2','tick0']
+        assert np.array_equal(events.positions,expected.positions)
+        assert np.array_equal(events.ticker_ids,expected.ticker_ids)
+
+    def test_update(self):
+        sampler = sysevents.CusumEventSampler(0.005)
+        events = sampler.get_events(DATA_DF)
+        dense = np.zeros(DATA_DF.shape,dtype=np.int8)
+        dense[events.positions,events.ticker_ids] = events.values
+        sampler.init_state(3)
+        found = np.array([sampler.update(bar) for bar in DATA_DF.values])
+        assert np.array_equal(found,dense)
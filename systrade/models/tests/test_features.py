@@ -0,0 +1,139 @@
+import pytest
+
+import numpy as np
+import pandas as pd
+
+import systrade.models.features as sysfeats
+import systrade.models.indicators as sysinds
+
+TIMEINDEX = pd.date_range(start='2019-07-10 09:30',periods=120,freq='1min')
+DATA_DF = pd.DataFrame(data=100.0+np.random.RandomState(1).normal(0,1,(120,3)).cumsum(axis=0),
+                       index=TIMEINDEX,columns=['tick0','tick1','tick2'])
+
+class TestLagWindows:
+
+    def test_matches_shift(self):
+        x = np.arange(30.0).reshape(10,3)
+        windows = sysfeats.lag_windows(x,4)
+        assert windows.shape==(7,4,3)
+        assert np.shares_memory(windows,x)
+        assert not windows.flags.writeable
+        x_df = pd.DataFrame(x)
+        for lag in range(4):
+            # lag 3 is the latest time of each window
+            expected = x_df.shift(3-lag).values[3:]
+            assert np.array_equal(windows[:,lag,:],expected)
+        with pytest.raises(ValueError):
+            sysfeats.lag_windows(x,11)
+        with pytest.raises(ValueError):
+            sysfeats.lag_windows(x[:,0],2)
+
+    def test_strided_fallback(self,monkeypatch):
+        x = np.random.RandomState(0).normal(size=(20,4,2))
+        expected = sysfeats.lag_windows(x,5)
+        monkeypatch.setattr(sysfeats,'sliding_window_view',None)
+        windows = sysfeats.lag_windows(x,5)
+        assert windows.shape==(16,4,5,2)
+        assert np.shares_memory(windows,x)
+        assert np.array_equal(windows,expected)
+
+    def test_design_matrix(self):
+        x = np.arange(30.0).reshape(10,3)
+        x[1,2] = np.nan
+        X,valid = sysfeats.design_matrix(sysfeats.lag_windows(x,3))
+        # windows ending at times 1,2,3 hold the NaN
+        assert list(valid)==[False,False,True,True,True,True,True,True]
+        assert X.shape==(6,9)
+        assert np.array_equal(X[0],x[2:5].ravel())
+
+
+class TestFeatureCache:
+
+    def test_get(self):
+        cache = sysfeats.FeatureCache()
+        calls = []
+        def make():
+            calls.append(1)
+            return len(calls)
+        assert cache.get('k',DATA_DF,make)==1
+        # equal data in another frame is a hit
+        assert cache.get('k',DATA_DF.copy(),make)==1
+        other = DATA_DF.copy()
+        other.iloc[5,1] = 0.0
+        assert cache.get('k',other,make)==2
+        assert cache.hits==1 and cache.misses==2
+        assert len(cache)==1
+
+    def test_maxsize(self):
+        cache = sysfeats.FeatureCache(maxsize=2)
+        make = lambda: object()
+        first = cache.get('a',DATA_DF,make)
+        cache.get('b',DATA_DF,make)
+        assert cache.get('a',DATA_DF,make) is first
+        # 'b' is the least recently used
+        cache.get('c',DATA_DF,make)
+        assert len(cache)==2
+        assert cache.get('a',DATA_DF,make) is first
+        cache.get('b',DATA_DF,make)
+        assert cache.hits==2 and cache.misses==4
+        # data of other times are held alongside
+        cache = sysfeats.FeatureCache(maxsize=None)
+        for n in range(10,130,10):
+            cache.get('a',DATA_DF.iloc[:n],make)
+        assert len(cache)==12
+        with pytest.raises(ValueError):
+            sysfeats.FeatureCache(maxsize=0)
+
+    def test_hit_by_identity(self,monkeypatch):
+        cache = sysfeats.FeatureCache()
+        cache.get('k',DATA_DF,lambda: 1)
+        copied = DATA_DF.copy()
+        assert cache.get('k',copied,lambda: 2)==1
+        # values are compared once per new array, not on every hit
+        def fail(a,b):
+            raise AssertionError("values compared")
+        monkeypatch.setattr(sysfeats,'_same_values',fail)
+        for _ in range(3):
+            assert cache.get('k',copied,lambda: 2)==1
+        assert cache.hits==4
+
+    def test_shared_by_copies(self):
+        import copy
+        cache = sysfeats.FeatureCache()
+        holder = {'cache':cache}
+        assert copy.deepcopy(holder)['cache'] is cache
+
+
+class TestFeatureBuilder:
+
+    def test_init(self):
+        with pytest.raises(TypeError):
+            sysfeats.FeatureBuilder([sysinds.RSI(5)])
+        with pytest.raises(TypeError):
+            sysfeats.FeatureBuilder({'bad':None})
+        with pytest.raises(ValueError):
+            sysfeats.FeatureBuilder({'rsi':sysinds.RSI(5)},n_lags=0)
+
+    def test_get_lagged_features(self):
+        builder = sysfeats.FeatureBuilder({'ma':sysinds.MACrossOver(3,8),
+                                           'rsi':sysinds.RSI(5)},n_lags=6)
+        windows = builder.get_lagged_features(DATA_DF)
+        assert windows.shape==(115,3,6,2)
+        rsi = sysinds.RSI(5).get_indicator(DATA_DF).values
+        ma = sysinds.MACrossOver(3,8).get_indicator(DATA_DF).values
+        # window of tick2 ending at time 50
+        np.testing.assert_allclose(windows[45,2,:,0],ma[45:51,2])
+        np.testing.assert_allclose(windows[45,2,:,1],rsi[45:51,2])
+
+    def test_cache(self):
+        builder = sysfeats.FeatureBuilder({'rsi':sysinds.RSI(5)},n_lags=3)
+        cache = sysfeats.FeatureCache()
+        w0 = builder.get_lagged_features(DATA_DF,cache=cache)
+        # a different n_lags reuses the indicators
+        builder.set_params(n_lags=4)
+        w1 = builder.get_lagged_features(DATA_DF,cache=cache)
+        assert cache.misses==1 and cache.hits==1
+        assert np.shares_memory(w0,w1)
+        builder.set_params(indicators={'rsi':sysinds.RSI(7)})
+        builder.get_lagged_features(DATA_DF,cache=cache)
+        assert cache.misses==2
@@ -5,6 +5,8 @@ import numpy as np
 
 from systrade.models.filters import TickerOneToManyFilter
 from systrade.models.filters import TickerOneToAnotherFilter
+from systrade.models.filters import CompiledFilter
+from systrade.models import filters as sysfilts
 
 DF = pd.DataFrame(data={'tick0':np.arange(5),'tick1':np.arange(4,-1,-1)})
 
@@ -43,3 +45,56 @@ class TestTickerOneToAnotherFilter:
         out_map = f.output_map()
         assert out_map['tick0'] == ['tick1']
         assert out_map['tick1'] == ['tick0']
+
+
+TICKERS = ['tick'+str(i) for i in range(6)]
+PRICES = np.arange(60,dtype=np.float64).reshape(10,6)
+
+class TestCompiledFilter:
+
+    def test_compile_one_to_many(self):
+        f = TickerOneToManyFilter('tick2',['tick0','tick1'])
+        c = f.compile(TICKERS)
+        assert c.in_tickers==['tick2']
+        assert c.out_tickers==['tick0','tick1']
+        assert list(c.out_sources)==[0,0]
+        selected = c.select(PRICES)
+        assert np.array_equal(selected,PRICES[:,2:3])
+        assert np.shares_memory(selected,PRICES)
+        assert f.compile(TICKERS) is c
+
+    def test_compile_one_to_another(self):
+        f = TickerOneToAnotherFilter(['tick1','tick3','tick5'],['tick0','tick1','tick0'])
+        c = f.compile(TICKERS)
+        assert list(c.in_positions)==[1,3,5]
+        # last input mapped to an output ticker is kept
+        assert c.out_tickers==['tick0','tick1']
+        assert list(c.out_sources)==[2,1]
+        selected = c.select(PRICES)
+        assert np.array_equal(selected,PRICES[:,[1,3,5]])
+        assert np.shares_memory(selected,PRICES)
+        # uneven positions need a copy
+        f = TickerOneToAnotherFilter(['tick4','tick0'],['tick4','tick0'])
+        selected = f.compile(TICKERS).select(PRICES)
+        assert np.array_equal(selected,PRICES[:,[4,0]])
+        with pytest.raises(KeyError):
+            TickerOneToAnotherFilter(['bad'],['bad']).compile(TICKERS)
+
+    def test_select_df(self):
+        df = pd.DataFrame(PRICES,columns=TICKERS)
+        f = TickerOneToAnotherFilter(['tick2','tick3'],['tick2','tick3'])
+        selected = f.compile(TICKERS).select_df(df)
+        assert selected.equals(f.apply_in(df))
+        c = sysfilts.compile_filter(None,TICKERS)
+        assert c.is_identity()
+        assert c.select_df(df) is df
+        assert c.out_tickers==TICKERS
+
+    def test_column_view(self):
+        df = pd.DataFrame(PRICES,columns=TICKERS)
+        assert sysfilts.column_view(df,TICKERS) is df
+        view = sysfilts.column_view(df,['tick0','tick2','tick4'])
+        assert view.equals(df[['tick0','tick2','tick4']])
+        assert np.shares_memory(view.values,df.values)
+        with pytest.raises(KeyError):
+            sysfilts.column_view(df,['bad'])
@@ -0,0 +1,98 @@
+import pytest
+
+import numpy as np
+import pandas as pd
+
+import systrade.models.signals as syssigs
+import systrade.models.indicators as sysinds
+import systrade.models.filters as sysfilts
+import systrade.models.strategies as sysstrats
+from systrade.models import graph
+from systrade.models import sparse
+from systrade.models import events
+
+T_START = pd.to_datetime('2019/07/10-09:30:00:000000', format='%Y/%m/%d-%H:%M:%S:%f')
+TIMEINDEX = pd.date_range(start=T_START,periods=300,freq='1min')
+TICKS = ['tick'+str(i) for i in range(4)]
+DATA_DF = pd.DataFrame(data=np.cumsum(np.random.RandomState(0).randn(300,4),axis=0),
+                       index=TIMEINDEX,columns=TICKS)
+
+class CountingMACrossOver(sysinds.MACrossOver):
+    calls = []
+    def get_indicator(self,stock_df):
+        CountingMACrossOver.calls.append(stock_df.columns.to_list())
+        return super().get_indicator(stock_df)
+
+def make_strategy():
+    filt_a = sysfilts.TickerOneToAnotherFilter(TICKS[:3],TICKS[:3])
+    filt_b = sysfilts.TickerOneToAnotherFilter(TICKS[2:],TICKS[2:])
+    signal_dict = {'a':syssigs.ZeroCrossBuyUpSellDown(CountingMACrossOver(3,5),filt_a),
+                   'b':syssigs.ZeroCrossBuyUpSellDown(CountingMACrossOver(3,5),filt_b),
+                   'a_again':syssigs.ZeroCrossBuyUpSellDown(CountingMACrossOver(3,5),filt_a),
+                   'c':syssigs.ZeroCrossBuyUpSellDown(CountingMACrossOver(2,7),filt_b)}
+    return sysstrats.SimpleStrategy(signal_dict,TICKS,5)
+
+def expected_signals(strategy):
+    signal_list = [sig.request_historical_sparse(DATA_DF,name)
+                   for name,sig in strategy.signal_dict.items()]
+    return sparse.merge_signals(signal_list,tickers=strategy.ticker_list)
+
+def assert_same_signals(sigs0,sigs1):
+    assert sigs0.tickers==sigs1.tickers
+    assert sigs0.times.equals(sigs1.times)
+    for a0,a1 in zip(sigs0.sorted_by_ticker(),sigs1.sorted_by_ticker()):
+        assert np.array_equal(a0,a1)
+
+class TestCompileStrategy:
+
+    def test_dedupe(self):
+        g = make_strategy().compile(DATA_DF)
+        assert g.count(graph.IndicatorNode)==2
+        assert g.count(graph.SignalNode)==3
+        assert g.count(graph.CombinerNode)==1
+        assert len(g)==6
+        levels = g.levels()
+        assert len(levels)==3
+        assert all(isinstance(g.nodes[k],graph.IndicatorNode) for k in levels[0])
+        assert levels[2]==[g.output_key]
+
+    def test_event_sampler(self):
+        strat = make_strategy()
+        sampler = events.CusumEventSampler(1.5,log_prices=False)
+        # 'c' is the only signal of its indicator, found at events only
+        strat.signal_dict['c'].set_params(event_sampler=sampler)
+        # 'b' samples the indicator computed in full for 'a'
+        strat.signal_dict['b'].set_params(event_sampler=sampler.fast_clone())
+        g = strat.compile(DATA_DF)
+        assert g.count(graph.RequestNode)==1
+        assert g.count(graph.IndicatorNode)==1
+        assert g.count(graph.SignalNode)==2
+        expected = expected_signals(strat)
+        CountingMACrossOver.calls = []
+        assert_same_signals(g.evaluate(DATA_DF),expected)
+        assert CountingMACrossOver.calls==[TICKS]
+
+    def test_evaluate(self):
+        strat = make_strategy()
+        expected = expected_signals(strat)
+        CountingMACrossOver.calls = []
+        signals = strat.sparse_signal_requests(DATA_DF)
+        # each indicator once, on the union of tickers of its signals
+        assert sorted(CountingMACrossOver.calls)==[TICKS,TICKS[2:]]
+        assert_same_signals(signals,expected)
+
+    def test_evaluate_threads(self):
+        strat = make_strategy()
+        expected = expected_signals(strat)
+        signals = strat.sparse_signal_requests(DATA_DF,n_workers=4)
+        assert_same_signals(signals,expected)
+
+    def test_set_params(self):
+        # the graph follows changed parameters
+        strat = make_strategy()
+        strat.set_params(a_again__indicator__period1=4)
+        g = strat.compile(DATA_DF)
+        assert g.count(graph.IndicatorNode)==3
+        assert g.count(graph.SignalNode)==4
+        assert_same_signals(strat.sparse_signal_requests(DATA_DF),
+                            expected_signals(strat))
@@ -4,6 +4,7 @@ import pandas as pd
 import numpy as np
 
 from systrade.models import indicators as sysinds
+from systrade import precision
 
 DF = pd.DataFrame(data={'tick0':np.arange(5),'tick1':np.arange(4,-1,-1)})
 
@@ -37,3 +38,273 @@ class TestMACrossOver:
         true_vals[:,1]*=-1
         # print(vals)
         assert np.array_equal(vals,true_vals)
+
+    def test_get_indicator_at(self):
+        values = np.random.RandomState(5).normal(0,1,(60,3)).cumsum(axis=0)
+        values[30,1] = np.nan
+        df = pd.DataFrame(data=values,columns=['tick0','tick1','tick2'])
+        rows = np.array([0,3,7,8,31,35,40,59,59])
+        cols = np.array([0,1,2,0,1,1,2,0,1])
+        for indi in [sysinds.MACrossOver(3,7),sysinds.MACrossOver(8,2),
+                     sysinds.MACrossOver(3,7,'hamming')]:
+            expected = indi.get_indicator(df).values[rows,cols]
+            assert np.array_equal(indi.get_indicator_at(df,rows,cols),expected,
+                                  equal_nan=True)
+        with pytest.raises(ValueError):
+            sysinds.MACrossOver(3,60).get_indicator_at(df,rows,cols)
+
+    def test_update(self):
+        rng = np.random.RandomState(0)
+        df = pd.DataFrame(data=rng.normal(0,1,(60,3)).cumsum(axis=0),
+                          columns=['tick0','tick1','tick2'])
+        for p1,p2 in [(3,7),(7,3),(5,5),(1,4)]:
+            indi = sysinds.MACrossOver(p1,p2)
+            expected = indi.get_indicator(df).values
+            indi.init_state(df.columns.to_list())
+            values = np.array([indi.update(row) for row in df.values])
+            max_p = max(p1,p2)
+            assert np.all(np.isnan(values[:max_p]))
+            assert np.allclose(values[max_p:],expected[max_p:])
+
+    def test_update_nans(self):
+        # a NaN bar gives NaN only while in a window, as get_indicator
+        values = 100.0+np.random.RandomState(6).normal(0,1,(300,3)).cumsum(axis=0)
+        values[100,0] = np.nan
+        values[150:153,1] = np.nan
+        df = pd.DataFrame(data=values,columns=['tick0','tick1','tick2'])
+        for p1,p2,win_type in [(40,60,None),(3,8,None),(10,5,None),(4,9,'hamming')]:
+            indi = sysinds.MACrossOver(p1,p2,win_type)
+            expected = indi.get_indicator(df).values
+            indi.init_state(3)
+            found = np.array([indi.update(row) for row in df.values])
+            max_p = max(p1,p2)
+            assert np.array_equal(np.isnan(found[max_p:]),np.isnan(expected[max_p:]))
+            assert np.allclose(found[max_p:],expected[max_p:],equal_nan=True)
+
+    def test_state(self):
+        df = pd.DataFrame(data={'tick0':np.arange(20.0)**2})
+        indi = sysinds.MACrossOver(2,5)
+        with pytest.raises(RuntimeError):
+            indi.get_state()
+        indi.init_state(1)
+        for row in df.values[:8]:
+            indi.update(row)
+        state = indi.get_state()
+        later = [indi.update(row) for row in df.values[8:]]
+        # restore and replay gives the same values
+        indi.set_state(state)
+        again = [indi.update(row) for row in df.values[8:]]
+        assert np.array_equal(later,again)
+
+RNG_DF = pd.DataFrame(data=np.random.RandomState(2).normal(0,1,(50,3)).cumsum(axis=0),
+                      columns=['tick0','tick1','tick2'])
+
+class TestBatchMACrossOver:
+
+    def test_batch_ma_crossover(self):
+        pairs = [(3,7),(7,3),(5,5),(1,4),(2,20)]
+        batch = sysinds.batch_ma_crossover(RNG_DF.values,pairs)
+        assert batch.shape==(5,50,3)
+        for i,(p1,p2) in enumerate(pairs):
+            expected = sysinds.MACrossOver(p1,p2).get_indicator(RNG_DF)
+            assert np.allclose(batch[i],expected.values)
+        with pytest.raises(ValueError):
+            sysinds.batch_ma_crossover(RNG_DF.values,[(3,50)])
+
+    def test_cache(self):
+        cache = sysinds.MACrossOverCache(RNG_DF,[(3,7),(2,5),(3,7)])
+        assert len(cache)==2
+        sub_df = RNG_DF[['tick2','tick0']]
+        indi = cache.lookup(sub_df,3,7)
+        expected = sysinds.MACrossOver(3,7).get_indicator(sub_df)
+        assert list(indi.columns)==['tick2','tick0']
+        assert np.allclose(indi.values,expected.values)
+        # not cached pairs, or different data
+        assert cache.lookup(sub_df,7,3) is None
+        assert cache.lookup(RNG_DF.iloc[1:],3,7) is None
+
+    def test_use_cache(self):
+        cache = sysinds.MACrossOverCache(RNG_DF,[(3,7)])
+        # make cached values recognisable
+        cache._values[(3,7)] = np.zeros((50,3))
+        indi = sysinds.MACrossOver(3,7)
+        with sysinds.use_cache(cache):
+            assert np.all(indi.get_indicator(RNG_DF).values==0.0)
+            assert not np.all(sysinds.MACrossOver(2,7).get_indicator(RNG_DF).values==0.0)
+        assert not np.all(indi.get_indicator(RNG_DF).values==0.0)
+
+    def test_nans(self):
+        # one NaN gives NaN only where a moving average holds it, as pandas
+        values = 100.0+np.random.RandomState(4).normal(0,1,(200,3)).cumsum(axis=0)
+        values[50,0] = np.nan
+        df = pd.DataFrame(values,columns=['tick0','tick1','tick2'])
+        expected = (df.rolling(3).mean().shift()-df.rolling(10).mean().shift()).values
+        indi = sysinds.MACrossOver(3,10).get_indicator(df).values
+        assert np.allclose(indi[10:],expected[10:],equal_nan=True)
+        assert np.sum(np.isnan(indi[:,0]))==10
+        batch = sysinds.batch_ma_crossover(values,[(3,10)])
+        assert np.allclose(batch[0],indi,equal_nan=True)
+        vol = sysinds.RollingVolatility(10).get_indicator(df).values
+        returns = df.pct_change(fill_method=None)
+        assert np.allclose(vol,returns.rolling(10).std().shift().values,
+                           equal_nan=True)
+
+class TestWindowedMACrossOver:
+
+    def test_win_type(self):
+        indi = sysinds.MACrossOver(4,9,'hamming')
+        vals = indi.get_indicator(RNG_DF)
+        expected = RNG_DF.rolling(4,win_type='hamming').mean().shift() \
+                   - RNG_DF.rolling(9,win_type='hamming').mean().shift()
+        assert np.allclose(vals.values[9:],expected.values[9:])
+        assert np.allclose(vals.values[:9],expected.values[9])
+
+    def test_update(self):
+        rng = np.random.RandomState(1)
+        df = pd.DataFrame(data=100.0+rng.normal(0,1,(200,3)).cumsum(axis=0),
+                          columns=['tick0','tick1','tick2'])
+        for p1,p2,win_type in [(4,9,'hamming'),(9,4,'triang'),(5,40,'blackman')]:
+            indi = sysinds.MACrossOver(p1,p2,win_type)
+            expected = indi.get_indicator(df).values
+            indi.init_state(3)
+            values = np.array([indi.update(row) for row in df.values])
+            max_p = max(p1,p2)
+            assert np.all(np.isnan(values[:max_p]))
+            assert np.allclose(values[max_p:],expected[max_p:])
+
+    def test_series(self):
+        indi = sysinds.MACrossOver(2,5)
+        vals = indi.get_indicator(RNG_DF['tick0'])
+        assert isinstance(vals,pd.Series)
+        assert np.allclose(vals.values,indi.get_indicator(RNG_DF)['tick0'].values)
+
+def test_moving_average():
+    x = np.arange(10.0)
+    ma = sysinds.moving_average(x,3)
+    assert ma.shape==(10,)
+    assert np.allclose(ma[2:],np.arange(1.0,9.0))
+    assert np.allclose(ma[:2],1.0)
+
+PRICE_DF = 100.0+RNG_DF
+
+class TestBollingerBands:
+
+    def test_init(self):
+        with pytest.raises(TypeError):
+            sysinds.BollingerBands('')
+        with pytest.raises(ValueError):
+            sysinds.BollingerBands(10,-1.0)
+
+    def test_get_indicator(self):
+        indi = sysinds.BollingerBands(10,2.0)
+        vals = indi.get_indicator(PRICE_DF)
+        expected = ((PRICE_DF-PRICE_DF.rolling(10).mean())
+                    /(2.0*PRICE_DF.rolling(10).std())).shift()
+        assert np.allclose(vals.values,expected.values,equal_nan=True)
+        with pytest.raises(ValueError):
+            sysinds.BollingerBands(50).get_indicator(PRICE_DF)
+
+class TestRSI:
+
+    def test_get_indicator(self):
+        indi = sysinds.RSI(7)
+        vals = indi.get_indicator(PRICE_DF)
+        diffs = PRICE_DF.diff()
+        gain = diffs.clip(lower=0.0).iloc[1:].ewm(alpha=1/7,adjust=False).mean()
+        loss = (-diffs).clip(lower=0.0).iloc[1:].ewm(alpha=1/7,adjust=False).mean()
+        expected = (100.0*gain/(gain+loss)).reindex(PRICE_DF.index)
+        expected.iloc[:7] = np.nan
+        assert np.allclose(vals.values,expected.shift().values,equal_nan=True)
+        assert np.nanmin(vals.values)>=0.0 and np.nanmax(vals.values)<=100.0
+
+    def test_flat(self):
+        vals = sysinds.RSI(3).get_indicator(pd.DataFrame({'a':np.ones(10)}))
+        assert np.allclose(vals.values[4:],50.0)
+
+class TestMACD:
+
+    def test_get_indicator(self):
+        indi = sysinds.MACD(3,8,4)
+        vals = indi.get_indicator(PRICE_DF)
+        macd = PRICE_DF.ewm(span=3,adjust=False).mean() \
+               - PRICE_DF.ewm(span=8,adjust=False).mean()
+        expected = (macd-macd.ewm(span=4,adjust=False).mean()).shift()
+        assert np.allclose(vals.values,expected.values,equal_nan=True)
+
+class TestRollingVolatility:
+
+    def test_get_indicator(self):
+        indi = sysinds.RollingVolatility(10)
+        vals = indi.get_indicator(PRICE_DF)
+        expected = PRICE_DF.pct_change().rolling(10).std().shift()
+        assert np.allclose(vals.values,expected.values,equal_nan=True)
+
+class TestIndicatorBank:
+
+    def _bank(self):
+        return sysinds.IndicatorBank({'ma':sysinds.MACrossOver(3,9),
+                                      'bb':sysinds.BollingerBands(9),
+                                      'rsi':sysinds.RSI(9),
+                                      'macd':sysinds.MACD(3,9,4),
+                                      'vol':sysinds.RollingVolatility(9)})
+
+    def test_register(self):
+        bank = self._bank()
+        assert len(bank)==5
+        with pytest.raises(ValueError):
+            bank.register('ma',sysinds.MACrossOver(2,4))
+        with pytest.raises(TypeError):
+            bank.register('x',None)
+
+    def test_matches_indicators(self):
+        bank = self._bank()
+        indi_df = bank.get_indicators(PRICE_DF)
+        assert list(indi_df.columns.levels[0])==sorted(bank.indicators.keys())
+        for name,indicator in bank.indicators.items():
+            assert np.allclose(indi_df[name].values,
+                               indicator.get_indicator(PRICE_DF).values,
+                               equal_nan=True)
+        stack = bank.get_indicator_arrays(PRICE_DF.values)
+        assert stack.shape==(5,)+PRICE_DF.shape
+
+    def test_shared_intermediates(self):
+        inter = sysinds.SharedIntermediates(PRICE_DF.values)
+        sysinds.MACrossOver(3,9).from_intermediates(inter)
+        sysinds.BollingerBands(9).from_intermediates(inter)
+        # the cumulative sum and the 9 point average are shared
+        assert ('sma',9) in inter._memo
+        cs = inter.cumsum()
+        assert inter.sma(9) is inter._memo[('sma',9)]
+        assert inter.cumsum() is cs
+
+class TestLongWindowMACrossOver:
+
+    def test_long_win_type(self):
+        x = 100.0+np.random.RandomState(4).normal(0,1,(2000,2)).cumsum(axis=0)
+        df = pd.DataFrame(x,columns=['tick0','tick1'])
+        indi = sysinds.MACrossOver(390,780,'hamming')
+        vals = indi.get_indicator(df)
+        expected = df.rolling(390,win_type='hamming').mean().shift() \
+                   - df.rolling(780,win_type='hamming').mean().shift()
+        assert np.allclose(vals.values[780:],expected.values[780:])
+
+class TestFloat32Indicators:
+
+    def test_drift(self):
+        # float32 outputs of float32 prices stay within float32 rounding of
+        # float64, as intermediates are accumulated in float64
+        prices = 100.0+np.random.RandomState(5).normal(0,1,(5000,4)).cumsum(axis=0)
+        df64 = pd.DataFrame(prices)
+        df32 = df64.astype(np.float32)
+        bank = sysinds.IndicatorBank({'ma':sysinds.MACrossOver(20,390),
+                                      'bb':sysinds.BollingerBands(390),
+                                      'vol':sysinds.RollingVolatility(100)})
+        expected = bank.get_indicator_arrays(df64.values)
+        with precision.float_dtype(np.float32):
+            found = bank.get_indicator_arrays(df32.values)
+            vals = sysinds.MACrossOver(20,390).get_indicator(df32)
+        assert found.dtype==np.float32
+        assert vals.dtypes.iloc[0]==np.float32
+        scale = np.nanmax(np.abs(expected),axis=(1,2),keepdims=True)
+        assert np.nanmax(np.abs(found-expected)/scale)<1e-4
+        assert np.array_equal(np.isnan(found),np.isnan(expected))
@@ -0,0 +1,130 @@
+import pytest
+
+import numpy as np
+import pandas as pd
+
+from systrade.models import kernels
+
+RNG = np.random.RandomState(0)
+X = 50.0+RNG.normal(0,1,(200,4)).cumsum(axis=0)
+DF = pd.DataFrame(X)
+
+class TestMovingAverages:
+
+    def test_sma(self):
+        for p in [1,2,7,200]:
+            assert np.allclose(kernels.sma(X,p),DF.rolling(p).mean().values,
+                               equal_nan=True)
+        # 1d in, 1d out
+        assert kernels.sma(X[:,0],5).shape==(200,)
+        with pytest.raises(ValueError):
+            kernels.sma(X,0)
+        with pytest.raises(ValueError):
+            kernels.sma(X,201)
+        with pytest.raises(ValueError):
+            kernels.sma(np.zeros((2,2,2)),1)
+
+    def test_sma_nans(self):
+        # a NaN only reaches the windows holding it, as pandas
+        x = X.copy()
+        x[50,0] = np.nan
+        x[:3,1] = np.nan
+        expected = pd.DataFrame(x).rolling(10).mean().values
+        ma = kernels.sma(x,10)
+        assert np.allclose(ma,expected,equal_nan=True)
+        assert np.sum(np.isnan(ma[:,0]))==9+10
+        cs = kernels.cumsum0(x)
+        assert not np.any(np.isnan(cs))
+        assert np.allclose(kernels.sma_from_cumsum(cs,10,nans=kernels.nancount0(x)),
+                           expected,equal_nan=True)
+
+    def test_ema(self):
+        assert np.allclose(kernels.ema(X,span=10),
+                           DF.ewm(span=10,adjust=False).mean().values)
+        assert np.allclose(kernels.ema(X,alpha=0.3),
+                           DF.ewm(alpha=0.3,adjust=False).mean().values)
+        with pytest.raises(ValueError):
+            kernels.ema(X)
+        with pytest.raises(ValueError):
+            kernels.ema(X,span=3,alpha=0.5)
+        with pytest.raises(ValueError):
+            kernels.ema(X,alpha=1.5)
+
+    def test_weighted_ma(self):
+        for win_type in ['hamming','triang','blackman']:
+            for p in [3,10]:
+                expected = DF.rolling(p,win_type=win_type).mean().values
+                weights = kernels.window_weights(p,win_type)
+                for method in ['direct','fft','overlap_add','auto']:
+                    assert np.allclose(kernels.weighted_ma(X,weights,method),
+                                       expected,equal_nan=True)
+        # non-symmetric weights - oldest point first
+        ma = kernels.weighted_ma(np.arange(5.0),[1.0,0.0],'direct')
+        assert np.allclose(ma[1:],np.arange(4.0))
+        for method in ['fft','overlap_add']:
+            ma = kernels.weighted_ma(np.arange(5.0),[1.0,0.0],method)
+            assert np.allclose(ma[1:],np.arange(4.0))
+        with pytest.raises(ValueError):
+            kernels.weighted_ma(X,[1.0,1.0],'other')
+
+    def test_weighted_ma_long_windows(self):
+        x = np.random.RandomState(1).normal(0,1,(3000,4)).cumsum(axis=0)
+        for p in [33,390,780,2999]:
+            weights = kernels.window_weights(p,'hamming')
+            direct = kernels.weighted_ma(x,weights,'direct')
+            for method in ['fft','overlap_add','auto']:
+                assert np.allclose(kernels.weighted_ma(x,weights,method),direct,
+                                   equal_nan=True)
+
+    def test_weighted_ma_nans(self):
+        # FFT methods keep a NaN in the windows holding it, as the direct sum
+        x = 100.0+np.random.RandomState(1).normal(0,1,(3000,2)).cumsum(axis=0)
+        x[1000,0] = np.nan
+        x[:40,1] = np.nan
+        weights = kernels.window_weights(105,'hamming')
+        direct = kernels.weighted_ma(x,weights,'direct')
+        assert np.sum(np.isnan(direct[:,0]))==104+105
+        for method in ['fft','overlap_add','auto']:
+            assert np.allclose(kernels.weighted_ma(x,weights,method),direct,
+                               equal_nan=True)
+        expected = pd.DataFrame(x).rolling(105,win_type='hamming').mean().values
+        assert np.allclose(kernels.weighted_ma(x,weights),expected,equal_nan=True)
+
+    def test_window_weights_cached(self):
+        weights = kernels.window_weights(20,'hamming')
+        assert kernels.window_weights(20,'hamming') is weights
+        assert not weights.flags.writeable
+        assert len(kernels.window_weights(11,('gaussian',3)))==11
+
+
+class TestRollingStatistics:
+
+    def test_rolling_std(self):
+        for p in [2,5,30]:
+            assert np.allclose(kernels.rolling_std(X,p),DF.rolling(p).std().values,
+                               equal_nan=True)
+        # large offsets do not lose precision
+        assert np.allclose(kernels.rolling_std(X+1e6,5),DF.rolling(5).std().values,
+                           equal_nan=True,atol=1e-6)
+        with pytest.raises(ValueError):
+            kernels.rolling_std(X,1)
+
+    def test_rolling_zscore(self):
+        expected = (DF-DF.rolling(10).mean())/DF.rolling(10).std()
+        assert np.allclose(kernels.rolling_zscore(X,10),expected.values,equal_nan=True)
+        assert np.all(np.isnan(kernels.rolling_zscore(np.ones((5,1)),3)))
+
+    def test_shift(self):
+        assert np.allclose(kernels.shift(X,3),DF.shift(3).values,equal_nan=True)
+        assert np.all(np.isnan(kernels.shift(X,300)))
+
+    def test_rolling_std_nans(self):
+        x = X.copy()
+        x[50,0] = np.nan
+        assert np.allclose(kernels.rolling_std(x,10),
+                           pd.DataFrame(x).rolling(10).std().values,equal_nan=True)
+
+    def test_rolling_std_from_cumsums(self):
+        cs,cs_sq,nans = kernels.centred_cumsums(X)
+        assert np.allclose(kernels.rolling_std_from_cumsums(cs,cs_sq,5,nans=nans),
+                           kernels.rolling_std(X,5),equal_nan=True)
@@ -6,6 +6,8 @@ import pandas as pd
 import systrade.models.signals as syssigs
 import systrade.models.indicators as sysinds
 import systrade.models.filters as sysfilts
+import systrade.models.features as sysfeats
+import systrade.models.events as sysevents
 
 T_START = pd.to_datetime('2019/07/10-09:30:00:000000', format='%Y/%m/%d-%H:%M:%S:%f')
 T_END   = pd.to_datetime('2019/07/10-09:39:00:000000', format='%Y/%m/%d-%H:%M:%S:%f')
@@ -36,3 +38,211 @@ class TestZeroCrossBuyUpSellDown:
                                 [T_START+pd.DateOffset(minutes=6),
                                  T_START+pd.DateOffset(minutes=7)]))
         assert reqs['tick1'].equals(expected)
+
+    def test_request_historical_many_tickers(self):
+        # compare the vectorized crossings to a per-ticker loop
+        rng = np.random.RandomState(0)
+        n_ticks = 20
+        ticks = ['tick'+str(i) for i in range(n_ticks)]
+        times = pd.date_range(start=T_START,periods=200,freq='1min')
+        data_df = pd.DataFrame(data=np.cumsum(rng.randn(200,n_ticks),axis=0),
+                               index=times,columns=ticks)
+        indi = sysinds.MACrossOver(3,7)
+        sig = syssigs.ZeroCrossBuyUpSellDown(indi,
+                sysfilts.TickerOneToAnotherFilter(ticks,ticks[::-1]))
+        reqs = sig.request_historical(data_df,'sig')
+        indi_df = indi.get_indicator(data_df)
+        assert set(reqs.keys())==set(ticks)
+        for tick_in,tick_out in zip(ticks,ticks[::-1]):
+            x = indi_df[tick_in]
+            cross = (x*x.shift()<0.0).values
+            expected = pd.DataFrame(index=times[cross],
+                                    data={'sig':np.sign(x-x.shift()).values[cross]})
+            assert len(expected)>0
+            assert reqs[tick_out].equals(expected)
+
+    def test_request_historical_sparse(self):
+        indi = sysinds.MACrossOver(3,5)
+        filt = sysfilts.TickerOneToManyFilter('tick1',['tick0','tick1','tick2'])
+        sig = syssigs.ZeroCrossBuyUpSellDown(indi,filt)
+        sparse = sig.request_historical_sparse(DATA_DF,'sig')
+        assert sparse.tickers==['tick0','tick1','tick2']
+        assert len(sparse)==6
+        assert sparse.values.dtype==np.int8
+        for tick in sparse.tickers:
+            positions,values = sparse.ticker_signals(tick)
+            assert np.array_equal(positions,[6,7])
+            assert np.array_equal(values,[-1,1])
+
+    def test_request_historical_no_filter(self):
+        indi = sysinds.MACrossOver(3,5)
+        sig = syssigs.ZeroCrossBuyUpSellDown(indi,None)
+        reqs = sig.request_historical(DATA_DF,'sig')
+        assert list(reqs.keys())==['tick0','tick1']
+        assert len(reqs['tick0'])==1
+        assert len(reqs['tick1'])==2
+
+    def test_update_live(self):
+        # bar by bar signals match those found on the full history
+        rng = np.random.RandomState(1)
+        ticks = ['tick'+str(i) for i in range(5)]
+        times = pd.date_range(start=T_START,periods=100,freq='1min')
+        data_df = pd.DataFrame(data=np.cumsum(rng.randn(100,5),axis=0),
+                               index=times,columns=ticks)
+        sig = syssigs.ZeroCrossBuyUpSellDown(sysinds.MACrossOver(3,7),
+                sysfilts.TickerOneToAnotherFilter(ticks[:3],ticks[2:]))
+        expected = sig.request_historical_sparse(data_df,'sig')
+        sig.init_live(ticks)
+        found = []
+        for t_idx in range(len(times)):
+            tickers,values = sig.update_live(data_df.values[t_idx])
+            found.extend((t_idx,t,v) for t,v in zip(tickers,values))
+        positions,ticker_ids,values = expected.sorted_by_ticker()
+        assert len(found)>0
+        assert sorted(found)==sorted((p,expected.tickers[i],v) for p,i,v
+                                     in zip(positions,ticker_ids,values))
+        with pytest.raises(RuntimeError):
+            syssigs.ZeroCrossBuyUpSellDown(sysinds.MACrossOver(3,7),None).update_live(data_df.values[0])
+
+    def _event_data(self):
+        rng = np.random.RandomState(2)
+        ticks = ['tick'+str(i) for i in range(4)]
+        times = pd.date_range(start=T_START,periods=300,freq='1min')
+        return pd.DataFrame(data=100.0+np.cumsum(rng.randn(300,4),axis=0),
+                            index=times,columns=ticks)
+
+    def test_event_sampler_work(self):
+        # with a sampler the indicator is found at events only
+        class CountingMACrossOver(sysinds.MACrossOver):
+            n_values = 0
+            def get_indicator(self,stock_df):
+                CountingMACrossOver.n_values += stock_df.size
+                return super().get_indicator(stock_df)
+            def get_indicator_at(self,stock_df,rows,cols):
+                CountingMACrossOver.n_values += len(rows)
+                return super().get_indicator_at(stock_df,rows,cols)
+        data_df = self._event_data()
+        sampler = sysevents.CusumEventSampler(2.0,log_prices=False)
+        sig = syssigs.ZeroCrossBuyUpSellDown(CountingMACrossOver(3,7),None,
+                                             event_sampler=sampler)
+        found = sig.request_historical_sparse(data_df,'sig')
+        n_events = len(sampler.get_events(data_df).positions)
+        assert CountingMACrossOver.n_values==n_events
+        assert n_events<data_df.size/4
+        # as found from the full indicator
+        indi = sysinds.MACrossOver(3,7).get_indicator(data_df).values
+        expected = sig.signals_from_indicator(indi,data_df.index,
+                                              data_df.columns.to_list(),'sig',
+                                              events=sampler.get_events(data_df))
+        for a0,a1 in zip(found.sorted_by_ticker(),expected.sorted_by_ticker()):
+            assert np.array_equal(a0,a1)
+        with pytest.raises(ValueError):
+            sig.signals_from_indicator(indi,data_df.index,data_df.columns.to_list())
+
+    def test_event_sampler(self):
+        data_df = self._event_data()
+        sampler = sysevents.CusumEventSampler(2.0,log_prices=False)
+        sig = syssigs.ZeroCrossBuyUpSellDown(sysinds.MACrossOver(3,7),None,
+                                             event_sampler=sampler)
+        assert sig.get_params()['event_sampler__threshold']==2.0
+        found = sig.request_historical_sparse(data_df,'sig')
+        # sign changes of the indicator between consecutive events of a ticker
+        indi = sysinds.MACrossOver(3,7).get_indicator(data_df).values
+        events = sampler.get_events(data_df)
+        expected = []
+        for i in range(4):
+            rows = np.sort(events.positions[events.ticker_ids==i])
+            for r0,r1 in zip(rows[:-1],rows[1:]):
+                if indi[r0,i]*indi[r1,i]<0:
+                    expected.append((r1,i,np.sign(indi[r1,i]-indi[r0,i])))
+        assert len(expected)>0
+        assert sorted(zip(*found.sorted_by_ticker()))==sorted(expected)
+        # crossings are only seen at event bars
+        all_bars = syssigs.ZeroCrossBuyUpSellDown(sysinds.MACrossOver(3,7),None) \
+                          .request_historical_sparse(data_df,'sig')
+        assert len(found.values)<len(all_bars.values)
+        with pytest.raises(TypeError):
+            syssigs.ZeroCrossBuyUpSellDown(sysinds.MACrossOver(3,7),None,
+                                           event_sampler=object())
+
+    def test_event_sampler_update_live(self):
+        data_df = self._event_data()
+        ticks = data_df.columns.to_list()
+        sig = syssigs.ZeroCrossBuyUpSellDown(sysinds.MACrossOver(3,7),
+                sysfilts.TickerOneToAnotherFilter(ticks[:3],ticks[1:]),
+                event_sampler=sysevents.CusumEventSampler(2.0,log_prices=False))
+        expected = sig.request_historical_sparse(data_df,'sig')
+        # signals match once every ticker has had an event with the full
+        # history of the indicator (7 bars)
+        events = sig.event_sampler.get_events(data_df[ticks[:3]])
+        t_full = max(np.min(events.positions[(events.ticker_ids==i)&(events.positions>=7)])
+                     for i in range(3))
+        sig.init_live(ticks)
+        found = []
+        for t_idx in range(len(data_df.index)):
+            tickers,values = sig.update_live(data_df.values[t_idx])
+            found.extend((t_idx,t,v) for t,v in zip(tickers,values) if t_idx>t_full)
+        positions,ticker_ids,values = expected.sorted_by_ticker()
+        assert len(found)>0
+        assert sorted(found)==sorted((p,expected.tickers[i],v) for p,i,v
+                                     in zip(positions,ticker_ids,values)
+                                     if p>t_full)
+
+
+class LastValueModel:
+    """ model predicting the latest value of the first feature """
+    def __init__(self,n_features):
+        self.n_features = n_features
+        self.n_calls = 0
+
+    def predict(self,X):
+        self.n_calls += 1
+        return X[:,-self.n_features]
+
+
+class TestModelSignal:
+
+    def _signal(self,threshold=0.0):
+        features = sysfeats.FeatureBuilder({'ma':sysinds.MACrossOver(2,3),
+                                            'rsi':sysinds.RSI(2)},n_lags=2)
+        return syssigs.ModelSignal(features,LastValueModel(2),threshold=threshold)
+
+    def test_init(self):
+        features = sysfeats.FeatureBuilder({'rsi':sysinds.RSI(2)})
+        with pytest.raises(TypeError):
+            syssigs.ModelSignal(sysinds.RSI(2),LastValueModel(1))
+        with pytest.raises(TypeError):
+            syssigs.ModelSignal(features,LastValueModel(1),response='predict_proba')
+        with pytest.raises(ValueError):
+            syssigs.ModelSignal(features,LastValueModel(1),response='fit')
+        params = self._signal().get_params()
+        assert params['features__n_lags']==2
+        assert 'filter' not in params
+
+    def test_matches_indicator_crossing(self):
+        # a model returning the indicator signals as a zero cross signal does
+        sig = self._signal()
+        found = sig.request_historical_sparse(DATA_DF,'sig')
+        expected = syssigs.ZeroCrossBuyUpSellDown(sysinds.MACrossOver(2,3),None) \
+                          .request_historical_sparse(DATA_DF,'sig')
+        assert found.tickers==expected.tickers
+        assert np.array_equal(found.positions,expected.positions)
+        assert np.array_equal(found.ticker_ids,expected.ticker_ids)
+        assert np.array_equal(found.values,expected.values)
+
+    def test_cache_shared_by_clones(self):
+        sig = self._signal()
+        sig.request_historical_sparse(DATA_DF)
+        clone = sig.fast_clone()
+        clone.set_params(threshold=0.5)
+        clone.request_historical_sparse(DATA_DF.copy())
+        assert clone.feature_cache is sig.feature_cache
+        assert sig.estimator.n_calls==1
+        assert sig.threshold==0.0
+        # a deep clone has its own estimator, but shares the features
+        deep = sig.clone()
+        deep.request_historical_sparse(DATA_DF)
+        assert deep.feature_cache is sig.feature_cache
+        assert deep.estimator.n_calls==2
+        assert sig.estimator.n_calls==1
+        assert sig.feature_cache.hits==2
@@ -0,0 +1,132 @@
+import pytest
+
+import numpy as np
+import pandas as pd
+
+from systrade.models.sparse import SparseSignals
+from systrade.models.sparse import merge_signals
+
+TIMES = pd.date_range(start='2019/07/10 09:30:00',periods=10,freq='1min')
+
+def make_signals():
+    return SparseSignals(TIMES,['a','b','c'],
+                         positions=[5,1,3,2,7],
+                         ticker_ids=[0,1,0,1,0],
+                         values=[1,-1,-1,1,-1],
+                         name='sig')
+
+class TestSparseSignals:
+
+    def test_init(self):
+        sigs = make_signals()
+        assert len(sigs)==5
+        assert sigs.positions.dtype==np.int32
+        assert sigs.ticker_ids.dtype==np.int16
+        assert sigs.values.dtype==np.int8
+        with pytest.raises(ValueError):
+            SparseSignals(TIMES,['a'],[1,2],[0],[1,1])
+
+    def test_ticker_signals(self):
+        sigs = make_signals()
+        positions,values = sigs.ticker_signals('a')
+        assert np.array_equal(positions,[3,5,7])
+        assert np.array_equal(values,[-1,1,-1])
+        positions,values = sigs.ticker_signals('c')
+        assert len(positions)==0 and len(values)==0
+
+    def test_as_dict(self):
+        view = make_signals().as_dict()
+        assert list(view)==['a','b','c']
+        assert len(view)==3
+        expected = pd.DataFrame(index=TIMES[[1,2]],data={'sig':[-1.0,1.0]})
+        assert view['b'].equals(expected)
+        assert view['b'] is view['b']
+        assert len(view['c'])==0
+        with pytest.raises(KeyError):
+            view['d']
+
+    def test_from_dict(self):
+        sigs = make_signals()
+        roundtrip = SparseSignals.from_dict(sigs.as_dict(),TIMES,name='sig')
+        assert roundtrip.tickers==sigs.tickers
+        for tick in sigs.tickers:
+            assert roundtrip.as_dict()[tick].equals(sigs.as_dict()[tick])
+        with pytest.raises(ValueError):
+            SparseSignals.from_dict({'a':pd.DataFrame(index=TIMES[:1],
+                                                      data={'s':[0.5]})},TIMES)
+        late = TIMES+pd.DateOffset(hours=1)
+        with pytest.raises(ValueError):
+            SparseSignals.from_dict({'a':pd.DataFrame(index=late[:1],
+                                                      data={'s':[1]})},TIMES)
+
+    def test_contains_nbytes(self):
+        sigs = make_signals()
+        assert 'a' in sigs
+        assert 'd' not in sigs
+        assert sigs.nbytes==5*(4+2+1)
+
+    def test_merge(self):
+        sigs = make_signals()
+        other = SparseSignals(TIMES,['c','a'],[4,4],[0,1],[1,1])
+        merged = merge_signals([sigs,other])
+        assert merged.tickers==['a','b','c']
+        assert len(merged)==7
+        positions,values = merged.ticker_signals('a')
+        assert np.array_equal(positions,[3,4,5,7])
+        assert np.array_equal(values,[-1,1,1,-1])
+        positions,values = merged.ticker_signals('c')
+        assert np.array_equal(positions,[4])
+        merged = merge_signals([sigs,other],tickers=['c','b','a','d'])
+        assert merged.tickers==['c','b','a','d']
+        with pytest.raises(KeyError):
+            merge_signals([sigs,other],tickers=['a','b'])
+
+    def test_merge_times(self):
+        sigs = make_signals()
+        later = TIMES+pd.DateOffset(minutes=30)
+        other = SparseSignals(later,['a'],[0],[0],[1])
+        merged = merge_signals([sigs,other])
+        assert len(merged.times)==20
+        positions,values = merged.ticker_signals('a')
+        assert list(merged.times[positions])==[TIMES[3],TIMES[5],TIMES[7],later[0]]
+
+    def test_resample_to_bucket(self):
+        # compare to pandas resampling of each ticker's signals, over two days
+        rng = np.random.RandomState(0)
+        times = pd.date_range(start='2019/07/10 09:30:00',periods=390,freq='1min')
+        times = times.append(times+pd.DateOffset(days=1))
+        n_sigs = 300
+        sigs = SparseSignals(times,['a','b','c','d'],
+                             rng.randint(0,len(times),n_sigs),
+                             rng.randint(0,3,n_sigs),
+                             rng.choice([-1,1],n_sigs),name='sig')
+        for minutes in [1,5,7,13]:
+            bucketed = sigs.resample_to_bucket(minutes)
+            for tick in sigs.tickers:
+                df = sigs.as_dict()[tick]
+                positions,values = bucketed.ticker_signals(tick)
+                if len(df)==0:
+                    assert len(positions)==0
+                    continue
+                expected = df.resample(str(minutes)+'T',closed='right',
+                                       label='right').sum()['sig']
+                expected = expected[expected!=0]
+                assert list(bucketed.times[positions])==list(expected.index)
+                assert np.array_equal(values,expected.values)
+        with pytest.raises(ValueError):
+            sigs.resample_to_bucket(0)
+
+    def test_dense(self):
+        sigs = make_signals()
+        dense = sigs.to_dense()
+        assert dense.dtype==np.int8
+        assert dense.shape==(10,3)
+        assert dense[5,0]==1 and dense[1,1]==-1 and np.count_nonzero(dense)==5
+        back = SparseSignals.from_dense(dense,TIMES,sigs.tickers,name='sig')
+        assert back.as_dict()['a'].equals(sigs.as_dict()['a'])
+        assert back.as_dict()['b'].equals(sigs.as_dict()['b'])
+        # repeated signals are summed
+        merged = merge_signals([sigs,sigs])
+        assert merged.to_dense()[5,0]==2
+        with pytest.raises(ValueError):
+            SparseSignals.from_dense(dense[:5],TIMES,sigs.tickers)
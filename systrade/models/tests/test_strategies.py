@@ -4,6 +4,8 @@ import numpy as np
 import pandas as pd
 
 from systrade.trading import orders
+from systrade.trading.brokers import PaperBroker
+from systrade.trading.accounts import BasicAccount
 
 import systrade.models.signals as syssigs
 import systrade.models.indicators as sysinds
@@ -63,3 +65,134 @@ class TestSimpleStrategy:
         assert len(order_list)==len(expected)
         assert [o.time_placed for o in order_list]==[o.time_placed for o in expected]
         assert [o.ticker for o in order_list]==[o.ticker for o in expected]
+
+    def test_get_order_list_dicts(self):
+        indi = sysinds.MACrossOver(3,5)
+        filt = sysfilts.TickerOneToAnotherFilter(['tick0','tick1'],
+                                                 ['tick0','tick1'])
+        sig0 = syssigs.ZeroCrossBuyUpSellDown(indi,filt)
+        filt = sysfilts.TickerOneToAnotherFilter(['tick0','tick1'],
+                                                 ['tick1','tick0'])
+        sig1 = syssigs.ZeroCrossBuyUpSellDown(indi,filt)
+        strat = sysstrats.SimpleStrategy({'sig0':sig0, 'sig1':sig1},
+                                         ['tick0','tick1'],
+                                         2)
+        order_list = strat.get_order_list(DATA_DF)
+        assert [o['time'] for o in order_list]==[T_36,T_38,T_40]*2
+        assert [o['ticker'] for o in order_list]==['tick0']*3+['tick1']*3
+        assert [o['type'] for o in order_list]==['sell_market','buy_market',
+                                                 'sell_market']*2
+        assert all(o['quantity']==1 for o in order_list)
+
+    def test_get_order_list_no_signals(self):
+        # a ticker without any signals places no orders
+        indi = sysinds.MACrossOver(3,5)
+        filt = sysfilts.TickerOneToAnotherFilter(['tick1'],['tick1'])
+        sig = syssigs.ZeroCrossBuyUpSellDown(indi,filt)
+        strat = sysstrats.SimpleStrategy({'sig':sig},['tick0','tick1'],2)
+        order_list = strat.get_order_list(DATA_DF)
+        assert [o['ticker'] for o in order_list]==['tick1']*2
+        assert [o['time'] for o in order_list]==[T_36,T_38]
+
+
+class PriceIndicator(sysinds.BaseIndicator):
+    """ indicator that is the price itself """
+    def __init__(self):
+        pass
+
+    def get_indicator(self,stock_df):
+        return stock_df
+
+class FixedTargets(sysstrats.TargetPositionStrategy):
+    def target_positions(self,stocks_df):
+        return stocks_df.index[[0,3,6]],np.array([[1,0],[2,-1],[0,-1]])
+
+class TestTargetPositionStrategy:
+
+    def test_get_order_list(self):
+        strat = FixedTargets(['tick0','tick1'])
+        order_list = strat.get_order_list(DATA_DF)
+        assert [(o['time'],o['ticker'],o['type'],o['quantity']) for o in order_list]== \
+               [(TIMEINDEX[0],'tick0','buy_market',1),
+                (TIMEINDEX[3],'tick0','buy_market',1),
+                (TIMEINDEX[3],'tick1','sell_market',1),
+                (TIMEINDEX[6],'tick0','sell_market',2)]
+        batch = strat.get_order_batch(DATA_DF,initial_holdings=np.array([1,0]))
+        assert [o['ticker'] for o in batch]==['tick0','tick1','tick0']
+
+    def test_run_historical(self):
+        data_df = DATA_DF+1.0
+        account = BasicAccount(PaperBroker(data_df),TIMEINDEX[0],TIMEINDEX[-1],
+                               order_manager=orders.OrderManager())
+        FixedTargets(['tick0','tick1']).run_historical(account)
+        assert list(account.get_current_holdings(['tick0','tick1']))==[0,-1]
+
+
+class TestCrossSectionalRankStrategy:
+
+    def _ticks(self,n):
+        return ['tick'+str(i) for i in range(n)]
+
+    def test_init(self):
+        with pytest.raises(TypeError):
+            sysstrats.CrossSectionalRankStrategy(None,['tick0'])
+        with pytest.raises(ValueError):
+            sysstrats.CrossSectionalRankStrategy(PriceIndicator(),['tick0'],quantile=0.6)
+        with pytest.raises(ValueError):
+            sysstrats.CrossSectionalRankStrategy(PriceIndicator(),['tick0'],rebalance=0)
+
+    def test_params(self):
+        strat = sysstrats.CrossSectionalRankStrategy(sysinds.MACrossOver(3,10),
+                                                     ['tick0','tick1'])
+        params = strat.get_params()
+        assert params['indicator__period1']==3
+        assert params['rebalance']==30
+        assert 'ticker_list' not in params
+        new = strat.fast_clone()
+        new.set_params(indicator__period1=5,quantile=0.5)
+        assert new.indicator.period1==5 and new.quantile==0.5
+        assert strat.indicator.period1==3 and strat.quantile==0.1
+        with pytest.raises(ValueError):
+            strat.set_params(other=1)
+
+    def test_static_ranks(self):
+        ticks = self._ticks(10)
+        times = pd.date_range(start=T_START,periods=100,freq='1min')
+        data_df = pd.DataFrame(np.tile(np.arange(10.0),(100,1)),index=times,columns=ticks)
+        strat = sysstrats.CrossSectionalRankStrategy(PriceIndicator(),ticks,
+                                                     quantile=0.2,rebalance=10,
+                                                     quantity=3)
+        order_list = strat.get_order_list(data_df)
+        # positions are opened at the first rebalance, and never change
+        assert len(order_list)==4
+        assert all(o['time']==times[0] for o in order_list)
+        assert [(o['ticker'],o['type'],o['quantity']) for o in order_list]== \
+               [('tick0','sell_market',3),('tick1','sell_market',3),
+                ('tick8','buy_market',3),('tick9','buy_market',3)]
+
+    def test_matches_loop(self):
+        ticks = self._ticks(25)
+        times = pd.date_range(start=T_START,periods=200,freq='1min')
+        rng = np.random.RandomState(0)
+        data_df = pd.DataFrame(100.0+rng.normal(0,1,(200,25)).cumsum(axis=0),
+                               index=times,columns=ticks)
+        data_df.iloc[50:80,3] = np.nan
+        strat = sysstrats.CrossSectionalRankStrategy(PriceIndicator(),ticks,
+                                                     quantile=0.1,rebalance=7)
+        batch = strat.get_order_batch(data_df)
+        held = {t:0 for t in ticks}
+        expected = []
+        for row in range(0,200,7):
+            vals = data_df.iloc[row].dropna().sort_values(kind='stable')
+            k = int(np.floor(0.1*len(vals)))
+            target = {t:0 for t in ticks}
+            target.update({t:-1 for t in vals.index[:k]})
+            target.update({t:1 for t in vals.index[len(vals)-k:]})
+            for t in ticks:
+                if target[t]!=held[t]:
+                    expected.append((times[row],t,target[t]-held[t]))
+            held = target
+        found = [(o['time'],o['ticker'],o['quantity']*(1 if o['type']=='buy_market' else -1))
+                 for o in batch]
+        assert len(found)>4
+        assert found==expected
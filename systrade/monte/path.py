@@ -1,8 +1,12 @@
 """ Module for creating random pathways
+
+Paths are stored in the float dtype of systrade.precision, with each step
+computed in float64.
 """
 import numpy as np
 from scipy import linalg
 from . import parameter
+from systrade import precision
 import warnings
 import copy
 
@@ -94,7 +98,7 @@ class GeometricDiffusionSingleAsset:
         future_spots = spot*np.exp(mu)
         future_spots *= np.exp(np.sqrt(var)*rand_vals)
         #future_spots *= discount
-        return future_spots
+        return precision.as_float(future_spots)
 
     def get_many_timed_paths(self,n_paths,spot0,times):
         """ calculate many future spot value at a later time
@@ -111,13 +115,16 @@ class GeometricDiffusionSingleAsset:
         if n_paths==1:
             return self.get_single_timed_path(spot0, time0, time1)
         rand_vals    = self.generator.get_samples(n_samples=n_paths, sample_dimension=len(times))
-        future_spots = np.zeros_like(rand_vals)
+        future_spots = np.zeros(np.shape(rand_vals),dtype=precision.get_float_dtype())
         future_spots[0,:] = spot0
+        # carry spots in float64, storing each step in the float dtype
+        spots = np.zeros(future_spots.shape[1:],dtype=precision.ACCUMULATE_DTYPE)+spot0
         for i in range(1,len(times)):
             r,var,mu,discount = self.get_path_constants(times[i-1], times[i])
             #rand_vals = generator.get_samples(1)
-            future_spots[i,:] = future_spots[i-1,:]*np.exp(mu)
-            future_spots[i,:] *= np.exp(np.sqrt(var)*rand_vals[i-1,:])
+            spots = spots*np.exp(mu)
+            spots *= np.exp(np.sqrt(var)*rand_vals[i-1,:])
+            future_spots[i,:] = spots
         return future_spots
 
     def clone(self):
@@ -171,10 +178,13 @@ class GeometricDiffusionManyAsset:
     def get_single_timed_path(self,spots0,times):
         if (self.cholesky_param is not None and not isinstance(self.covariance_param,parameter.SimpleArrayParam)):
             warnings.warn("cholesky parameter has been set although covariance is time dependent - time dependence will be ignored")
-        future_spots = np.zeros((len(times),len(spots0)))
+        future_spots = np.zeros((len(times),len(spots0)),dtype=precision.get_float_dtype())
         future_spots[0,:] = spots0
+        # carry spots in float64, storing each step in the float dtype
+        spots = np.asarray(spots0,dtype=precision.ACCUMULATE_DTYPE)
         for i in range(1,len(times)):
-            future_spots[i,:] = self.get_single_path(future_spots[i-1,:],times[i-1],times[i])
+            spots = self.get_single_path(spots,times[i-1],times[i])
+            future_spots[i,:] = spots
         return future_spots
 
     def get_many_paths(self,n_paths,spots0,time0,time1):
@@ -197,7 +207,7 @@ class GeometricDiffusionManyAsset:
         future_spots = spots0*np.exp(mu)
         future_spots = np.tile(future_spots[:,np.newaxis],(1,n_paths))
         future_spots *= np.exp(rand_vals)
-        return future_spots
+        return precision.as_float(future_spots)
 
     def clone(self):
         return copy.deepcopy(self)
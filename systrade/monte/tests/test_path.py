@@ -0,0 +1,47 @@
+import pytest
+
+import numpy as np
+
+from systrade.monte import generator
+from systrade.monte import parameter
+from systrade.monte import path
+from systrade import precision
+
+TIMES = np.linspace(0.0,1.0,5001)
+
+def _paths(make_path,get_paths,dtype):
+    np.random.seed(7)
+    with precision.float_dtype(dtype):
+        return get_paths(make_path())
+
+class TestFloat32Paths:
+
+    def test_single_asset_drift(self):
+        # each step is carried in float64, so float32 paths are float64 paths
+        # rounded once, without drift along the path
+        def make_path():
+            return path.GeometricDiffusionSingleAsset(
+                        generator.Antithetic(generator.Normal()),
+                        parameter.SimpleParam(0.05),parameter.SimpleParam(0.2))
+        def get_paths(p):
+            return p.get_many_timed_paths(6,100.0,TIMES)
+        expected = _paths(make_path,get_paths,np.float64)
+        found = _paths(make_path,get_paths,np.float32)
+        assert expected.dtype==np.float64
+        assert found.dtype==np.float32
+        assert np.array_equal(found,expected.astype(np.float32))
+
+    def test_many_asset_drift(self):
+        cov = np.array([[0.04,0.01],[0.01,0.09]])
+        def make_path():
+            return path.GeometricDiffusionManyAsset(
+                        generator.Normal(),parameter.SimpleParam(0.05),
+                        parameter.SimpleArrayParam(cov),
+                        parameter.SimpleArrayParam(np.linalg.cholesky(cov)))
+        def get_paths(p):
+            return p.get_single_timed_path(np.array([100.0,50.0]),TIMES)
+        expected = _paths(make_path,get_paths,np.float64)
+        found = _paths(make_path,get_paths,np.float32)
+        assert expected.dtype==np.float64
+        assert found.dtype==np.float32
+        assert np.array_equal(found,expected.astype(np.float32))
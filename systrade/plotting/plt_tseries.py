@@ -8,6 +8,7 @@ import numpy as np
 import copy
 
 from . import utils
+from systrade.models import sparse
 
 def subplots(times,nrows=1, ncols=1, sharex=False, sharey=False, squeeze=True,
              gridspec_kw=None, **fig_kw):
@@ -62,13 +63,15 @@ def plot_stock_indictor(stocks_df,ticker,indicator_df,signal_dict=None):
                         expected to be the same as for stocks_df
     Keyword Args:
         - signal_dict: Dictionary of a signal - generated by the method
-                       'request_historical' on a systrade.models.signals object.
+                       'request_historical' on a systrade.models.signals object,
+                       or a systrade.models.sparse.SparseSignals object.
 
     """
 
     if signal_dict is not None:
         if ticker not in signal_dict:
             raise ValueError("signal_dict does not have "+ticker+" as a key")
+        sig_times,sig_values = _ticker_signals(signal_dict,ticker)
 
     if not isinstance(ticker,str):
         raise TypeError("ticker expected to be a string")
@@ -79,9 +82,7 @@ def plot_stock_indictor(stocks_df,ticker,indicator_df,signal_dict=None):
     axes[0].plot_tseries(stocks_df.index,stocks_df[ticker],color='k',label=ticker)
     axes[0].set_xticklabels([])
     if signal_dict is not None:
-        sig_name = list(signal_dict[ticker].columns)[0]
-        for i,r in signal_dict[ticker].iterrows():
-            buysell = r[sig_name]
+        for i,buysell in zip(sig_times,sig_values):
             if buysell>0:
                 axes[0].plot_vert(i, stocks_df[ticker][0]-2.5,stocks_df[ticker][0]+1.0,color='r',LineStyle='--')
             else:
@@ -94,9 +95,7 @@ def plot_stock_indictor(stocks_df,ticker,indicator_df,signal_dict=None):
     buylabel = True
     selllabel = True
     if signal_dict is not None:
-        sig_name = list(signal_dict[ticker].columns)[0]
-        for i,r in signal_dict[ticker].iterrows():
-            buysell = r[sig_name]
+        for i,buysell in zip(sig_times,sig_values):
             if buysell>0:
                 if buylabel:
                     axes[1].plot_vert(i, -0.5,0.5,color='r',LineStyle='--',label='buy signal')
@@ -119,6 +118,14 @@ def plot_stock_indictor(stocks_df,ticker,indicator_df,signal_dict=None):
 
     plt.show()
 
+def _ticker_signals(signal_dict,ticker):
+    """ times and values of signals on a ticker, from either signal format """
+    if isinstance(signal_dict,sparse.SparseSignals):
+        positions,values = signal_dict.ticker_signals(ticker)
+        return signal_dict.times[positions],values
+    sig_df = signal_dict[ticker]
+    return sig_df.index,sig_df.iloc[:,0].values
+
 # could be useful for plotting days only on x axis for instance
 # inds_day_start = list(stocks_df.index.indexer_between_time('09:29','09:33'))
 # print(inds_day_start)
@@ -0,0 +1,77 @@
+""" Module for the floating point precision of prices, indicators and paths
+
+By default all floating point data is float64. For scans over large universes
+and long histories, memory bandwidth rather than arithmetic limits speed, and
+the float dtype can be set to float32 for the package:
+
+    from systrade import precision
+    precision.set_float_dtype(np.float32)
+
+or within a context:
+
+    with precision.float_dtype(np.float32):
+        broker = PaperBroker(data_df)
+
+The float dtype applies to stored arrays: the data of a PaperBroker made under
+it, indicator outputs and monte.path simulations. Accumulations that lose
+precision in float32 (cumulative sums in kernels, cash, fees and portfolio
+values, fill prices) are always float64 (ACCUMULATE_DTYPE).
+"""
+from contextlib import contextmanager
+
+import numpy as np
+
+FLOAT_DTYPES = (np.float32,np.float64)
+ACCUMULATE_DTYPE = np.float64
+
+_FLOAT_DTYPE = [np.float64]
+
+
+def _check_dtype(dtype):
+    dtype = np.dtype(dtype).type
+    if dtype not in FLOAT_DTYPES:
+        raise ValueError("float dtype should be one of: "+str(FLOAT_DTYPES))
+    return dtype
+
+def get_float_dtype():
+    """ get the float dtype of stored arrays (numpy float32 or float64) """
+    return _FLOAT_DTYPE[-1]
+
+def set_float_dtype(dtype):
+    """ set the float dtype of stored arrays
+
+    Args:
+        - dtype: numpy float32 or float64 (or their names)
+    """
+    _FLOAT_DTYPE[-1] = _check_dtype(dtype)
+
+@contextmanager
+def float_dtype(dtype):
+    """ context in which the float dtype of stored arrays is dtype
+
+    Args:
+        - dtype: numpy float32 or float64 (or their names)
+    """
+    _FLOAT_DTYPE.append(_check_dtype(dtype))
+    try:
+        yield _FLOAT_DTYPE[-1]
+    finally:
+        _FLOAT_DTYPE.pop()
+
+def resolve(dtype=None):
+    """ dtype if given (checked to be a float dtype), else the float dtype """
+    if dtype is None:
+        return get_float_dtype()
+    return _check_dtype(dtype)
+
+def as_float(x,dtype=None):
+    """ x as an array of the float dtype (no copy if it already is)
+
+    Args:
+        - x: array-like
+    Keyword Args:
+        - dtype: (optional) float dtype to use instead of the package's
+    Returns:
+        - array
+    """
+    return np.asarray(x,dtype=resolve(dtype))
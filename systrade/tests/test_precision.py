@@ -0,0 +1,33 @@
+import pytest
+
+import numpy as np
+
+from systrade import precision
+
+class TestPrecision:
+
+    def test_default(self):
+        assert precision.get_float_dtype() is np.float64
+        assert precision.as_float([1,2]).dtype==np.float64
+
+    def test_context(self):
+        with precision.float_dtype('float32') as dtype:
+            assert dtype is np.float32
+            assert precision.get_float_dtype() is np.float32
+            assert precision.as_float([1.0]).dtype==np.float32
+            with precision.float_dtype(np.float64):
+                assert precision.get_float_dtype() is np.float64
+            assert precision.get_float_dtype() is np.float32
+        assert precision.get_float_dtype() is np.float64
+
+    def test_set(self):
+        try:
+            precision.set_float_dtype(np.float32)
+            assert precision.get_float_dtype() is np.float32
+        finally:
+            precision.set_float_dtype(np.float64)
+        with pytest.raises(ValueError):
+            precision.set_float_dtype(np.int32)
+        with pytest.raises(ValueError):
+            precision.resolve(np.float16)
+        assert precision.resolve(None) is np.float64
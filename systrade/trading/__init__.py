@@ -1 +1 @@
-__all__ = ['brokers']
+__all__ = ['brokers','live','resampling']
@@ -11,7 +11,7 @@ import matplotlib.pyplot as plt
 class BasicAccount:
     """ Basic account for equites trading and cash holding for historical trading """
     def __init__(self, broker, time0, time1,
-                 order_manager=orders.OrderManager(),
+                 order_manager=None,
                  asset_manager=None,
                  interest_rate=0.0):
         """ initialize account with broker and time-period
@@ -21,9 +21,13 @@ class BasicAccount:
             - time0: earliest time account able to trade from
             - time1: latest time account able to trade to
         Keyword Args:
+            - order_manager: (optional) trading.orders.OrderManager of the
+                             account's orders, defaults to a new one per account
             - interest_rate: interest_rate affecting cash holdings (defaults to 0)
         """
         self.broker = broker # not cloned to save memory of data
+        if order_manager is None:
+            order_manager = orders.OrderManager()
         self.order_manager = order_manager
         if asset_manager is not None:
             self.asset_manager = asset_manager
@@ -142,6 +146,16 @@ class BasicAccount:
         df = pd.DataFrame(data=self.asset_manager.stock_history)
         return df.set_index('time')
 
+    def get_current_holdings(self,ticker_list):
+        """ get the number of each ticker held, as of the last update_to_t
+
+        Args:
+            - ticker_list: list of tickers
+        Returns:
+            - quantities: array of the number of each ticker held
+        """
+        return self.asset_manager.get_quantities(ticker_list)
+
     # -----------  OrderManager interaction ------------------------------------
 
     def place_historical_order(self,type,time,ticker,quantity,limit=0):
@@ -164,6 +178,17 @@ class BasicAccount:
         id   = self.order_manager.place_order(info,self.broker)
         return id
 
+    def place_historical_order_batch(self,batch):
+        """ add a batch of orders to be historically traded
+
+        Args:
+            - batch: a trading.orders.OrderBatch of orders to be added
+
+        Returns:
+            - ids: list of ids of the orders added, in the order of the batch
+        """
+        return self.order_manager.place_order_batch(batch,self.broker)
+
     def cancel_order(self,id):
         """ cancel an order that has been added to the order list
 
@@ -7,15 +7,20 @@ when requesting price for buying and selling, prices will likely differ
 
 import copy
 
+import numpy as np
 import pandas as pd
 from pandas.tseries.offsets import DateOffset
 
+from systrade import precision
+from systrade.trading.resampling import ResamplingCache
+
 class PaperBroker:
     def __init__(self,
                  data_df,
                  slippage_time=DateOffset(seconds=0),
                  transaction_cost=0.0,
-                 spread_pct=0.0):
+                 spread_pct=0.0,
+                 dtype=None):
         """ create a homemade paper trading brokerage account
 
         Args:
@@ -28,9 +33,16 @@ class PaperBroker:
             - transcation_cost: cost to perform a transaction (default 0)
             - spread_pct: the spread percentage between buy/sell price,
                           defaults to 0%.
+            - dtype: float dtype to store data in. Defaults to the float dtype
+                     of systrade.precision. With float64, data is kept as
+                     given. Prices given out for fills and valuations are
+                     float64 either way.
 
         """
         if isinstance(data_df, pd.DataFrame):
+            dtype = precision.resolve(dtype)
+            if dtype!=np.float64:
+                data_df = data_df.astype(dtype)
             self._historical_data = data_df
         else:
             raise TypeError("data_df supplied to PaperBroker should be a \
@@ -53,10 +65,21 @@ class PaperBroker:
                 raise ValueError("spread_pct should be a percentage: on [0,1]")
         else:
             raise TypeError("spread_pct should be  a number")
+        self._resampling = None
 
 
     def clone(self):
-        return copy.deepcopy(self)
+        """ deep copy of the broker, sharing its resampling cache (see
+        get_resampling_cache), as the data of the copy is the same """
+        cache = self.get_resampling_cache()
+        return copy.deepcopy(self,{id(cache):cache})
+
+    def _as_accumulate(self,price):
+        """ a price as float64 if the data is float32, so that cash and
+        portfolio values accumulate in float64 """
+        if isinstance(price,np.float32):
+            return precision.ACCUMULATE_DTYPE(price)
+        return price
 
     def next_extant_time(self,time):
         if time<=self._historical_data.index.max():
@@ -95,6 +118,87 @@ class PaperBroker:
         else:
             raise ValueError("ticker_list contained tickers that do not exist in historical data")
 
+    def get_resampling_cache(self):
+        """ get the (lazily created) resampling cache of the broker's data
+
+        The cache is shared by all users of the broker, so that data is
+        resampled once per bucket size, see trading.resampling.
+
+        Returns:
+            - cache: trading.resampling.ResamplingCache
+        """
+        if getattr(self,'_resampling',None) is None:
+            self._resampling = ResamplingCache(self._historical_data)
+        return self._resampling
+
+    def get_resampled_price_list(self,ticker_list,minutes,time0,time1,field='close'):
+        """ get prices of tickers resampled into buckets of minutes
+
+        Buckets are aligned to midnight of the first day of the broker's data,
+        and labelled by their right edge, see trading.resampling.
+
+        Args:
+            - ticker_list: list of tickers (or a single ticker)
+            - minutes: (int) size of the buckets in minutes
+            - time0: first bucket label to include
+            - time1: last bucket label to include
+        Keyword Args:
+            - field: one of 'open', 'high', 'low', 'close' (defaults to 'close')
+        Returns:
+            - prices_df: dataframe indexed by bucket labels, columns as tickers
+        """
+        if isinstance(ticker_list,str):
+            ticker_list=[ticker_list]
+        if set(ticker_list).issubset(self._historical_data.columns):
+            prices_df = self.get_resampling_cache().get_prices(minutes,field=field)
+            return prices_df.loc[time0:time1][ticker_list]
+        else:
+            raise ValueError("ticker_list contained tickers that do not exist in historical data")
+
+    def get_price_matrix(self,ticker_list,time0,time1):
+        """ get prices of tickers between two times as a 2d array
+
+        As get_price_list, without building a dataframe. Where ticker_list is
+        all the broker's tickers in order, the array is a view of the data.
+
+        Args:
+            - ticker_list: list of tickers (columns of the array)
+            - time0: first time to include
+            - time1: last time to include
+        Returns:
+            - (times,prices): pandas DatetimeIndex of the rows, and array of
+                              prices (times x tickers)
+        """
+        if isinstance(ticker_list,str):
+            ticker_list=[ticker_list]
+        columns = self._historical_data.columns
+        col_inds = columns.get_indexer(ticker_list)
+        if np.any(col_inds<0):
+            raise ValueError("ticker_list contained tickers that do not exist in historical data")
+        rows = self._historical_data.index.slice_indexer(time0,time1)
+        values = self._historical_data.values[rows]
+        if not np.array_equal(col_inds,np.arange(len(columns))):
+            values = values[:,col_inds]
+        return self._historical_data.index[rows],values
+
+    def get_unslipped_prices(self,ticker_list,time):
+        """ get prices of many tickers at a time, as get_unslipped_price
+
+        Args:
+            - ticker_list: list of tickers
+            - time: time of prices, the next available time is used
+        Returns:
+            - prices: array of the price of each ticker
+        """
+        index = self._historical_data.index
+        t_ind = index.searchsorted(time,side='left')
+        if t_ind>=len(index):
+            raise ValueError("requesting a time later than available in data")
+        col_inds = self._historical_data.columns.get_indexer(ticker_list)
+        if np.any(col_inds<0):
+            raise ValueError("ticker_list contained tickers that do not exist in historical data")
+        return self._historical_data.values[t_ind,col_inds].astype(precision.ACCUMULATE_DTYPE)
+
     def get_data_subset(self,ticker,time):
         max_time = self._historical_data.index.max()
         return self.get_price_list(ticker,time,max_time)
@@ -104,7 +208,7 @@ class PaperBroker:
         time = self.next_extant_time(time)
 
         if ticker in self._historical_data:
-            return self._historical_data.loc[time][ticker]
+            return self._as_accumulate(self._historical_data.loc[time][ticker])
         else:
             raise ValueError("ticker:",ticker," not available in historical_data")
 
@@ -113,7 +217,8 @@ class PaperBroker:
         time = self.next_extant_time(time)
 
         if ticker in self._historical_data:
-            return self._historical_data.loc[time][ticker], self.transaction_cost,time
+            price = self._as_accumulate(self._historical_data.loc[time][ticker])
+            return price, self.transaction_cost,time
         else:
             raise ValueError("ticker:",ticker," not available in historical_data")
 
@@ -124,3 +229,30 @@ class PaperBroker:
     def get_sell_price(self,ticker,time):
         p,f,t = self.get_price(ticker,time)
         return p*(1.0-self.spread_pct/200.0),f,t
+
+    def get_fill_arrays(self,ticker_list,times,buysell):
+        """ get prices, fees and times of many fills at once
+
+        Each fill is priced as by get_buy_price (buysell>0) or get_sell_price
+        (buysell<0).
+
+        Args:
+            - ticker_list: list of the ticker of each fill
+            - times: times at which each fill is requested
+            - buysell: array of +1/-1 for buy/sell of each fill
+        Returns:
+            - (prices,fees,times): arrays of the price and fee of each fill, and
+                                   a DatetimeIndex of the time of each fill
+        """
+        index = self._historical_data.index
+        slipped = pd.DatetimeIndex(times)+self._slippage_time
+        t_inds = index.searchsorted(slipped,side='left')
+        if np.any(t_inds>=len(index)):
+            raise ValueError("requesting a time later than available in data")
+        col_inds = self._historical_data.columns.get_indexer(ticker_list)
+        if np.any(col_inds<0):
+            raise ValueError("ticker_list contained tickers that do not exist in historical data")
+        prices = self._historical_data.values[t_inds,col_inds].astype(precision.ACCUMULATE_DTYPE)
+        prices = prices*(1.0+np.sign(buysell)*self.spread_pct/200.0)
+        fees = np.full((len(t_inds),),self.transaction_cost)
+        return prices,fees,index[t_inds]
@@ -86,13 +86,36 @@ class AssetManager:
         self.fee_holding.set_adjustments_to_now(time)
 
     def get_stock_portfolio_value(self,broker,time):
+        """ value of the stock held, at prices of the broker at a time
+
+        Prices of all tickers are found at once where the broker provides
+        get_unslipped_prices, else one ticker at a time.
+        """
         val = 0.0
+        if not self._current_stock:
+            return val
+        if hasattr(broker,'get_unslipped_prices'):
+            ticks = list(self._current_stock.keys())
+            quantities = np.fromiter(self._current_stock.values(),
+                                     dtype=np.float64,count=len(ticks))
+            return float(np.dot(quantities,broker.get_unslipped_prices(ticks,time)))
         if self._current_stock is not None:
             for tick in self._current_stock:
                 val += self._current_stock[tick]* \
                        broker.get_unslipped_price(tick,time)
         return val
 
+    def get_quantities(self,ticker_list):
+        """ number of each ticker held, as of the last update_to_time
+
+        Args:
+            - ticker_list: list of tickers
+        Returns:
+            - quantities: array of the number of each ticker held
+        """
+        held = self._current_stock if self._current_stock is not None else dict()
+        return np.array([held.get(t,0) for t in ticker_list])
+
     def get_cash(self, time):
         return self.cash_holding.get_cash_no_new_vals_check(time)
 
@@ -0,0 +1,162 @@
+""" Module for running strategies bar by bar, e.g on a live feed
+
+BaseStrategy.run_historical finds all orders from the full history before
+trading. LiveRunner instead feeds a strategy one bar (the prices of its tickers
+at one time) at a time: the strategy updates its incremental indicator and
+signal state (see init_live/update_live of strategies and signals), and any
+orders it emits are placed with the account straight away, before the account
+is updated to the bar's time. The time taken to process each bar is recorded.
+
+replay_bars replays the data of a broker as a feed of bars, so that a strategy
+can be run live against historical data. Bars may also be coarser than the
+data (e.g 5 minute bars of minute data), from the broker's resampling cache
+(see trading.resampling), so that replays sharing a broker resample its data
+once per bar size.
+"""
+import time as timer
+
+import numpy as np
+import pandas as pd
+
+
+def replay_bars(broker,ticker_list,t0=None,t1=None,minutes=None):
+    """ replay a broker's data as a feed of bars
+
+    Args:
+        - broker: a trading.brokers object
+        - ticker_list: list of tickers in each bar
+    Keyword Args:
+        - t0: (pandas timestamp) first time to replay, defaults to the first
+              time of the broker
+        - t1: (pandas timestamp) last time to replay, defaults to the last time
+              of the broker (with minutes, to the last bucket)
+        - minutes: (optional int) size of bars in minutes. Bars are then the
+                   close prices of buckets of the data (see
+                   broker.get_resampled_price_list), at their labels (right
+                   edges). Defaults to the bars of the data.
+    Yields:
+        - (time,bar): time of each bar, and array of prices of ticker_list
+    """
+    bt0,bt1 = broker.get_firstlast_times()
+    t0 = bt0 if t0 is None else t0
+    if minutes is not None:
+        prices_df = broker.get_resampled_price_list(ticker_list,minutes,t0,t1)
+    else:
+        t1 = bt1 if t1 is None else t1
+        prices_df = broker.get_price_list(ticker_list,t0,t1)
+    values = np.asarray(prices_df.values,dtype=np.float64)
+    for t_idx,t_val in enumerate(prices_df.index):
+        yield t_val,values[t_idx]
+
+
+class LiveRunner:
+    """ Run a strategy bar by bar against an account """
+    def __init__(self,strategy,account,latency_budget=None):
+        """ initialize
+
+        Args:
+            - strategy: a models.strategy object supporting init_live and
+                        update_live (e.g SimpleStrategy)
+            - account: a trading.accounts object to place orders with
+
+        Keyword Args:
+            - latency_budget: (optional) time in seconds that processing a bar
+                              should take at most, bars over the budget are
+                              counted in n_over_budget
+        """
+        self.strategy = strategy
+        self.account = account
+        if latency_budget is not None and latency_budget<=0:
+            raise ValueError("latency_budget should be > 0")
+        self.latency_budget = latency_budget
+        self.latencies = []
+        self.order_ids = []
+        self.unplaced_orders = []
+        self.n_over_budget = 0
+        self._started = False
+
+    def start(self):
+        """ initialize the strategy's bar by bar state """
+        self.strategy.init_live()
+        self.latencies = []
+        self.order_ids = []
+        self.unplaced_orders = []
+        self.n_over_budget = 0
+        self._started = True
+
+    def on_bar(self,time,bar):
+        """ process the next bar
+
+        The strategy is updated with the bar, its orders are placed, and the
+        account is updated to the bar's time.
+
+        Args:
+            - time: (pandas timestamp) time of the bar
+            - bar: array of prices of each ticker of the strategy's ticker_list
+        Returns:
+            - order_list: list of order dictionaries emitted at this bar
+        """
+        if not self._started:
+            self.start()
+        t_start = timer.perf_counter()
+        order_list = self.strategy.update_live(time,bar)
+        for o in order_list:
+            try:
+                self.order_ids.append(self.account.place_historical_order(**o))
+            except ValueError:
+                # no data yet at the time the order would fill
+                self.unplaced_orders.append(o)
+        self.account.update_to_t(time)
+        latency = timer.perf_counter()-t_start
+        self.latencies.append(latency)
+        if self.latency_budget is not None and latency>self.latency_budget:
+            self.n_over_budget += 1
+        return order_list
+
+    def finish(self):
+        """ end the feed, and get orders still pending in the strategy
+
+        These orders are not placed: there are no later bars for them to fill
+        at. They are kept in unplaced_orders, with any orders emitted that
+        could not be filled from the data.
+
+        Returns:
+            - order_list: list of order dictionaries not placed
+        """
+        order_list = self.strategy.flush_live()
+        self.unplaced_orders.extend(order_list)
+        self._started = False
+        return order_list
+
+    def run(self,bars):
+        """ run over a feed of bars, e.g from replay_bars
+
+        Args:
+            - bars: iterable of (time,bar) pairs
+        Returns:
+            - order_list: list of all order dictionaries emitted by the
+                          strategy, those placed followed by those unplaced
+        """
+        self.start()
+        order_list = []
+        for t_val,bar in bars:
+            order_list.extend(self.on_bar(t_val,bar))
+        order_list.extend(self.finish())
+        return order_list
+
+    def latency_stats(self):
+        """ statistics of the time taken to process each bar
+
+        Returns:
+            - stats: pandas Series of the number of bars, and the mean, median,
+                     99th percentile and maximum latency in seconds
+        """
+        lat = np.asarray(self.latencies,dtype=np.float64)
+        if len(lat)==0:
+            return pd.Series({'n_bars':0,'mean':np.nan,'median':np.nan,
+                              'p99':np.nan,'max':np.nan})
+        return pd.Series({'n_bars':len(lat),
+                          'mean':np.mean(lat),
+                          'median':np.median(lat),
+                          'p99':np.percentile(lat,99),
+                          'max':np.max(lat)})
@@ -1,8 +1,15 @@
 import copy
 from abc import ABC,abstractmethod
+import numpy as np
 import pandas as pd
 import warnings
 
+# order types, in the order of their integer codes in an OrderBatch
+ORDER_TYPES = ('buy_market','sell_market',
+               'buy_limit','sell_limit',
+               'buy_stop','sell_stop',
+               'buy_stoplimit','sell_stoplimit')
+
 #TODO: implement the template method pattern in here
 
 class OrderPlacer:
@@ -14,6 +21,43 @@ class OrderPlacer:
         order.place_historical(broker)
         return order
 
+    def process_batch(self, batch, broker):
+        """ make and place the orders of an OrderBatch
+
+        Market orders are priced together, if the broker can price many fills
+        at once (has get_fill_arrays), otherwise orders are placed one by one.
+
+        Args:
+            - batch: an OrderBatch
+            - broker: a trading.brokers object
+        Returns:
+            - order_list: list of placed orders, in the order of the batch
+        """
+        if not hasattr(broker,'get_fill_arrays'):
+            return [self.process_order(info,broker) for info in batch]
+        is_market = batch.is_market()
+        signs = batch.buysell()
+        prices = np.zeros((len(batch),))
+        fees = np.zeros((len(batch),))
+        exec_times = [None]*len(batch)
+        if np.any(is_market):
+            inds = np.flatnonzero(is_market)
+            tickers = [batch.tickers[i] for i in batch.ticker_ids[inds]]
+            p,f,t = broker.get_fill_arrays(tickers,batch.times[inds],signs[inds])
+            prices[inds] = p
+            fees[inds] = f
+            for i,t_i in zip(inds,t):
+                exec_times[i] = t_i
+        order_list = []
+        for i,info in enumerate(batch):
+            if is_market[i]:
+                order = self._info_to_order(info)
+                order.set_placement(prices[i],fees[i],exec_times[i])
+            else:
+                order = self.process_order(info,broker)
+            order_list.append(order)
+        return order_list
+
     def _info_to_order(self,info):
         if info['type']=='buy_market':
             return BuyMarketOrder(info['time'],info['ticker'],info['quantity'])
@@ -46,12 +90,13 @@ class IntIDGenerator:
 
 
 class OrderManager:
-    def __init__(self,id_generator=IntIDGenerator(), order_placer=OrderPlacer()):
+    def __init__(self,id_generator=None, order_placer=None):
         self.orders    = dict()
         self.fulfilled = dict()
         self.cancelled = dict()
-        self.id_generator = id_generator
-        self.order_placer = order_placer
+        # new defaults per manager, so that managers do not share state
+        self.id_generator = IntIDGenerator() if id_generator is None else id_generator
+        self.order_placer = OrderPlacer() if order_placer is None else order_placer
 
     def place_order(self,order_info,broker):
         id = self.id_generator.get_new_id()
@@ -59,6 +104,22 @@ class OrderManager:
         self.orders[id] = order
         return id
 
+    def place_order_batch(self,batch,broker):
+        """ place all orders of an OrderBatch
+
+        Args:
+            - batch: an OrderBatch
+            - broker: a trading.brokers object
+        Returns:
+            - ids: list of ids of the placed orders, in the order of the batch
+        """
+        ids = []
+        for order in self.order_placer.process_batch(batch,broker):
+            id = self.id_generator.get_new_id()
+            self.orders[id] = order
+            ids.append(id)
+        return ids
+
     def cancel_order(self,id):
         #try:
         this_order = self.orders.pop(id)
@@ -120,6 +181,136 @@ class OrderManager:
                                " clash: " + str(conflicts))
 
 
+class OrderBatch:
+    """ Columnar batch of order requests
+
+    Holds the same information as a list of order dictionaries (as from a
+    strategy's get_order_list), as arrays: an integer code for each order type
+    (an index into ORDER_TYPES), times, integer ids into a list of tickers,
+    quantities, and optionally limits. Iterating over a batch gives the
+    order dictionaries.
+    """
+    def __init__(self,type_codes,times,ticker_ids,tickers,quantities,limits=None):
+        """ initialize
+
+        Args:
+            - type_codes: integer array, index into ORDER_TYPES of each order
+            - times: pandas DatetimeIndex of the time of each order
+            - ticker_ids: integer array, index into tickers of each order
+            - tickers: list of tickers
+            - quantities: array of quantity of each order
+        Keyword Args:
+            - limits: (optional) array of limit of each order
+        """
+        self.type_codes = np.asarray(type_codes,dtype=np.int8)
+        self.times = pd.DatetimeIndex(times)
+        self.ticker_ids = np.asarray(ticker_ids,dtype=np.int64)
+        self.tickers = list(tickers)
+        self.quantities = np.asarray(quantities)
+        if limits is not None:
+            limits = np.asarray(limits,dtype=np.float64)
+        self.limits = limits
+        n = len(self.type_codes)
+        if not (len(self.times)==len(self.ticker_ids)==len(self.quantities)==n):
+            raise ValueError("all order fields should be the same length")
+        if limits is not None and len(limits)!=n:
+            raise ValueError("all order fields should be the same length")
+        if n>0:
+            if self.type_codes.min()<0 or self.type_codes.max()>=len(ORDER_TYPES):
+                raise ValueError("unknown order type code")
+            if self.ticker_ids.min()<0 or self.ticker_ids.max()>=len(self.tickers):
+                raise ValueError("ticker ids out of range of tickers")
+
+    @classmethod
+    def from_order_list(cls,order_list):
+        """ make an OrderBatch from a list of order dictionaries
+
+        Args:
+            - order_list: list of dictionaries with keys type, time, ticker,
+                          quantity and optionally limit
+        Returns:
+            - batch: OrderBatch
+        """
+        try:
+            type_codes = [ORDER_TYPES.index(o['type']) for o in order_list]
+        except ValueError:
+            raise ValueError("Unknown Order Type")
+        tick_index = dict()
+        ticker_ids = [tick_index.setdefault(o['ticker'],len(tick_index))
+                      for o in order_list]
+        limits = None
+        if any('limit' in o for o in order_list):
+            limits = [o.get('limit',0) for o in order_list]
+        return cls(type_codes,
+                   [o['time'] for o in order_list],
+                   ticker_ids,
+                   list(tick_index.keys()),
+                   [o['quantity'] for o in order_list],
+                   limits)
+
+    @classmethod
+    def from_target_positions(cls,times,targets,tickers,initial=None):
+        """ make the minimal market orders moving holdings through targets
+
+        One order is made for each ticker whose target changes at each time,
+        for all times and tickers at once.
+
+        Args:
+            - times: pandas DatetimeIndex of the time of each row of targets
+            - targets: integer array (times x tickers) of target holdings
+            - tickers: list of tickers of the columns of targets
+        Keyword Args:
+            - initial: (optional) integer array of holdings of each ticker
+                       before the first time, defaults to none held
+        Returns:
+            - batch: OrderBatch of buy/sell market orders, ordered by time and
+                     then by tickers
+        """
+        targets = np.asarray(targets)
+        if targets.ndim!=2 or targets.shape!=(len(times),len(tickers)):
+            raise ValueError("targets should be of shape (times x tickers)")
+        if initial is None:
+            initial = np.zeros((len(tickers),),dtype=np.int64)
+        initial = np.asarray(initial)
+        if initial.shape!=(len(tickers),):
+            raise ValueError("initial should have a holding for each ticker")
+        if np.any(targets!=np.round(targets)) or np.any(initial!=np.round(initial)):
+            raise ValueError("targets and holdings should be whole numbers")
+        changes = np.diff(targets.astype(np.int64),axis=0,
+                          prepend=initial.astype(np.int64)[np.newaxis,:])
+        rows,ticker_ids = np.nonzero(changes)
+        deltas = changes[rows,ticker_ids]
+        type_codes = np.where(deltas>0,ORDER_TYPES.index('buy_market'),
+                                       ORDER_TYPES.index('sell_market'))
+        return cls(type_codes,pd.DatetimeIndex(times)[rows],ticker_ids,tickers,
+                   np.abs(deltas))
+
+    def __len__(self):
+        return len(self.type_codes)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            info = {'type': ORDER_TYPES[self.type_codes[i]],
+                    'time': self.times[i],
+                    'ticker': self.tickers[self.ticker_ids[i]],
+                    'quantity': self.quantities[i].item()}
+            if self.limits is not None:
+                info['limit'] = self.limits[i]
+            yield info
+
+    def to_list(self):
+        """ get the orders as a list of order dictionaries """
+        return list(self)
+
+    def is_market(self):
+        """ boolean array, True for market orders """
+        return self.type_codes<2
+
+    def buysell(self):
+        """ integer array, +1 for buy orders and -1 for sell orders """
+        return np.where(self.type_codes%2==0,1,-1)
+
+
 class Order(ABC):
     """ Abstract Base Class for orders """
     def __init__(self,time,ticker,quantity):
@@ -154,6 +345,19 @@ class Order(ABC):
         if not self.fulfilled:
             #print("placing an order \n")
             price,fee,time = self.get_price_fee_time(broker)
+            self.set_placement(price,fee,time)
+        else:
+            warnings.warn("Order already executed - ignoring this \
+                           placement", RuntimeWarning)
+        pass
+
+    def set_placement(self,price,fee,time):
+        """ set the price, fee and time the order will be executed with
+
+        As place_historical, with price, fee and time already found (e.g for
+        many orders at once).
+        """
+        if not self.fulfilled:
             self.price_at_execution = price
             self.time_executed = time
             self.transaction_fee = fee
@@ -161,7 +365,6 @@ class Order(ABC):
         else:
             warnings.warn("Order already executed - ignoring this \
                            placement", RuntimeWarning)
-        pass
 
     def execute_historical(self,portfolio_manager):
         """ execute a placed order """
@@ -0,0 +1,186 @@
+""" Module for resampling price data into coarser time buckets
+
+A ResamplingCache belongs to one price dataframe (e.g of a PaperBroker, shared
+by the broker's clones), and memoises, for each bucket size, the bucket each
+time falls in and the open, high, low and close prices of each bucket. Users
+of the broker's resampled prices (e.g bar replays of trading.live.replay_bars)
+then resample the data once per bucket size.
+
+Buckets follow pandas resample(str(minutes)+'T',closed='right',label='right'):
+bucket edges are multiples of the bucket size from midnight of the first day of
+the data, a bucket includes its right edge and is labelled by it, so that the
+price at a label is known at that time. Unlike pandas, buckets without any data
+are dropped. As with pandas first() and last(), the open and close of a bucket
+are its first and last prices that are not NaN (NaN if it has none).
+
+A bucket size that is a multiple of an already cached size is found from the
+cached buckets rather than from the data: each finer bucket lies in exactly one
+coarser bucket, so the cost is of the number of finer buckets.
+"""
+import numpy as np
+import pandas as pd
+
+OHLC_FIELDS = ('open','high','low','close')
+
+
+def _check_minutes(minutes):
+    if not isinstance(minutes,(int,np.integer)) or minutes<1:
+        raise ValueError("minutes should be a positive integer")
+
+def _right_edges(t_ns,day0,minutes):
+    """ right edges (labels) of the buckets of times, as integer ns """
+    size = np.int64(minutes)*60*10**9
+    return day0-((day0-t_ns)//size)*size
+
+def _groups(labels):
+    """ start of each run of equal (sorted) labels, and run of each label """
+    new_group = np.ones((len(labels),),dtype=bool)
+    new_group[1:] = labels[1:]!=labels[:-1]
+    return np.flatnonzero(new_group),np.cumsum(new_group)-1
+
+def _first_valid(values,starts):
+    """ first non-NaN value of each group of rows, NaN if there is none """
+    n_rows = values.shape[0]
+    rows = np.where(np.isnan(values),n_rows,
+                    np.arange(n_rows)[:,np.newaxis])
+    first = np.minimum.reduceat(rows,starts,axis=0)
+    return _take_rows(values,first,first<n_rows)
+
+def _last_valid(values,starts):
+    """ last non-NaN value of each group of rows, NaN if there is none """
+    rows = np.where(np.isnan(values),-1,
+                    np.arange(values.shape[0])[:,np.newaxis])
+    last = np.maximum.reduceat(rows,starts,axis=0)
+    return _take_rows(values,last,last>=0)
+
+def _take_rows(values,rows,valid):
+    """ values at a row of each column, NaN where not valid """
+    taken = np.take_along_axis(values,np.where(valid,rows,0),axis=0)
+    return np.where(valid,taken,np.nan)
+
+
+class ResamplingCache:
+    """ Memoised resampling of a price dataframe into time buckets """
+    def __init__(self,data_df):
+        """ initialize
+
+        Args:
+            - data_df: pandas dataframe of prices, indexed by (sorted) time,
+                       columns as ticker names
+        """
+        if not isinstance(data_df,pd.DataFrame):
+            raise TypeError("data_df should be a pandas DataFrame")
+        if not data_df.index.is_monotonic_increasing:
+            raise ValueError("data_df should be sorted by time")
+        self._data_df = data_df
+        self._times = pd.DatetimeIndex(data_df.index)
+        self._values = np.asarray(data_df.values,dtype=np.float64)
+        if len(self._times)>0:
+            self._day0 = self._times[:1].floor('D').asi8[0]
+        else:
+            self._day0 = np.int64(0)
+        self._labels = dict() # minutes: integer ns labels of buckets
+        self._bucket_ids = dict() # minutes: bucket of each time of the data
+        self._ohlc = dict() # minutes: dict of field: array (buckets x tickers)
+        self._frames = dict() # (minutes,field): dataframe
+
+    def cached_sizes(self):
+        """ bucket sizes (in minutes) resampled so far """
+        return sorted(self._labels.keys())
+
+    def _finer_size(self,minutes):
+        """ largest cached bucket size that divides minutes, or None """
+        divisors = [m for m in self._labels if m<minutes and minutes%m==0]
+        if len(divisors)==0:
+            return None
+        return max(divisors)
+
+    def _build(self,minutes):
+        finer = self._finer_size(minutes)
+        if finer is None:
+            labels = _right_edges(self._times.asi8,self._day0,minutes)
+            starts,bucket_ids = _groups(labels)
+            values = self._values
+            ohlc_in = dict(open=values,high=values,low=values,close=values)
+        else:
+            fine_labels = self._labels[finer]
+            labels = _right_edges(fine_labels,self._day0,minutes)
+            starts,fine_to_coarse = _groups(labels)
+            bucket_ids = fine_to_coarse[self._bucket_ids[finer]]
+            ohlc_in = self._ohlc[finer]
+        if len(starts)>0:
+            ohlc = dict(open=_first_valid(ohlc_in['open'],starts),
+                        high=np.fmax.reduceat(ohlc_in['high'],starts,axis=0),
+                        low=np.fmin.reduceat(ohlc_in['low'],starts,axis=0),
+                        close=_last_valid(ohlc_in['close'],starts))
+        else:
+            ohlc = {f:self._values[:0] for f in OHLC_FIELDS}
+        self._labels[minutes] = labels[starts]
+        self._bucket_ids[minutes] = bucket_ids
+        self._ohlc[minutes] = ohlc
+
+    def _ensure(self,minutes):
+        _check_minutes(minutes)
+        if minutes not in self._labels:
+            self._build(minutes)
+
+    def bucket_times(self,minutes):
+        """ labels (right edges) of buckets with data
+
+        Args:
+            - minutes: (int) size of the buckets in minutes
+        Returns:
+            - times: pandas DatetimeIndex, in the timezone of the data
+        """
+        self._ensure(minutes)
+        times = pd.DatetimeIndex(self._labels[minutes])
+        if self._times.tz is not None:
+            times = times.tz_localize('UTC').tz_convert(self._times.tz)
+        return times
+
+    def bucket_map(self,minutes):
+        """ bucket of each time of the data
+
+        Args:
+            - minutes: (int) size of the buckets in minutes
+        Returns:
+            - bucket_ids: integer array, for each time of the data the index
+                          into bucket_times(minutes) of its bucket
+        """
+        self._ensure(minutes)
+        return self._bucket_ids[minutes]
+
+    def get_prices(self,minutes,field='close'):
+        """ prices of each bucket
+
+        Frames are memoised and shared by all callers, and should not be
+        modified.
+
+        Args:
+            - minutes: (int) size of the buckets in minutes
+        Keyword Args:
+            - field: one of 'open', 'high', 'low', 'close' (defaults to 'close')
+        Returns:
+            - prices_df: dataframe indexed by bucket labels, columns as the
+                         tickers of the data
+        """
+        if field not in OHLC_FIELDS:
+            raise ValueError("field should be one of: "+str(OHLC_FIELDS))
+        if (minutes,field) not in self._frames:
+            self._ensure(minutes)
+            self._frames[(minutes,field)] = pd.DataFrame(
+                                    data=self._ohlc[minutes][field],
+                                    index=self.bucket_times(minutes),
+                                    columns=self._data_df.columns)
+        return self._frames[(minutes,field)]
+
+    def get_ohlc(self,minutes):
+        """ open, high, low and close prices of each bucket
+
+        Args:
+            - minutes: (int) size of the buckets in minutes
+        Returns:
+            - ohlc: dictionary of field name: dataframe, see get_prices
+        """
+        return {f:self.get_prices(minutes,field=f) for f in OHLC_FIELDS}
+
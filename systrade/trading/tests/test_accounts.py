@@ -163,3 +163,28 @@ class TestBasicAccount:
         with pytest.warns(Warning):
             account.cancel_order('j')
     
+
+    def test_place_historical_order_batch(self):
+        # batch placement fills orders as placing them one by one
+        broker = PaperBroker(DATA_DF,slippage_time=pd.DateOffset(seconds=30),
+                             transaction_cost=1.5,spread_pct=2.0)
+        order_list = [{'type':'buy_market','time':TIME_START,'ticker':'tick0','quantity':2},
+                      {'type':'buy_market','time':TIME_START+pd.DateOffset(minutes=2),
+                       'ticker':'tick1','quantity':1},
+                      {'type':'sell_market','time':TIME_START+pd.DateOffset(minutes=6),
+                       'ticker':'tick0','quantity':1}]
+        portfolios = []
+        for use_batch in [False,True]:
+            account = BasicAccount(broker,TIME_START,TIME_END,orders.OrderManager())
+            if use_batch:
+                ids = account.place_historical_order_batch(
+                            orders.OrderBatch.from_order_list(order_list))
+                assert len(ids)==3
+            else:
+                for o in order_list:
+                    account.place_historical_order(**o)
+            for t in TIMEINDEX:
+                account.update_to_t(t)
+            assert account.total_trades==3
+            portfolios.append(account.get_portfolio_df())
+        pd.testing.assert_frame_equal(portfolios[0],portfolios[1])
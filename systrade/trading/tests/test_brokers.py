@@ -3,6 +3,7 @@ import pytest
 import numpy as np
 import pandas as pd
 
+from systrade import precision
 from systrade.trading.brokers import PaperBroker
 
 T_START = pd.to_datetime('2019/07/10-09:30:00:000000', format='%Y/%m/%d-%H:%M:%S:%f')
@@ -133,3 +134,67 @@ class TestPaperBroker:
         assert time == t_get+pd.DateOffset(minutes=1)
         assert fee == 2.0
         assert price==pytest.approx(6*(1.0-4.0/200.0))
+
+    def test_get_fill_arrays(self):
+        broker = PaperBroker(DATA_DF,
+                             slippage_time=pd.DateOffset(seconds=30),
+                             transaction_cost = 2.0,
+                             spread_pct = 4)
+        ticks = ['tick0','tick1','tick0']
+        times = [T_START+pd.DateOffset(minutes=m) for m in [5,2,20]]
+        buysell = np.array([1,-1,-1])
+        prices,fees,fill_times = broker.get_fill_arrays(ticks,times,buysell)
+        for i in range(3):
+            if buysell[i]>0:
+                p,f,t = broker.get_buy_price(ticks[i],times[i])
+            else:
+                p,f,t = broker.get_sell_price(ticks[i],times[i])
+            assert prices[i]==pytest.approx(p)
+            assert fees[i]==f
+            assert fill_times[i]==t
+        with pytest.raises(ValueError):
+            broker.get_fill_arrays(['badtick'],times[:1],buysell[:1])
+        with pytest.raises(ValueError):
+            broker.get_fill_arrays(['tick0'],[T_END],buysell[:1])
+
+    def test_get_price_matrix(self):
+        broker = PaperBroker(DATA_DF)
+        t0,t1 = TIMEINDEX[3],TIMEINDEX[10]
+        times,prices = broker.get_price_matrix(['tick1','tick0'],t0,t1)
+        expected = broker.get_price_list(['tick1','tick0'],t0,t1)
+        assert times.equals(expected.index)
+        assert np.array_equal(prices,expected.values)
+        times,prices = broker.get_price_matrix(['tick0','tick1'],t0,t1)
+        # all tickers in order: a view of the data
+        assert np.shares_memory(prices,DATA_DF.values)
+        with pytest.raises(ValueError):
+            broker.get_price_matrix(['tick2'],t0,t1)
+
+    def test_get_unslipped_prices(self):
+        broker = PaperBroker(DATA_DF)
+        t = TIMEINDEX[4]+pd.DateOffset(seconds=10)
+        prices = broker.get_unslipped_prices(['tick1','tick0'],t)
+        assert np.array_equal(prices,[broker.get_unslipped_price('tick1',t),
+                                      broker.get_unslipped_price('tick0',t)])
+        with pytest.raises(ValueError):
+            broker.get_unslipped_prices(['tick0'],TIMEINDEX[-1]+pd.DateOffset(minutes=1))
+        with pytest.raises(ValueError):
+            broker.get_unslipped_prices(['tick2'],t)
+
+    def test_float32(self):
+        prices = 100.0+np.random.RandomState(0).normal(0,1,DATA_DF.shape).cumsum(axis=0)
+        data_df = pd.DataFrame(prices,index=TIMEINDEX,columns=DATA_DF.columns)
+        broker64 = PaperBroker(data_df,spread_pct=1.0)
+        broker32 = PaperBroker(data_df,spread_pct=1.0,dtype=np.float32)
+        assert broker32.get_price_list(['tick0'],T_START,T_END).dtypes.iloc[0]==np.float32
+        with precision.float_dtype(np.float32):
+            assert PaperBroker(data_df).get_price_list(['tick0'],T_START,T_END).dtypes.iloc[0]==np.float32
+        # prices given out for fills are float64, within float32 rounding
+        p32,f32,t32 = broker32.get_buy_price('tick1',TIMEINDEX[5])
+        p64,f64,t64 = broker64.get_buy_price('tick1',TIMEINDEX[5])
+        assert isinstance(p32,float)
+        assert abs(p32-p64)<=1e-6*abs(p64)
+        fills32 = broker32.get_fill_arrays(['tick0','tick1'],TIMEINDEX[:2],[1,-1])[0]
+        fills64 = broker64.get_fill_arrays(['tick0','tick1'],TIMEINDEX[:2],[1,-1])[0]
+        assert fills32.dtype==np.float64
+        assert np.allclose(fills32,fills64,rtol=1e-6,atol=0.0)
@@ -27,6 +27,10 @@ class FakeBroker:
         return price
 
 
+class FakeArrayBroker(FakeBroker):
+    def get_unslipped_prices(self,ticker_list,time):
+        return DATA_DF.loc[time][ticker_list].values
+
 FAKE_BROKER = FakeBroker()
 
 SECONDS_IN_FULL_YEAR = 3600.0*24.0*365.0
@@ -123,6 +127,10 @@ class TestAssetManager:
         value = manager.get_stock_portfolio_value(FAKE_BROKER,TIME_END)
         assert value == 100
 
+        # prices of all tickers at once, from a broker that provides them
+        value = manager.get_stock_portfolio_value(FakeArrayBroker(),TIME_END)
+        assert value == 100
+
     def test_add_to_history(self):
         manager = self.simple_buysell()
         manager.update_to_time(TIME_START)
@@ -0,0 +1,135 @@
+import pytest
+
+import numpy as np
+import pandas as pd
+
+from systrade.trading.brokers import PaperBroker
+from systrade.trading.accounts import BasicAccount
+from systrade.trading import live
+from systrade.trading import orders
+
+import systrade.models.signals as syssigs
+import systrade.models.indicators as sysinds
+import systrade.models.filters as sysfilts
+import systrade.models.strategies as sysstrats
+
+TIMEINDEX = pd.date_range(start='2019-07-10 09:30',end='2019-07-10 11:00',freq='1min')
+TIMEINDEX = TIMEINDEX.append(pd.date_range(start='2019-07-11 09:30',
+                                           end='2019-07-11 11:00',freq='1min'))
+DATA_DF = pd.DataFrame(data=100.0+np.random.RandomState(3).normal(0,1,(len(TIMEINDEX),3)).cumsum(axis=0),
+                       index=TIMEINDEX,columns=['tick0','tick1','tick2'])
+
+def _strategy(resampling=5):
+    sig0 = syssigs.ZeroCrossBuyUpSellDown(sysinds.MACrossOver(3,8),
+                                          sysfilts.TickerOneToManyFilter('tick0',['tick0','tick1']))
+    sig1 = syssigs.ZeroCrossBuyUpSellDown(sysinds.MACrossOver(5,12),
+                                          sysfilts.TickerOneToAnotherFilter(['tick0','tick2'],
+                                                                            ['tick2','tick1']))
+    return sysstrats.SimpleStrategy({'sig0':sig0,'sig1':sig1},
+                                    ['tick0','tick1','tick2'],resampling)
+
+def _key(o):
+    return (o['time'],o['ticker'],o['type'],o['quantity'])
+
+def _trade_key(info):
+    return (info['time_executed'],info['ticker'],info['type'])
+
+def _account(broker):
+    return BasicAccount(broker,TIMEINDEX[0],TIMEINDEX[-1],
+                        order_manager=orders.OrderManager())
+
+class TestLiveRunner:
+
+    def test_orders_match_historical(self):
+        broker = PaperBroker(DATA_DF)
+        for resampling in [1,5,7]:
+            strat = _strategy(resampling)
+            expected = strat.get_order_list(DATA_DF)
+            account = BasicAccount(broker,TIMEINDEX[0],TIMEINDEX[-1])
+            runner = live.LiveRunner(strat.clone(),account)
+            order_list = runner.run(live.replay_bars(broker,strat.ticker_list))
+            assert len(expected)>0
+            assert sorted(map(_key,order_list))==sorted(map(_key,expected))
+            assert len(runner.order_ids)+len(runner.unplaced_orders)==len(expected)
+
+    def test_trades_match_run_historical(self):
+        broker = PaperBroker(DATA_DF)
+        for resampling in [1,5,7]:
+            strat = _strategy(resampling)
+            hist_account = _account(broker)
+            strat.fast_clone().run_historical(hist_account)
+            live_account = _account(broker)
+            runner = live.LiveRunner(strat.fast_clone(),live_account)
+            runner.run(live.replay_bars(broker,strat.ticker_list))
+            assert hist_account.total_trades>0
+            assert live_account.total_trades==hist_account.total_trades
+            hist_trades = hist_account.order_manager.get_fulfilled_orders_info().values()
+            live_trades = live_account.order_manager.get_fulfilled_orders_info().values()
+            assert sorted(map(_trade_key,live_trades))==sorted(map(_trade_key,hist_trades))
+            assert np.all(live_account.get_current_holdings(strat.ticker_list)==
+                          hist_account.get_current_holdings(strat.ticker_list))
+
+    def test_fast_clone_live_state(self):
+        broker = PaperBroker(DATA_DF)
+        strat = _strategy(5)
+        strat.init_live()
+        bars = list(live.replay_bars(broker,strat.ticker_list))
+        for t_val,bar in bars[:40]:
+            strat.update_live(t_val,bar)
+        clone = strat.fast_clone()
+        # a clone carries on from the same state, without changing the original
+        clone_orders = [o for t_val,bar in bars[40:] for o in clone.update_live(t_val,bar)]
+        strat_orders = [o for t_val,bar in bars[40:] for o in strat.update_live(t_val,bar)]
+        assert len(strat_orders)>0
+        assert list(map(_key,clone_orders))==list(map(_key,strat_orders))
+
+    def test_replay_resampled_bars(self):
+        broker = PaperBroker(DATA_DF)
+        ticks = ['tick0','tick1','tick2']
+        bars = list(live.replay_bars(broker,ticks,minutes=5))
+        expected = broker.get_resampled_price_list(ticks,5,TIMEINDEX[0],None)
+        assert [t for t,bar in bars]==expected.index.to_list()
+        assert np.array_equal(np.array([bar for t,bar in bars]),expected.values)
+        assert broker.get_resampling_cache().cached_sizes()==[5]
+        # a strategy on 5 minute bars trades as on the resampled history
+        strat = _strategy(10)
+        runner = live.LiveRunner(strat.fast_clone(),_account(broker))
+        order_list = runner.run(bars)
+        assert len(order_list)>0
+        assert sorted(map(_key,order_list))==sorted(map(_key,strat.get_order_list(expected)))
+
+    def test_orders_placed_when_bucket_closes(self):
+        broker = PaperBroker(DATA_DF)
+        strat = _strategy(5)
+        account = BasicAccount(broker,TIMEINDEX[0],TIMEINDEX[-1])
+        runner = live.LiveRunner(strat,account)
+        runner.start()
+        for t_val,bar in live.replay_bars(broker,strat.ticker_list):
+            for o in runner.on_bar(t_val,bar):
+                # orders are for the bucket ending at or before this bar
+                assert o['time']<=t_val
+                assert t_val-o['time']<pd.Timedelta(days=1)
+        runner.finish()
+        assert account.total_trades==len(runner.order_ids)
+
+    def test_latency(self):
+        broker = PaperBroker(DATA_DF)
+        strat = _strategy()
+        account = BasicAccount(broker,TIMEINDEX[0],TIMEINDEX[-1])
+        runner = live.LiveRunner(strat,account,latency_budget=10.0)
+        runner.run(live.replay_bars(broker,strat.ticker_list))
+        stats = runner.latency_stats()
+        assert stats['n_bars']==len(TIMEINDEX)
+        assert 0.0<=stats['median']<=stats['p99']<=stats['max']
+        assert runner.n_over_budget==0
+        with pytest.raises(ValueError):
+            live.LiveRunner(strat,account,latency_budget=0.0)
+
+    def test_needs_incremental_indicator(self):
+        class FakeIndicator(sysinds.BaseIndicator):
+            def get_indicator(self,stock_df):
+                return stock_df
+        sig = syssigs.ZeroCrossBuyUpSellDown(FakeIndicator(),None)
+        strat = sysstrats.SimpleStrategy({'sig':sig},['tick0'])
+        with pytest.raises(TypeError):
+            strat.init_live()
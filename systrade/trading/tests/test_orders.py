@@ -262,3 +262,70 @@ class TestSellLimitOrder:
         p,f,t = order.get_price_fee_time(FAKE_BROKER)
         assert t==TIME_START+pd.DateOffset(minutes=4)
         assert p==4
+
+class TestOrderBatch:
+    def make_order_list(self):
+        return [{'type':'buy_market','time':TIME_START,'ticker':'tick1','quantity':1},
+                {'type':'sell_market','time':TIME_START+pd.DateOffset(minutes=2),
+                 'ticker':'tick0','quantity':2},
+                {'type':'sell_limit','time':TIME_START,'ticker':'tick0',
+                 'quantity':1,'limit':3.5}]
+
+    def test_from_order_list(self):
+        order_list = self.make_order_list()
+        batch = orders.OrderBatch.from_order_list(order_list)
+        assert len(batch)==3
+        assert batch.tickers==['tick1','tick0']
+        assert list(batch.is_market())==[True,True,False]
+        assert list(batch.buysell())==[1,-1,-1]
+        out = batch.to_list()
+        for o,o_in in zip(out,order_list):
+            assert isinstance(o['time'],pd.Timestamp)
+            for k in ['type','time','ticker','quantity']:
+                assert o[k]==o_in[k]
+        assert out[2]['limit']==3.5
+        with pytest.raises(ValueError):
+            orders.OrderBatch.from_order_list([{'type':'bad','time':TIME_START,
+                                                'ticker':'tick0','quantity':1}])
+        with pytest.raises(ValueError):
+            orders.OrderBatch([0],[TIME_START],[1],['tick0'],[1])
+
+    def test_process_batch(self):
+        batch = orders.OrderBatch.from_order_list(self.make_order_list())
+        placer = orders.OrderPlacer()
+        # broker without batch pricing - placed one by one
+        placed = placer.process_batch(batch,FAKE_BROKER)
+        assert [o.type for o in placed]==['buy_market','sell_market','sell_limit']
+        assert all(o.placed for o in placed)
+        assert placed[0].price_at_execution==DATA_DF.loc[TIME_START,'tick1']
+        assert placed[2].time_executed==TIME_START+pd.DateOffset(minutes=4)
+
+    def test_place_order_batch(self):
+        manager = orders.OrderManager(orders.IntIDGenerator())
+        batch = orders.OrderBatch.from_order_list(self.make_order_list())
+        ids = manager.place_order_batch(batch,FAKE_BROKER)
+        assert len(ids)==3
+        assert len(set(ids))==3
+        assert all(id in manager.orders for id in ids)
+
+    def test_from_target_positions(self):
+        times = TIMEINDEX[[0,3,6]]
+        targets = np.array([[1,0],[2,-1],[0,-1]])
+        batch = orders.OrderBatch.from_target_positions(times,targets,['tick0','tick1'])
+        out = [(o['time'],o['ticker'],o['type'],o['quantity']) for o in batch]
+        assert out==[(times[0],'tick0','buy_market',1),
+                     (times[1],'tick0','buy_market',1),
+                     (times[1],'tick1','sell_market',1),
+                     (times[2],'tick0','sell_market',2)]
+        # already holding the first targets
+        batch = orders.OrderBatch.from_target_positions(times,targets,['tick0','tick1'],
+                                                        initial=[1,0])
+        assert len(batch)==3
+        assert all(o['time']>times[0] for o in batch)
+        with pytest.raises(ValueError):
+            orders.OrderBatch.from_target_positions(times,targets[:2],['tick0','tick1'])
+        with pytest.raises(ValueError):
+            orders.OrderBatch.from_target_positions(times,targets,['tick0','tick1'],
+                                                    initial=[1])
+        with pytest.raises(ValueError):
+            orders.OrderBatch.from_target_positions(times,targets+0.5,['tick0','tick1'])
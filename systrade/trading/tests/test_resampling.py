@@ -0,0 +1,116 @@
+import pytest
+
+import numpy as np
+import pandas as pd
+
+from systrade.trading.brokers import PaperBroker
+from systrade.trading.resampling import ResamplingCache
+
+TIMEINDEX = pd.date_range(start='2019-07-10 09:30',end='2019-07-10 16:00',freq='1min')
+TIMEINDEX = TIMEINDEX.append(pd.date_range(start='2019-07-11 09:30',
+                                           end='2019-07-11 16:00',freq='1min'))
+DATA_DF = pd.DataFrame(data=100.0+np.random.RandomState(0).normal(0,1,(len(TIMEINDEX),2)).cumsum(axis=0),
+                       index=TIMEINDEX,columns=['tick0','tick1'])
+
+def _pandas_ohlc(minutes,field):
+    resampled = DATA_DF.resample(str(minutes)+'T',closed='right',label='right')
+    if field=='open':
+        df = resampled.first()
+    elif field=='high':
+        df = resampled.max()
+    elif field=='low':
+        df = resampled.min()
+    else:
+        df = resampled.last()
+    return df.dropna()
+
+class TestResamplingCache:
+
+    def test_init(self):
+        with pytest.raises(TypeError):
+            ResamplingCache(DATA_DF['tick0'])
+        with pytest.raises(ValueError):
+            ResamplingCache(DATA_DF.iloc[::-1])
+        with pytest.raises(ValueError):
+            ResamplingCache(DATA_DF).get_prices(0)
+        with pytest.raises(ValueError):
+            ResamplingCache(DATA_DF).get_prices(5,field='volume')
+
+    def test_matches_pandas(self):
+        cache = ResamplingCache(DATA_DF)
+        for minutes in [1,5,7,60,390]:
+            for field,df in cache.get_ohlc(minutes).items():
+                expected = _pandas_ohlc(minutes,field)
+                assert df.index.equals(expected.index)
+                assert np.allclose(df.values,expected.values)
+
+    def test_derived_from_finer(self):
+        cache = ResamplingCache(DATA_DF)
+        cache.get_prices(5)
+        cache.get_prices(15)
+        # 30 is derived from the cached 15 minute buckets
+        assert cache._finer_size(30)==15
+        direct = ResamplingCache(DATA_DF)
+        for field in ['open','high','low','close']:
+            assert cache.get_prices(30,field).equals(direct.get_prices(30,field))
+        assert np.array_equal(cache.bucket_map(30),direct.bucket_map(30))
+        assert cache.cached_sizes()==[5,15,30]
+
+    def test_nans_match_pandas(self):
+        # missing prices at bucket edges, and a whole bucket missing for tick1
+        data_df = DATA_DF.copy()
+        data_df.iloc[[0,4,5,9,30,391],0] = np.nan
+        data_df.iloc[10:20,1] = np.nan
+        data_df.iloc[-1,1] = np.nan
+        cache = ResamplingCache(data_df)
+        for minutes in [5,10,30,390]:
+            resampled = data_df.resample(str(minutes)+'T',closed='right',label='right')
+            for field,df in cache.get_ohlc(minutes).items():
+                expected = getattr(resampled,dict(open='first',high='max',
+                                                  low='min',close='last')[field])()
+                expected = expected.loc[df.index]
+                assert np.allclose(df.values,expected.values,equal_nan=True)
+        # the same when derived from finer buckets
+        direct = ResamplingCache(data_df)
+        for field in ['open','high','low','close']:
+            assert cache.get_prices(30,field).equals(direct.get_prices(30,field))
+            assert cache.get_prices(390,field).equals(direct.get_prices(390,field))
+
+    def test_bucket_map(self):
+        cache = ResamplingCache(DATA_DF)
+        ids = cache.bucket_map(10)
+        labels = cache.bucket_times(10)
+        assert len(ids)==len(TIMEINDEX)
+        assert np.all(labels[ids]>=TIMEINDEX)
+        assert np.all(labels[ids]-TIMEINDEX<pd.Timedelta(minutes=10))
+
+    def test_memoised(self):
+        cache = ResamplingCache(DATA_DF)
+        assert cache.get_prices(5) is cache.get_prices(5)
+
+    def test_timezone(self):
+        cache = ResamplingCache(DATA_DF.tz_localize('America/New_York'))
+        assert cache.bucket_times(30).tz is not None
+        assert np.array_equal(cache.bucket_times(30).tz_localize(None),
+                              ResamplingCache(DATA_DF).bucket_times(30))
+
+class TestBrokerResampling:
+
+    def test_get_resampled_price_list(self):
+        broker = PaperBroker(DATA_DF)
+        t0 = pd.Timestamp('2019-07-10 10:00')
+        t1 = pd.Timestamp('2019-07-11 12:00')
+        prices = broker.get_resampled_price_list('tick1',15,t0,t1)
+        expected = _pandas_ohlc(15,'close').loc[t0:t1][['tick1']]
+        assert prices.equals(expected)
+        assert broker.get_resampling_cache() is broker.get_resampling_cache()
+        with pytest.raises(ValueError):
+            broker.get_resampled_price_list(['tick2'],15,t0,t1)
+
+    def test_clone_shares_cache(self):
+        broker = PaperBroker(DATA_DF)
+        broker.get_resampled_price_list('tick0',5,TIMEINDEX[0],TIMEINDEX[-1])
+        clone = broker.clone()
+        assert clone.get_resampling_cache() is broker.get_resampling_cache()
+        assert clone.get_resampling_cache().cached_sizes()==[5]
+        assert clone._historical_data is not broker._historical_data